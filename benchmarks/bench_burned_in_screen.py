@@ -0,0 +1,103 @@
+"""Benchmarks the burned-in text pre-screen: speed and missed-text rate.
+
+Burns text (patient names, dates, IDs) into pydicom's test images without
+text at random places along their edges, at several sizes and intensities.
+Reports, for a few sensitivities, the fraction of images with text (burned
+in here, or present in pydicom's ultrasound and text test images) that the
+screen would not send to OCR (missed), the number of images without text it
+would send anyway (needless OCR), and the time it takes per image.
+
+    pip install -e . && python benchmarks/bench_burned_in_screen.py
+"""
+import copy
+import random
+import time
+
+import numpy as np
+import pydicom
+from PIL import Image, ImageDraw, ImageFont
+from pydicom.data import get_testdata_file
+
+from phi_finder.dicom_tools import burned_in_text
+
+# Images without text; text is burned into those of more than 32 rows and
+# more than 1 bit per pixel.
+CLEAN_FILES = [
+    "CT_small.dcm",
+    "MR_small.dcm",
+    "MR_small_RLE.dcm",
+    "liver_1frame.dcm",
+    "rtdose.dcm",
+    "JPEG2000.dcm",
+    "examples_overlay.dcm",
+    "SC_rgb_rle_2frame.dcm",
+]
+# Images with text of their own (ultrasound annotations, a text image).
+TEXT_FILES = ["examples_palette.dcm", "examples_rgb_color.dcm", "examples_ybr_color.dcm",
+              "examples_jpeg2k.dcm", "GDCMJ2K_TextGBR.dcm"]
+TEXTS = ["SMITH^JOHN", "DOE, JANE", "MRN 4412093", "DOB 1957-03-14", "12/03/2021 10:42",
+         "St George Hospital", "ID: 99887766", "Dr K. Nguyen", "F 64Y", "Acc 2020-118"]
+SENSITIVITIES = (0.5, 0.75, 0.9)
+REPEATS = 12
+
+
+def _burn(ds: pydicom.Dataset, rng: random.Random) -> pydicom.Dataset:
+    """A copy of ds with a line of text burned into the first frame's border."""
+    ds = copy.deepcopy(ds)
+    pixels = ds.pixel_array.copy()
+    frame = pixels if ds.get("NumberOfFrames", 1) in (None, 1) else pixels[0]
+    rows, columns = frame.shape[:2]
+    size = rng.choice([8, 10, 12, 16])
+    font = ImageFont.load_default(size=size)
+    mask = Image.new("L", (columns, rows))
+    text = rng.choice(TEXTS)
+    width = ImageDraw.Draw(mask).textlength(text, font=font)
+    x = rng.randrange(0, max(int(columns - width), 1))
+    y = rng.choice(
+        [
+            rng.randrange(0, max(rows // 8, 1)),
+            rng.randrange(rows - rows // 8 - size, rows - size),
+        ]
+    )
+    ImageDraw.Draw(mask).text((x, y), text, fill=255, font=font)
+    ink = np.asarray(mask) > 127
+    # Legible text: bright on a dark background, dark on a bright one.
+    background = np.median(frame[ink])
+    bright = background < np.percentile(frame, 50)
+    frame[ink] = np.percentile(frame, rng.choice([99.9, 99]) if bright else 0.1)
+    ds.PixelData = pixels.tobytes()
+    return ds
+
+
+def _read(name: str) -> pydicom.Dataset:
+    ds = pydicom.dcmread(get_testdata_file(name))
+    if ds.file_meta.TransferSyntaxUID.is_compressed:
+        ds.decompress()
+    return ds
+
+
+def main() -> None:
+    rng = random.Random(0)
+    clean = [_read(name) for name in CLEAN_FILES]
+    with_text = [_burn(ds, rng) for ds in clean if ds.Rows > 32 and ds.BitsAllocated > 1
+                 for _ in range(REPEATS)]
+    with_text += [_read(name) for name in TEXT_FILES]
+    print(f"{len(clean)} images without text, {len(with_text)} with text")
+    for sensitivity in SENSITIVITIES:
+        missed = sum(not burned_in_text.screen(ds, sensitivity).needs_ocr for ds in with_text)
+        needless = sum(burned_in_text.screen(ds, sensitivity).needs_ocr for ds in clean)
+        print(f"sensitivity {sensitivity:4}: missed {missed / len(with_text):6.1%}, "
+              f"needless OCR {needless}/{len(clean)}")
+    for name in CLEAN_FILES + TEXT_FILES:
+        ds = _read(name)
+        ds.pixel_array  # Decoding is not part of the screen.
+        start = time.perf_counter()
+        for _ in range(20):
+            result = burned_in_text.screen(ds)
+        elapsed = (time.perf_counter() - start) / 20
+        shape = f"{ds.Rows}x{ds.Columns}x{ds.get('NumberOfFrames', 1)}"
+        print(f"{name:24} {shape:12} {elapsed * 1e3:6.2f} ms, score {result.score:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Benchmarks the cascaded header analysis against the single Presidio pass.
+
+Redacts the header values of a few of pydicom's test files, and a set of
+values carrying PHI, once with every value going through the whole Presidio
+pass and once through a cascade.Cascade. Reports the mean time per value, the
+counters and time of each stage of the cascade, the PHI values the cascade
+leaves as they are while the full pass redacts them (lost recall), and the
+other values redacted differently.
+
+    pip install -e . && python benchmarks/bench_cascade.py
+"""
+import time
+
+import pydicom
+from pydicom.data import get_testdata_file
+
+from phi_finder.dicom_tools import anonymise_dicom, engines
+from phi_finder.dicom_tools.cascade import STAGES, Cascade
+
+FILES = [
+    "CT_small.dcm",
+    "MR_small.dcm",
+    "rtplan.dcm",
+    "rtstruct.dcm",
+    "rtdose.dcm",
+    "test-SR.dcm",
+    "liver_1frame.dcm",
+]
+PHI_VALUES = [
+    "John Doe",
+    "Jane Smith",
+    "Female",
+    "Male",
+    "F",
+    "M",
+    "01/01/1980",
+    "19430617",
+    "076Y",
+    "Dr Smith",
+    "DR JONES",
+    "A/Prof. Nguyen",
+    "Dear Mary Brown",
+    "0412 345 678",
+    "(02) 9382 2222",
+    "+61 2 9382 2222",
+    "MRN 4412093",
+    "Provider Number: 2451987A",
+    "12 Smith Street",
+    "33 GEORGE STREET",
+    "Kogarah NSW 2217",
+    "St George Hospital",
+    "Prince of Wales Hospital",
+    "Referred from Liverpool",
+    "Randwick Medical Centre",
+    "john.smith@example.com",
+    "https://example.com/patients/4412093",
+    "Seen 14 Mar 2021 by Dr Lee",
+    "Bondi Junction",
+    "Patient is a 64 year old man from Sydney",
+    "Mr Peter Parker, 20 Ingram St",
+]
+REPEATS = 5
+
+
+def _header_values() -> list[str]:
+    values = []
+    for name in FILES:
+        ds = pydicom.dcmread(get_testdata_file(name), force=True)
+        items: list = []
+        anonymise_dicom._collect_elements(ds, False, None, items)
+        for _, elem, _, _ in items:
+            if elem.VR in anonymise_dicom._TEXT_VRS:
+                values.extend(anonymise_dicom._text_values(elem) or ())
+    return list(dict.fromkeys(values))
+
+
+def _redact(values, analyser, anonymizer, cascade) -> tuple[float, dict]:
+    """The mean time per value, and the redacted values."""
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        redacted = anonymise_dicom._redact_texts(
+            values, analyser, anonymizer, 0.5, cascade=cascade
+        )
+    return (time.perf_counter() - start) / (REPEATS * len(values)), redacted
+
+
+def main() -> None:
+    analyser = engines.get_analyser(0.5, "en_core_web_md")
+    anonymizer = engines.get_anonymizer()
+    values = list(dict.fromkeys(_header_values() + PHI_VALUES))
+    _redact(values[:32], analyser, anonymizer, None)  # warm-up
+
+    full_time, full = _redact(values, analyser, anonymizer, None)
+    cascade = Cascade()
+    cascade_time, cascaded = _redact(values, analyser, anonymizer, cascade)
+
+    print(f"{len(values)} distinct values")
+    print(f"{'':20}{'full pass':>12}{'cascade':>12}")
+    print(f"{'per value (us)':20}{full_time * 1e6:12.1f}{cascade_time * 1e6:12.1f}")
+    info = cascade.info()
+    print(f"{'stage':20}{'values':>12}{'hits':>12}{'ms':>12}")
+    for stage in STAGES:
+        values_in, hits, seconds = info[stage]
+        print(
+            f"{stage:20}{values_in / REPEATS:12.0f}{hits / REPEATS:12.0f}"
+            f"{seconds / REPEATS * 1e3:12.1f}"
+        )
+    lost = [v for v in PHI_VALUES if full[v] != v and cascaded[v] == v]
+    print(f"PHI values redacted by the full pass only: {len(lost)}/{len(PHI_VALUES)}")
+    for value in lost:
+        print(f"  {value!r}: full pass {full[value]!r}")
+    other = [v for v in values if full[v] != cascaded[v] and v not in lost]
+    print(f"other values redacted differently: {len(other)}")
+    for value in other:
+        print(f"  {value!r}: full pass {full[value]!r}, cascade {cascaded[value]!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Benchmarks DenyListRecognizer against Presidio's deny-list PatternRecognizers.
+
+Builds the deny lists of anonymise_dicom._build_presidio_analyser both ways,
+reports the start-up (compile) time and the mean latency per header value,
+and checks that both flag the same entity types on every value.
+
+    pip install -e . && python benchmarks/bench_deny_list.py
+"""
+import os
+import random
+import time
+
+from presidio_analyzer import PatternRecognizer
+
+from phi_finder.dicom_tools.deny_list_recognizer import DenyListRecognizer
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SUBURBS_PATH = os.path.join(
+    SCRIPT_DIR, "..", "phi_finder", "dicom_tools", "suburbs_australia.txt"
+)
+
+# Typical header values, plus values built around deny-listed phrases.
+HEADER_VALUES = [
+    "t1_mprage_sag_p2_iso", "SIEMENS", "ep2d_diff_mddw_20_p2", "Head^Neuro",
+    "MRC35120", "ORIGINAL", "Skyra", "DIFFUSION", "AX T2 FLAIR", "syngo MR E11",
+    "Dr Smith, Prince of Wales Hospital", "Lives in Abbotsford NSW 2046",
+    "A/Prof. Jones", "Referred from St George Hospital, Sydney",
+    "Radiation Oncologist review", "Queensland Health",
+]
+
+
+def _load_deny_lists() -> dict[str, list[str]]:
+    with open(SUBURBS_PATH, encoding="utf8") as f:
+        suburbs = [x.strip() for x in f]
+    return {
+        "SUBURB": suburbs,
+        "STATE": ["NSW", "New South Wales", "QLD", "Queensland", "VIC", "Victoria",
+                  "TAS", "Tasmania", "ACT", "WA", "SA", "NT", "Australia"],
+        "TITLE": ["Dr", "Prof", "Prof.", "Doctor", "Professor", "A/Prof", "A/Prof.",
+                  "Radiation Oncologist"],
+        "INSTITUTE": ["Prince of Wales Hospital", "Prince of Wales", "St George Hospital",
+                      "St George", "Liverpool Hospital", "Liverpool"],
+    }
+
+
+def _time(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    deny_lists = _load_deny_lists()
+    random.seed(0)
+    values = HEADER_VALUES + [
+        f"Patient from {s}" for s in random.sample(deny_lists["SUBURB"], 50)
+    ]
+
+    start = time.perf_counter()
+    pattern_recognizers = [
+        PatternRecognizer(supported_entity=entity, deny_list=phrases)
+        for entity, phrases in deny_lists.items()
+    ]
+    pattern_build = time.perf_counter() - start
+    start = time.perf_counter()
+    trie_recognizer = DenyListRecognizer(deny_lists)
+    trie_build = time.perf_counter() - start
+
+    def run_patterns():
+        return [
+            {r.entity_type for rec in pattern_recognizers
+             for r in rec.analyze(v, rec.supported_entities, None)}
+            for v in values
+        ]
+
+    def run_trie():
+        return [{r.entity_type for r in trie_recognizer.analyze(v, [], None)} for v in values]
+
+    disagreements = [
+        (v, a, b) for v, a, b in zip(values, run_patterns(), run_trie()) if a != b
+    ]
+    pattern_latency = _time(run_patterns, 3) / len(values)
+    trie_latency = _time(run_trie, 20) / len(values)
+
+    print(f"{'':24}{'PatternRecognizer':>20}{'DenyListRecognizer':>20}")
+    print(f"{'start-up (ms)':24}{pattern_build * 1e3:20.1f}{trie_build * 1e3:20.1f}")
+    print(f"{'per value (us)':24}{pattern_latency * 1e6:20.1f}{trie_latency * 1e6:20.1f}")
+    print(f"values with different entity types: {len(disagreements)}/{len(values)}")
+    for value, expected, got in disagreements:
+        print(f"  {value!r}: patterns {sorted(expected)}, trie {sorted(got)}")
+
+
+if __name__ == "__main__":
+    main()
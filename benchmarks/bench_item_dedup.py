@@ -0,0 +1,104 @@
+"""Benchmarks the header pipeline on enhanced multi-frame objects.
+
+Builds enhanced MR headers with the same number of frames but more or fewer
+distinct per-frame functional group items, writes them and reads them back
+(so their sequences are raw, as read from a file), and reports the time the
+PS3.15 profile and the NER pipeline take on each. With identical items
+processed once (see sequence_items), the time follows the number of distinct
+items rather than of frames.
+
+    pip install -e . && python benchmarks/bench_item_dedup.py
+"""
+import io
+import time
+
+import pydicom
+
+from phi_finder.dicom_tools import anonymise_dicom, engines, ps3_15
+from phi_finder.dicom_tools.uid_map import UIDMap
+
+FRAMES = 2000
+DISTINCT = (1, 10, 100, 1000, FRAMES)
+
+
+def _sequence(**attributes) -> pydicom.Sequence:
+    item = pydicom.Dataset()
+    for keyword, value in attributes.items():
+        setattr(item, keyword, value)
+    return pydicom.Sequence([item])
+
+
+def _enhanced_mr(distinct: int) -> bytes:
+    ds = pydicom.Dataset()
+    ds.SOPClassUID = "1.2.840.10008.5.1.4.1.1.4.1"
+    ds.SOPInstanceUID = "1.2.3.4"
+    ds.PatientName = "Doe^John"
+    ds.NumberOfFrames = FRAMES
+    frames = []
+    for i in range(FRAMES):
+        position = i % distinct
+        frame = pydicom.Dataset()
+        frame.FrameContentSequence = _sequence(
+            StackID="1",
+            InStackPositionNumber=position + 1,
+            DimensionIndexValues=[1, position + 1],
+            FrameAcquisitionDateTime="20240101120000",
+        )
+        frame.PlanePositionSequence = _sequence(ImagePositionPatient=[0, 0, float(position)])
+        frame.PlaneOrientationSequence = _sequence(ImageOrientationPatient=[1, 0, 0, 0, 1, 0])
+        frame.PixelMeasuresSequence = _sequence(PixelSpacing=[0.5, 0.5], SliceThickness=1.0)
+        frame.FrameVOILUTSequence = _sequence(
+            WindowCenter=400,
+            WindowWidth=800,
+            WindowCenterWidthExplanation="Reviewed by Dr Smith",
+        )
+        frame.MRTimingAndRelatedParametersSequence = _sequence(
+            RepetitionTime=2000, FlipAngle=90, EchoTrainLength=1
+        )
+        frame.MREchoSequence = _sequence(EffectiveEchoTime=12.0)
+        frame.DerivationImageSequence = _sequence(
+            DerivationDescription="Motion corrected",
+            SourceImageSequence=_sequence(ReferencedSOPClassUID="1.2.840.10008.5.1.4.1.1.4",
+                                          ReferencedSOPInstanceUID=f"1.2.3.{position}"),
+        )
+        frames.append(frame)
+    ds.PerFrameFunctionalGroupsSequence = pydicom.Sequence(frames)
+    ds.file_meta = pydicom.dataset.FileMetaDataset()
+    ds.file_meta.MediaStorageSOPClassUID = ds.SOPClassUID
+    ds.file_meta.MediaStorageSOPInstanceUID = ds.SOPInstanceUID
+    ds.file_meta.TransferSyntaxUID = pydicom.uid.ExplicitVRLittleEndian
+    buffer = io.BytesIO()
+    ds.save_as(buffer, enforce_file_format=True)
+    return buffer.getvalue()
+
+
+def _time(function, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    analyser = engines.get_analyser(0.5, "en_core_web_md")
+    anonymizer = engines.get_anonymizer()
+    print(f"{FRAMES} frames")
+    print(f"{'distinct items':>16}{'profile (s)':>14}{'NER (s)':>12}")
+    for distinct in DISTINCT:
+        data = _enhanced_mr(distinct)
+        profile = _time(
+            ps3_15.apply_basic_profile,
+            pydicom.dcmread(io.BytesIO(data)),
+            uid_map=UIDMap(),
+        )
+        ner = _time(
+            anonymise_dicom._anonymise_ds,
+            pydicom.dcmread(io.BytesIO(data)),
+            analyser,
+            anonymizer,
+            0.5,
+        )
+        print(f"{distinct:16d}{profile:14.3f}{ner:12.3f}")
+
+
+if __name__ == "__main__":
+    main()
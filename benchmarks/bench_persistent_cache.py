@@ -0,0 +1,65 @@
+"""Benchmarks the on-disk cache of header-value redactions.
+
+Analyses a few thousand distinct header strings (protocol, station and series
+names, free-text comments) three times, as three runs of a project would:
+without a cache, then with a PersistentRedactionCache in a temporary file,
+once cold and once warm (opened again, as a later run or another worker
+process would). Reports the time of each run and checks the redactions match.
+
+    pip install -e . && python benchmarks/bench_persistent_cache.py
+"""
+import tempfile
+import time
+from pathlib import Path
+
+from phi_finder.dicom_tools import anonymise_dicom, engines
+from phi_finder.dicom_tools.redaction_cache import PersistentRedactionCache
+
+VALUES = 3000
+
+
+def _values() -> list:
+    values = []
+    for i in range(VALUES):
+        kind = i % 4
+        if kind == 0:
+            values.append(f"t1_mprage_sag_p{i % 7}_iso_{i}")
+        elif kind == 1:
+            values.append(f"MRC{10000 + i}")
+        elif kind == 2:
+            values.append(f"Series {i} reviewed by Dr Smith at Royal Melbourne Hospital")
+        else:
+            values.append(f"Contrast {i} ml, patient Jane Citizen tolerated well")
+    return values
+
+
+def _run(values, analyser, anonymizer, cache=None) -> tuple:
+    start = time.perf_counter()
+    redacted = anonymise_dicom._redact_texts(values, analyser, anonymizer, 0.5, cache=cache)
+    return time.perf_counter() - start, redacted
+
+
+def main() -> None:
+    analyser = engines.get_analyser(0.5, "en_core_web_md")
+    anonymizer = engines.get_anonymizer()
+    anonymise_dicom._redact_texts(["warm-up Dr Smith"], analyser, anonymizer, 0.5)
+    values = _values()
+    seconds, reference = _run(values, analyser, anonymizer)
+    print(f"{VALUES} values")
+    print(f"{'no cache':20}{seconds:8.2f} s")
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "redactions.sqlite"
+        seconds, cold = _run(values, analyser, anonymizer, PersistentRedactionCache(path))
+        print(f"{'on disk, cold':20}{seconds:8.2f} s, same output: {cold == reference}")
+        cache = PersistentRedactionCache(path)
+        seconds, warm = _run(values, analyser, anonymizer, cache)
+        print(
+            f"{'on disk, warm':20}{seconds:8.2f} s, same output: {warm == reference}, "
+            f"{cache.info()}"
+        )
+        size = sum(f.stat().st_size for f in Path(directory).iterdir())
+        print(f"file size: {size / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
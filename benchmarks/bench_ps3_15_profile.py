@@ -0,0 +1,77 @@
+"""Benchmarks the compiled PS3.15 profile against per-element action resolution.
+
+Resolving an element's action used to take a BASIC_PROFILE_ACTIONS lookup, the
+range rules (private, curve, overlay), the Retain Patient Characteristics check
+and the parsing of the combined action, for every element of every file. A
+CompiledProfile does all of that once per option set. This reports the time
+per element of both ways of resolving the actions, and the time per dataset of
+apply_basic_profile on a few of pydicom's test files.
+
+    pip install -e . && python benchmarks/bench_ps3_15_profile.py
+"""
+import copy
+import time
+
+import pydicom
+from pydicom.data import get_testdata_file
+
+from phi_finder.dicom_tools import ps3_15
+
+TEST_FILES = ["CT_small.dcm", "MR_small.dcm", "rtstruct.dcm", "test-SR.dcm"]
+
+
+def _resolve_per_element(tag, retain: bool, scan_private: bool):
+    """The action resolution apply_basic_profile did before CompiledProfile."""
+    if retain and int(tag) in ps3_15.RETAIN_PATIENT_CHARACTERISTICS_KEEP:
+        return ps3_15.KEEP
+    action = ps3_15._action_for(tag, scan_private)
+    return None if action is None else ps3_15._resolve_action(action)
+
+
+def _tags(datasets) -> list:
+    tags = []
+    for ds in datasets:
+        for elem in ds.iterall():
+            tags.append(elem.tag)
+    return tags
+
+
+def _per_call(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    datasets = [pydicom.dcmread(get_testdata_file(name), force=True) for name in TEST_FILES]
+    tags = _tags(datasets)
+    # Private and overlay tags go through the range rules.
+    tags += [pydicom.tag.Tag(0x0009, 0x1010), pydicom.tag.Tag(0x6000, 0x3000)] * 50
+    print(f"{len(tags)} elements")
+    for retain in (False, True):
+        profile = ps3_15.compile_profile(retain, False)
+        assert all(
+            profile.action_for(t) == _resolve_per_element(t, retain, False)
+            for t in tags
+        )
+        legacy = _per_call(lambda: [_resolve_per_element(t, retain, False) for t in tags], 200)
+        compiled = _per_call(lambda: [profile.action_for(t) for t in tags], 200)
+        print(
+            f"retain={retain!s:5}  per element: per-element resolution "
+            f"{legacy / len(tags) * 1e9:6.0f} ns, "
+            f"compiled {compiled / len(tags) * 1e9:6.0f} ns "
+            f"({legacy / compiled:.1f}x)"
+        )
+
+    for name, ds in zip(TEST_FILES, datasets):
+        copies = [copy.deepcopy(ds) for _ in range(50)]
+        start = time.perf_counter()
+        for item in copies:
+            ps3_15.apply_basic_profile(item)
+        elapsed = (time.perf_counter() - start) / len(copies)
+        print(f"{name:14} apply_basic_profile {elapsed * 1e6:8.0f} us per dataset")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Benchmarks the header pipeline on deep and wide sequence trees.
+
+Builds an RT Structure Set with tens of thousands of contour items, each with
+its own free-text name, and an SR document nested deeper than the recursion
+limit. Reports the time the PS3.15 profile and the collection of the NER
+pipeline's candidate elements take to walk each tree, and the time to
+anonymise the structure set's header with 1 and more spaCy processes
+(header_workers), checking the outputs match.
+
+    pip install -e . && python benchmarks/bench_sequence_traversal.py
+"""
+import os
+import sys
+import time
+
+import pydicom
+
+from phi_finder.dicom_tools import anonymise_dicom, engines, entity_routing, ps3_15
+
+ROIS = 20
+CONTOURS_PER_ROI = 1000
+SR_DEPTH = 3 * sys.getrecursionlimit()
+WORKERS = (1, 2, 4)
+
+
+def _structure_set() -> pydicom.Dataset:
+    ds = pydicom.Dataset()
+    ds.PatientName = "Doe^John"
+    rois = []
+    for r in range(ROIS):
+        roi = pydicom.Dataset()
+        roi.ReferencedROINumber = r
+        contours = []
+        for i in range(CONTOURS_PER_ROI):
+            contour = pydicom.Dataset()
+            contour.ContourGeometricType = "CLOSED_PLANAR"
+            contour.NumberOfContourPoints = 3
+            contour.ContourData = [0, 0, 0, 1, 1, 1, 2, 2, 2]
+            image = pydicom.Dataset()
+            image.ReferencedSOPClassUID = "1.2.840.10008.5.1.4.1.1.2"
+            image.ReferencedSOPInstanceUID = f"1.2.3.{r}.{i}"
+            contour.ContourImageSequence = pydicom.Sequence([image])
+            # A private free-text label per contour, as some planning systems write.
+            contour.add_new(
+                0x30091010,
+                "LO",
+                (
+                    f"Contour {i} of ROI {r}, drawn by Dr Smith"
+                    if i % 50 == 0
+                    else f"Contour {i % 100} of ROI {r}"
+                ),
+            )
+            contours.append(contour)
+        roi.ContourSequence = pydicom.Sequence(contours)
+        rois.append(roi)
+    ds.ROIContourSequence = pydicom.Sequence(rois)
+    return ds
+
+
+def _sr_document() -> pydicom.Dataset:
+    ds = pydicom.Dataset()
+    item = ds
+    for i in range(SR_DEPTH):
+        child = pydicom.Dataset()
+        child.RelationshipType = "CONTAINS"
+        child.TextValue = f"Finding {i % 7}"
+        item.ConceptNameCodeSequence = pydicom.Sequence([child])
+        item = child
+    item.TextValue = "Reported by Dr Smith"
+    return ds
+
+
+def _time(function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    # Each tree is built again rather than deep-copied: copy.deepcopy recurses.
+    trees = {"RT structure set": _structure_set, "SR document": _sr_document}
+    print(f"{'':20}{'profile (s)':>14}{'collect (s)':>14}{'candidates':>12}")
+    for name, build in trees.items():
+        profile = _time(ps3_15.apply_basic_profile, build())
+        items: list = []
+        collect = _time(anonymise_dicom._collect_elements, build(), False, None, items)
+        print(f"{name:20}{profile:14.3f}{collect:14.3f}{len(items):12d}")
+
+    analyser = engines.get_analyser(0.5, "en_core_web_md")
+    anonymizer = engines.get_anonymizer()
+    anonymise_dicom._redact_texts(["warm-up Dr Smith"], analyser, anonymizer, 0.5)
+    print(f"{os.cpu_count()} CPUs")
+    reference = None
+    for workers in WORKERS:
+        output = _structure_set()
+        start = time.perf_counter()
+        anonymise_dicom._anonymise_ds(output, analyser, anonymizer, 0.5,
+                                      routes=entity_routing.DEFAULT_ROUTES, workers=workers)
+        seconds = time.perf_counter() - start
+        labels = [
+            contour[0x30091010].value
+            for roi in output.ROIContourSequence
+            for contour in roi.ContourSequence
+        ]
+        reference = reference or labels
+        print(f"header_workers={workers}: {seconds:.2f} s, same output: {labels == reference}")
+
+
+if __name__ == "__main__":
+    main()
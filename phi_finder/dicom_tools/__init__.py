@@ -1,4 +1,16 @@
 __all__ = [
     "anonymise_dicom",
+    "burned_in_text",
+    "cascade",
+    "defined_terms",
+    "deny_list_recognizer",
+    "engines",
+    "entity_routing",
+    "frame_streaming",
+    "pixel_passthrough",
     "ps3_15",
+    "redaction_cache",
+    "sequence_items",
+    "series_boxes",
+    "uid_map",
 ]
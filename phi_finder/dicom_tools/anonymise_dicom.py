@@ -1,30 +1,134 @@
+from __future__ import annotations
+
 import os
 import json
 import logging
+import importlib
+import time
 from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
 logging.getLogger("presidio-analyzer").setLevel(logging.ERROR)
 logger = logging.getLogger(__name__)
 
 import numpy as np
-import torch
 import pydicom as dicom
 from pydicom.datadict import add_private_dict_entries
 from pydicom.tag import Tag
-from gliner import GLiNER
-from gliner.model import UniEncoderSpanGLiNER
-
-from presidio_image_redactor import DicomImageRedactorEngine
-from presidio_anonymizer import AnonymizerEngine
-from pydicom.pixel_data_handlers.util import apply_voi_lut
 from pydicom.valuerep import PersonName
-from presidio_anonymizer.entities import OperatorConfig
-from presidio_analyzer import AnalyzerEngine, PatternRecognizer, Pattern
-from presidio_analyzer.nlp_engine import NlpEngineProvider
 
-from phi_finder.dicom_tools import ps3_15
+from phi_finder.dicom_tools import (
+    burned_in_text,
+    defined_terms,
+    engines,
+    entity_routing,
+    frame_streaming,
+    pixel_passthrough,
+    ps3_15,
+    sequence_items,
+)
+from phi_finder.dicom_tools.cascade import Cascade
+from phi_finder.dicom_tools.redaction_cache import (
+    PersistentRedactionCache,
+    RedactionCache,
+    pipeline_fingerprint,
+)
+from phi_finder.dicom_tools.series_boxes import BoxTemplate
+from phi_finder.dicom_tools.uid_map import UIDMap
+
+if TYPE_CHECKING:
+    from gliner.model import UniEncoderSpanGLiNER
+    from presidio_analyzer import AnalyzerEngine
+    from presidio_anonymizer import AnonymizerEngine
+    from presidio_image_redactor import DicomImageRedactorEngine
+
+_PIXEL_DATA_TAG = Tag(0x7FE0, 0x0010)
+
+# torch, GLiNER, Presidio and spaCy take seconds to import, and the PS3.15
+# path needs none of them, so they are imported where they are used. They
+# stay reachable as attributes of this module (e.g.
+# anonymise_dicom.AnonymizerEngine), imported on first access.
+_LAZY_ATTRIBUTES = {
+    "torch": ("torch", None),
+    "GLiNER": ("gliner", "GLiNER"),
+    "UniEncoderSpanGLiNER": ("gliner.model", "UniEncoderSpanGLiNER"),
+    "DicomImageRedactorEngine": ("presidio_image_redactor", "DicomImageRedactorEngine"),
+    "AnonymizerEngine": ("presidio_anonymizer", "AnonymizerEngine"),
+    "OperatorConfig": ("presidio_anonymizer.entities", "OperatorConfig"),
+    "AnalyzerEngine": ("presidio_analyzer", "AnalyzerEngine"),
+    "BatchAnalyzerEngine": ("presidio_analyzer", "BatchAnalyzerEngine"),
+    "PatternRecognizer": ("presidio_analyzer", "PatternRecognizer"),
+    "Pattern": ("presidio_analyzer", "Pattern"),
+    "NlpEngineProvider": ("presidio_analyzer.nlp_engine", "NlpEngineProvider"),
+    "DenyListRecognizer": ("phi_finder.dicom_tools.deny_list_recognizer", "DenyListRecognizer"),
+    "apply_voi_lut": ("pydicom.pixel_data_handlers.util", "apply_voi_lut"),
+}
+
+
+def __getattr__(name: str):
+    try:
+        module_name, attribute = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    module = importlib.import_module(module_name)
+    value = module if attribute is None else getattr(module, attribute)
+    globals()[name] = value
+    return value
+
+
+# Chunk of zeros write_with_zero_pixels streams the pixel data from, shared
+# by every file.
+_ZERO_CHUNK = bytes(1 << 20)
 
 
-def destroy_pixels(ds: dicom.dataset.FileDataset) -> dicom.dataset.FileDataset:
+def _zero_pixel_module(ds: dicom.dataset.Dataset, preserve_geometry: bool) -> tuple[int, str]:
+    """Sets the image pixel module of ds to that of zeroed, uncompressed pixel
+    data; returns the length in bytes of the pixel data and its VR."""
+    bits = int(ds.get("BitsAllocated", 16) or 16)
+    signed = int(ds.get("PixelRepresentation", 0) or 0) == 1
+    if preserve_geometry:
+        bits = (
+            1
+            if bits == 1
+            else 8 if bits <= 8 else 16 if bits <= 16 else 32 if bits <= 32 else 64
+        )
+        samples = int(ds.get("SamplesPerPixel", 1) or 1)
+        pixels = (
+            int(ds.Rows)
+            * int(ds.Columns)
+            * int(ds.get("NumberOfFrames", 1) or 1)
+            * samples
+        )
+        ds.PhotometricInterpretation = "RGB" if samples > 1 else "MONOCHROME2"
+        if samples > 1:
+            ds.PlanarConfiguration = 0
+    else:
+        bits = 8 if bits <= 8 else 16 if bits <= 16 else 32
+        ds.Rows, ds.Columns = 8, 8
+        pixels = 64
+        ds.SamplesPerPixel = 1
+        ds.PhotometricInterpretation = "MONOCHROME2"
+        for keyword in ("NumberOfFrames", "PlanarConfiguration"):
+            if keyword in ds:
+                del ds[keyword]
+    ds.BitsAllocated = bits
+    ds.BitsStored = bits
+    ds.HighBit = bits - 1
+    ds.PixelRepresentation = 1 if signed else 0
+    # The new PixelData is raw little-endian bytes, so the transfer syntax
+    # must be uncompressed regardless of how the source was encoded.
+    if getattr(ds, "file_meta", None) is None:
+        ds.file_meta = dicom.dataset.FileMetaDataset()
+    ds.file_meta.TransferSyntaxUID = dicom.uid.ExplicitVRLittleEndian
+    for tag in (0x7FE00001, 0x7FE00002):  # Offset tables of encapsulated data.
+        if tag in ds:
+            del ds[tag]
+    return (pixels * bits + 7) // 8, "OW" if bits > 8 else "OB"
+
+
+def destroy_pixels(
+    ds: dicom.dataset.FileDataset, preserve_geometry: bool = False
+) -> dicom.dataset.FileDataset:
     """It sets all pixel values to 0.
 
     Parameters
@@ -32,6 +136,13 @@ def destroy_pixels(ds: dicom.dataset.FileDataset) -> dicom.dataset.FileDataset:
     ds : pydicom.dataset.FileDataset
         The DICOM dataset containing the image data to be destroyed.
 
+    preserve_geometry : bool, optional (default False)
+        If False, the image is replaced by a single 8x8 greyscale frame. If
+        True, it keeps its Rows, Columns, NumberOfFrames and SamplesPerPixel,
+        and its zeroed pixel data is held in memory with the dataset (see
+        write_with_zero_pixels to write it without holding it in memory at
+        all).
+
     Returns
     -------
     pydicom.dataset.FileDataset
@@ -40,26 +151,73 @@ def destroy_pixels(ds: dicom.dataset.FileDataset) -> dicom.dataset.FileDataset:
     if "PixelData" in ds:
         # Build the replacement pixels from scratch rather than decoding the
         # originals, so compressed files work without any decode handlers.
-        bits = int(ds.get("BitsAllocated", 16) or 16)
-        bits = 8 if bits <= 8 else 16 if bits <= 16 else 32
-        signed = int(ds.get("PixelRepresentation", 0) or 0) == 1
-        zeros = np.zeros((8, 8), dtype=f"{'int' if signed else 'uint'}{bits}")
-        ds.PixelData = zeros.tobytes()
-        ds.Rows, ds.Columns = zeros.shape
-        ds.BitsAllocated = bits
-        ds.BitsStored = bits
-        ds.HighBit = bits - 1
-        ds.PixelRepresentation = 1 if signed else 0
-        ds.SamplesPerPixel = 1
-        ds.PhotometricInterpretation = "MONOCHROME2"
-        for keyword in ("NumberOfFrames", "PlanarConfiguration"):
-            if keyword in ds:
-                del ds[keyword]
-        # The new PixelData is raw little-endian bytes, so the transfer syntax
-        # must be uncompressed regardless of how the source was encoded.
-        if getattr(ds, "file_meta", None) is None:
-            ds.file_meta = dicom.dataset.FileMetaDataset()
-        ds.file_meta.TransferSyntaxUID = dicom.uid.ExplicitVRLittleEndian
+        length, vr = _zero_pixel_module(ds, preserve_geometry)
+        ds.PixelData = bytes(length + length % 2)
+        if preserve_geometry:
+            ds["PixelData"].VR = vr
+    return ds
+
+
+def write_with_zero_pixels(ds: dicom.dataset.FileDataset, dst) -> None:
+    """Writes ds to dst with its pixel data zeroed and its geometry preserved.
+
+    The zeros are streamed to dst in chunks rather than built in memory, so
+    the memory used does not depend on the size of the image.
+
+    Parameters
+    ----------
+    ds : pydicom.dataset.FileDataset
+        The dataset, e.g. as read by read_header. Its image pixel module is
+        set as by destroy_pixels(ds, preserve_geometry=True).
+
+    dst : str or Path
+        Where to write the output.
+    """
+    if "PixelData" not in ds:
+        ds.save_as(dst)
+        return
+    length, vr = _zero_pixel_module(ds, preserve_geometry=True)
+    del ds.PixelData
+    if any(elem.tag > _PIXEL_DATA_TAG for elem in ds):
+        raise ValueError("The header has elements sorting after its pixel data")
+    length += length % 2
+    with open(dst, "wb") as out:
+        ds.save_as(out)
+        out.write(pixel_passthrough.native_pixel_data_header(vr, length))
+        chunk = memoryview(_ZERO_CHUNK)
+        while length > 0:
+            length -= out.write(chunk[:min(length, len(chunk))])
+
+
+def read_header(path) -> dicom.dataset.FileDataset:
+    """Reads a DICOM file without loading its pixel data.
+
+    The file is parsed up to the PixelData element only. If the file has pixel
+    data, an empty PixelData element (with the original VR) stands in for it,
+    so destroy_pixels still sees and replaces it; the original pixel bytes are
+    never read into memory. Elements stored after the pixel data (typically
+    just trailing padding) are not read.
+
+    Parameters
+    ----------
+    path : str or Path
+        The DICOM file to read.
+
+    Returns
+    -------
+    pydicom.dataset.FileDataset
+        The dataset, with an empty placeholder in place of the pixel data.
+    """
+    with open(path, "rb") as fp:
+        ds = dicom.dcmread(fp, stop_before_pixels=True)
+        if ds.file_meta.get("TransferSyntaxUID") == dicom.uid.DeflatedExplicitVRLittleEndian:
+            # The dataset was inflated in memory, so the file position says
+            # nothing about what follows; read the whole file instead.
+            fp.seek(0)
+            return dicom.dcmread(fp)
+        pixel_range = pixel_passthrough.locate_pixel_data(fp, ds)
+    if pixel_range is not None and pixel_range.tag == _PIXEL_DATA_TAG:
+        ds.add_new(_PIXEL_DATA_TAG, pixel_range.vr, b"")
     return ds
 
 
@@ -71,7 +229,9 @@ def _build_presidio_analyser(score_threshold: float=0.5,
     various pattern recognisers for different types of entities, including titles,
     correspondence, phone numbers, medical record numbers (MRN), provider numbers,
     dates, street addresses, postcodes, suburbs, states, and institutes. The
-    recognisers are configured with specific patterns and deny lists.
+    recognisers are configured with specific patterns and deny lists; the deny
+    lists (titles, suburbs, states and institutes) are all matched by a single
+    DenyListRecognizer.
 
     Parameters
     ----------
@@ -88,6 +248,10 @@ def _build_presidio_analyser(score_threshold: float=0.5,
         An instance of the AnalyzerEngine configured with various recognisers for
         named entity recognition.
     """
+    from presidio_analyzer import AnalyzerEngine, PatternRecognizer, Pattern
+    from presidio_analyzer.nlp_engine import NlpEngineProvider
+    from phi_finder.dicom_tools.deny_list_recognizer import DenyListRecognizer
+
     configuration = {
         "nlp_engine_name": "spacy",
         "models": [{"lang_code": "en", "model_name": spacy_model_name}],
@@ -96,29 +260,26 @@ def _build_presidio_analyser(score_threshold: float=0.5,
     nlp_engine = provider.create_engine()
 
     analyzer = AnalyzerEngine(nlp_engine=nlp_engine)
-    title_recognizer = PatternRecognizer(
-        supported_entity="TITLE",
-        deny_list=[
-            "Dr",
-            "DR",
-            "Prof",
-            "PROF",
-            "Prof.",
-            "Doctor",
-            "DOCTOR",
-            "Professor",
-            "PROFESSOR",
-            "Associate Professor",
-            "ASSOCIATE PROF",
-            "ASSOCIATE PROFESSOR",
-            "A/Prof",
-            "A/Prof.",
-            "A / Prof",
-            "A / Professor",
-            "A / PROF",
-            "Radiation Oncologist",
-        ],
-    )
+    title_deny_list = [
+        "Dr",
+        "DR",
+        "Prof",
+        "PROF",
+        "Prof.",
+        "Doctor",
+        "DOCTOR",
+        "Professor",
+        "PROFESSOR",
+        "Associate Professor",
+        "ASSOCIATE PROF",
+        "ASSOCIATE PROFESSOR",
+        "A/Prof",
+        "A/Prof.",
+        "A / Prof",
+        "A / Professor",
+        "A / PROF",
+        "Radiation Oncologist",
+    ]
     correspondence_recognizer = PatternRecognizer(
         supported_entity="CORRESPONDENCE",
         patterns=[
@@ -199,44 +360,37 @@ def _build_presidio_analyser(score_threshold: float=0.5,
     # Suburbs list from https://github.com/damiankotevski/anonymisation
     suburbs_australia_path = os.path.join(script_dir, "suburbs_australia.txt")
     with open(suburbs_australia_path, "r", encoding='utf8') as f:
-        deny_list = f.readlines()
-    deny_list = [x.strip() for x in deny_list]
-    suburb_recognizer = PatternRecognizer(
-        supported_entity="SUBURB",
-        deny_list=deny_list,
-    )
+        suburb_deny_list = f.readlines()
+    suburb_deny_list = [x.strip() for x in suburb_deny_list]
 
-    state_recognizer = PatternRecognizer(
-        supported_entity="STATE",
-        deny_list=[
-            "NSW",
-            "New South Wales",
-            "NEW SOUTH WALES",
-            "QLD",
-            "Queensland",
-            "QUEENSLAND",
-            "NT",
-            "Northern Territory",
-            "NORTHERN TERRITORY",
-            "WA",
-            "Western Australia",
-            "WESTERN AUSTRALIA",
-            "SA",
-            "South Australia",
-            "SOUTH AUSTRALIA",
-            "VIC",
-            "Victoria",
-            "VICTORIA",
-            "TAS",
-            "Tasmania",
-            "TASMANIA",
-            "ACT",
-            "Australian Capital Territory",
-            "AUSTRALIAN CAPITAL TERRITORY",
-            "Australia",
-            "AUSTRALIA",
-        ],
-    )
+    state_deny_list = [
+        "NSW",
+        "New South Wales",
+        "NEW SOUTH WALES",
+        "QLD",
+        "Queensland",
+        "QUEENSLAND",
+        "NT",
+        "Northern Territory",
+        "NORTHERN TERRITORY",
+        "WA",
+        "Western Australia",
+        "WESTERN AUSTRALIA",
+        "SA",
+        "South Australia",
+        "SOUTH AUSTRALIA",
+        "VIC",
+        "Victoria",
+        "VICTORIA",
+        "TAS",
+        "Tasmania",
+        "TASMANIA",
+        "ACT",
+        "Australian Capital Territory",
+        "AUSTRALIAN CAPITAL TERRITORY",
+        "Australia",
+        "AUSTRALIA",
+    ]
 
     institute_recognizer = PatternRecognizer(
         supported_entity="INSTITUTE",
@@ -247,53 +401,62 @@ def _build_presidio_analyser(score_threshold: float=0.5,
                 score=score_threshold,
             )
         ],
-        deny_list=[
-            "Prince of Wales Hospital",
-            "Prince of Wales",
-            "Prince of Wales Private",
-            "POW Private",
-            "POWPH",
-            "POWH",
-            "Nelune Comprehensive Cancer Centre",
-            "Bright Building",
-            "Liverpool Hospital",
-            "Liverpool",
-            "Campbelltown Hospital",
-            "Campbelltown",
-            "Wollongong Hospital",
-            "Wollongong",
-            "Shoalhaven District Memorial Hospital",
-            "Shoalhaven District Memorial",
-            "Shoalhaven",
-            "St George Hospital",
-            "St George",
-            "SGH",
-            "Royal North Shore Hospital",
-            "Royal North Shore",
-            "RNSH",
-            "Tamworth Hospital",
-            "Tamworth",
-            "TBH",
-            "Calvary",
-            "Calvary Mater",
-            "Calvary Mater Newcastle",
-            "Calvary Mater Newcastle Hospital",
-            "Newcastle",
-            "CMMN",
-            "St Vincents Hospital",
-            "St Vincents",
-            "GenesisCare",
-            "SVH",
-            "Macquarie Univerisity",
-            "Macquarie University Hospital",
-            "Waratah Private Hospital",
-            "Hurstville",
-            "Mater Sydney",
-            "Mater Hospital",
-            "Albury Wodonga",
-            "Albury",
-        ],
     )
+    institute_deny_list = [
+        "Prince of Wales Hospital",
+        "Prince of Wales",
+        "Prince of Wales Private",
+        "POW Private",
+        "POWPH",
+        "POWH",
+        "Nelune Comprehensive Cancer Centre",
+        "Bright Building",
+        "Liverpool Hospital",
+        "Liverpool",
+        "Campbelltown Hospital",
+        "Campbelltown",
+        "Wollongong Hospital",
+        "Wollongong",
+        "Shoalhaven District Memorial Hospital",
+        "Shoalhaven District Memorial",
+        "Shoalhaven",
+        "St George Hospital",
+        "St George",
+        "SGH",
+        "Royal North Shore Hospital",
+        "Royal North Shore",
+        "RNSH",
+        "Tamworth Hospital",
+        "Tamworth",
+        "TBH",
+        "Calvary",
+        "Calvary Mater",
+        "Calvary Mater Newcastle",
+        "Calvary Mater Newcastle Hospital",
+        "Newcastle",
+        "CMMN",
+        "St Vincents Hospital",
+        "St Vincents",
+        "GenesisCare",
+        "SVH",
+        "Macquarie Univerisity",
+        "Macquarie University Hospital",
+        "Waratah Private Hospital",
+        "Hurstville",
+        "Mater Sydney",
+        "Mater Hospital",
+        "Albury Wodonga",
+        "Albury",
+    ]
+
+    # All deny lists are matched by one trie in a single pass over each
+    # value, rather than by one huge alternation regex per list.
+    deny_list_recognizer = DenyListRecognizer({
+        "TITLE": title_deny_list,
+        "SUBURB": suburb_deny_list,
+        "STATE": state_deny_list,
+        "INSTITUTE": institute_deny_list,
+    })
 
     age_recognizer = PatternRecognizer(
         supported_entity="AGE",
@@ -308,7 +471,6 @@ def _build_presidio_analyser(score_threshold: float=0.5,
     )
 
 
-    analyzer.registry.add_recognizer(title_recognizer)
     analyzer.registry.add_recognizer(correspondence_recognizer)
     analyzer.registry.add_recognizer(phone_recognizer)
     analyzer.registry.add_recognizer(mrn_recognizer)
@@ -317,15 +479,23 @@ def _build_presidio_analyser(score_threshold: float=0.5,
     analyzer.registry.add_recognizer(date_recognizer)
     analyzer.registry.add_recognizer(street_recognizer)
     analyzer.registry.add_recognizer(postcode_recognizer)
-    analyzer.registry.add_recognizer(suburb_recognizer)
-    analyzer.registry.add_recognizer(state_recognizer)
     analyzer.registry.add_recognizer(institute_recognizer)
+    analyzer.registry.add_recognizer(deny_list_recognizer)
     analyzer.registry.add_recognizer(age_recognizer)
     return analyzer
 
 
+_GLINER_CHECKPOINT = "nvidia/gliner-pii"
+
+
 def _build_transformer() -> UniEncoderSpanGLiNER:
-    model = GLiNER.from_pretrained("nvidia/gliner-pii")#, max_length=384)
+    import torch
+    from gliner import GLiNER
+
+    model = GLiNER.from_pretrained(_GLINER_CHECKPOINT)#, max_length=384)
+    # GLiNER does not keep the checkpoint it was loaded from; the redaction
+    # caches need it to tell checkpoints apart (see pipeline_fingerprint).
+    model.checkpoint = _GLINER_CHECKPOINT
     device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
     model.to(device)
     model.eval()
@@ -335,6 +505,37 @@ def _build_transformer() -> UniEncoderSpanGLiNER:
     return model
 
 
+# Entity labels GLiNER is prompted with.
+_GLINER_LABELS = [
+    "age", "profession", "gender", "name",
+    "sex", "language", "ethnicity",
+    "country", "city", "state", "suburb",
+    "location", "person", "organization",
+    "phone number", "address", "passport number",
+    "email", "social security number", "health insurance id number",
+    "date of birth", "mobile phone number",
+    "health insurance number",
+]
+
+
+def _mask_entities(text: str, pred_entities: list) -> str:
+    """Replaces the spans of GLiNER's predicted entities with "XXXX"."""
+    # merged collapses overlapping entity spans into non-overlapping
+    # ones so the slice-replacement at the end doesn't
+    # double-redact or produce corrupted offsets.
+    # e.g. "Dr John Smith" might be person (0–13) and profession (0–2).
+    spans = sorted((e['start'], e['end']) for e in pred_entities)
+    merged: list[tuple[int, int]] = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    for start, end in reversed(merged):
+        text = text[:start] + 'XXXX' + text[end:]
+    return text
+
+
 def _anonymise_with_transformer(model: UniEncoderSpanGLiNER,
                                 text: str,
                                 threshold: float=0.15,
@@ -363,33 +564,13 @@ def _anonymise_with_transformer(model: UniEncoderSpanGLiNER,
     str
         The anonymised text with specified entities replaced by "[XXXX]".
     """
-    LABELS = [
-        "age", "profession", "gender", "name",
-        "sex", "language", "ethnicity",
-        "country", "city", "state", "suburb",
-        "location", "person", "organization",
-        "phone number", "address", "passport number",
-        "email", "social security number", "health insurance id number",
-        "date of birth", "mobile phone number",
-        "health insurance number",
-    ]
-    # merged collapses overlapping entity spans into non-overlapping
-    # ones so the slice-replacement at the end doesn't
-    # double-redact or produce corrupted offsets.
-    # e.g. "Dr John Smith" might be person (0–13) and profession (0–2).
+    import torch
+
     labels_pred: list[str] = []
     try:
         with torch.inference_mode():
-            pred_entities = model.predict_entities(text, LABELS, threshold=threshold)
-        spans = sorted((e['start'], e['end']) for e in pred_entities)
-        merged: list[tuple[int, int]] = []
-        for start, end in spans:
-            if merged and start <= merged[-1][1]:
-                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
-            else:
-                merged.append((start, end))
-        for start, end in reversed(merged):
-            text = text[:start] + 'XXXX' + text[end:]
+            pred_entities = model.predict_entities(text, _GLINER_LABELS, threshold=threshold)
+        text = _mask_entities(text, pred_entities)
         labels_pred = sorted(e['label'] for e in pred_entities)
     except Exception as e:
         # Fail closed: if recognition errors out we cannot know what is PHI,
@@ -401,6 +582,211 @@ def _anonymise_with_transformer(model: UniEncoderSpanGLiNER,
     return text
 
 
+def _anonymise_with_transformer_batch(model: UniEncoderSpanGLiNER,
+                                      texts: list[str],
+                                      threshold: float=0.15,
+                                      batch_size: int=8) -> list[str]:
+    """Anonymises many texts with GLiNER, in padded mini-batches.
+
+    Most of the cost of a GLiNER call is tokenisation and forward-pass
+    overhead rather than the text itself, so the texts are run through the
+    model batch_size at a time. They are grouped by length first so each
+    mini-batch pads to a similar size.
+
+    Parameters
+    ----------
+    model : Gliner's UniEncoderSpanGLiNER
+        The NER model to use for entity recognition.
+
+    texts : list of str
+        The texts to be anonymised.
+
+    threshold : float, optional (default=0.15)
+        Confidence needed to flag an entity.
+
+    batch_size : int, optional (default=8)
+        Number of texts per forward pass.
+
+    Returns
+    -------
+    list of str
+        The anonymised texts, in the order of texts. As with
+        _anonymise_with_transformer, a text whose recognition errors out is
+        redacted entirely.
+    """
+    import torch
+
+    anonymised = list(texts)
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    for start in range(0, len(order), batch_size):
+        indices = order[start:start + batch_size]
+        chunk = [texts[i] for i in indices]
+        try:
+            with torch.inference_mode():
+                predictions = model.batch_predict_entities(
+                    chunk, _GLINER_LABELS, threshold=threshold
+                )
+            masked = [_mask_entities(text, pred) for text, pred in zip(chunk, predictions)]
+        except Exception as e:
+            # Retry the mini-batch one text at a time, so a failure only
+            # redacts the text that caused it (fail closed per item).
+            logger.warning("GLiNER batch failed, anonymising its texts one at a time. %s: %s",
+                           type(e).__name__, e)
+            masked = [
+                _anonymise_with_transformer(model, text, threshold=threshold)
+                for text in chunk
+            ]
+        for i, text in zip(indices, masked):
+            anonymised[i] = text
+    return anonymised
+
+
+def _analyse_texts(texts: list[str],
+                   analyser: AnalyzerEngine,
+                   score_threshold: float,
+                   batch_size: int = 32,
+                   entities: tuple | None = None,
+                   n_process: int = 1) -> list:
+    """Runs the Presidio analyser over many texts in one batch.
+
+    The texts go through the NLP engine together (spaCy's nlp.pipe, via
+    Presidio's BatchAnalyzerEngine) instead of paying the per-call overhead for
+    every short header value. Only the recognizers of entities run, all of
+    them if None. With n_process above 1, nlp.pipe parses the batches in that
+    many processes, each with its own copy of the spaCy pipeline; the
+    recognizers still run in this one.
+
+    Returns
+    -------
+    list
+        One entry per text: its analyser results, or the exception raised
+        while analysing it.
+    """
+    from presidio_analyzer import BatchAnalyzerEngine
+
+    if not texts:
+        return []
+    try:
+        # Forking the spaCy pipeline only pays off with a batch for each process.
+        n_process = max(min(n_process, -(-len(texts) // batch_size)), 1)
+        return BatchAnalyzerEngine(analyzer_engine=analyser).analyze_iterator(
+            texts, language="en", batch_size=batch_size, n_process=n_process,
+            score_threshold=score_threshold,
+            entities=None if entities is None else list(entities),
+        )
+    except Exception as e:
+        # One bad value must not fail the whole batch: analyse the values one
+        # at a time so that only the ones that fail are blanked.
+        logger.warning("Batch analysis failed, analysing values one at a time. %s: %s",
+                       type(e).__name__, e)
+    results = []
+    for text in texts:
+        try:
+            results.append(
+                analyser.analyze(
+                    text=text,
+                    language="en",
+                    score_threshold=score_threshold,
+                    entities=None if entities is None else list(entities),
+                )
+            )
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def _redact_texts(texts,
+                  analyser: AnalyzerEngine,
+                  anonymizer: AnonymizerEngine,
+                  score_threshold: float,
+                  gliner_pii=None,
+                  cache: RedactionCache | None = None,
+                  batch_size: int = 32,
+                  entities: tuple | None = None,
+                  cascade: Cascade | None = None,
+                  workers: int = 1) -> dict:
+    """Redacts header values with Presidio (plus GLiNER if given).
+
+    Duplicate values are analysed once, and the values not found in the cache
+    (if any) are analysed in a single batch. Results are memoised in the cache
+    on the value text and the pipeline configuration, which includes the
+    entities looked for (all of them if None, see entity_routing) and the
+    cascade, if any. With a cascade, the values are analysed stage by stage
+    (see cascade.Cascade) and GLiNER only sees the long values it leaves
+    ambiguous. With more than one worker, spaCy parses the values in that
+    many processes (see _analyse_texts).
+
+    Returns
+    -------
+    dict
+        Maps each text to its redacted version, or to the exception raised
+        while redacting it, so the caller can fail closed on that value alone.
+        Failures are never cached.
+    """
+    from presidio_anonymizer.entities import OperatorConfig
+
+    redacted: dict = {}
+    fingerprint = pipeline_fingerprint(analyser, gliner_pii) if cache is not None else None
+    if fingerprint is not None and entities is not None:
+        fingerprint += "|entities:" + ",".join(sorted(entities))
+    if fingerprint is not None and cascade is not None:
+        fingerprint += "|" + cascade.fingerprint()
+    pending = []
+    for text in dict.fromkeys(texts):
+        if cache is not None:
+            cached = cache.get(cache.key(text, score_threshold, fingerprint))
+            if cached is not None:
+                redacted[text] = cached
+                continue
+        pending.append(text)
+    if cascade is None:
+        analyses = _analyse_texts(
+            pending, analyser, score_threshold, batch_size, entities, workers
+        )
+    else:
+        analyses = cascade.analyse(
+            pending, analyser, score_threshold,
+            lambda stage_texts, stage_entities: _analyse_texts(
+                stage_texts, analyser, score_threshold, batch_size, stage_entities, workers
+            ),
+            entities,
+        )
+    done = []
+    for text, analyzer_results in zip(pending, analyses):
+        if isinstance(analyzer_results, Exception):
+            redacted[text] = analyzer_results
+            continue
+        try:
+            redacted[text] = anonymizer.anonymize(
+                text=text,
+                analyzer_results=analyzer_results,
+                operators={"DEFAULT": OperatorConfig("replace", {"new_value": "XXXX"})},
+            ).text
+        except Exception as e:
+            redacted[text] = e
+            continue
+        done.append(text)
+    if gliner_pii:
+        # GLiNER runs on top of Presidio's output for the long values only,
+        # all of them in one batched pass.
+        if cascade is None:
+            long_texts = [text for text in done if len(redacted[text]) > 30]
+        else:
+            long_texts = [text for text in done if cascade.needs_gliner(redacted[text])]
+        start = time.perf_counter()
+        anonymised = _anonymise_with_transformer_batch(
+            gliner_pii, [redacted[text] for text in long_texts], threshold=score_threshold,
+        )
+        if cascade is not None:
+            hits = sum(new != redacted[text] for text, new in zip(long_texts, anonymised))
+            cascade.record("gliner", len(long_texts), hits, time.perf_counter() - start)
+        redacted.update(zip(long_texts, anonymised))
+    if cache is not None:
+        for text in done:
+            cache.put(cache.key(text, score_threshold, fingerprint), redacted[text])
+    return redacted
+
+
 # Structural elements whose values are DICOM defined terms, not free text.
 # They must never be redacted: e.g. ImageType's magnitude component 'M' would
 # otherwise match the standalone-M/F gender pattern, corrupting the image.
@@ -413,6 +799,331 @@ _STRUCTURAL_TAGS = frozenset({
 })
 
 
+# Free-text VRs whose values are scanned with the NER pipeline.
+# https://dicom.nema.org/medical/dicom/current/output/html/part05.html#table_6.2-1 and https://pydicom.github.io/pydicom/stable/guides/element_value_types.html
+_TEXT_VRS = frozenset({
+    "LO",  # Long String
+    "LT",  # Long Text
+    #"OW",  # Other Word
+    "SH",  # Short String
+    "ST",  # Short Text
+    "UC",  # Unlimited Characters
+    "UT",  # Unlimited Text
+    #"DA",  # Date
+    "CS",  # Code String
+})
+
+# Returned by _redact_element for elements that are left as they are.
+_UNCHANGED = object()
+
+
+def _is_redactable(elem: dicom.dataelem.DataElement) -> bool:
+    """True if _redact_element may change the element's value."""
+    return (
+        elem.VR in ("PN", "AS")
+        or elem.VR in _TEXT_VRS
+        or elem.tag in ((0x0010, 0x0010), (0x0010, 0x0030))
+    )
+
+
+def _text_values(elem: dicom.dataelem.DataElement) -> list[str] | None:
+    """The values of a free-text element as strings, or None if it is empty."""
+    original = elem.value
+    if original is None:
+        return None
+    if isinstance(original, dicom.multival.MultiValue):
+        return [str(v) for v in original] if len(original) > 0 else None
+    return None if original == "" else [str(original)]
+
+
+def _redact_element(elem: dicom.dataelem.DataElement, redacted: dict) -> tuple:
+    """Works out how a single (non-sequence) element must be redacted.
+
+    The free-text values are looked up in redacted, as returned by
+    _redact_texts for the values collected from the dataset.
+
+    Returns
+    -------
+    tuple
+        (new_value, flagged): new_value is _UNCHANGED when the element is
+        left as it is, a tuple of strings for a multi-valued element, or the
+        single replacement value; flagged tells whether the element goes into
+        the flagged-headers list.
+    """
+    if elem.VR == "PN" or elem.tag == (0x0010, 0x0010):
+        return PersonName("XXXX"), True
+    if elem.tag == (0x0010, 0x0040):  # Sex unchanged.
+        return _UNCHANGED, False
+    if elem.tag == (0x0010, 0x0030):  # Birthdate
+        birthdate_str = str(elem.value).strip()
+        if birthdate_str == "":
+            return _UNCHANGED, False
+        year = None
+        for fmt in ("%Y%m%d", "%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%Y"):
+            try:
+                year = datetime.strptime(birthdate_str, fmt).year
+                break
+            except ValueError:
+                continue
+        # Fail-safe: if the format is unrecognised, scrub the value so the
+        # original birthdate never survives in the dataset.
+        return (f"{year:04d}0101" if year is not None else "19000101"), True
+    if elem.VR == "AS":
+        if str(elem.value).strip() in ("", "000Y"):
+            return _UNCHANGED, False
+        return "000Y", True
+    if elem.VR in _TEXT_VRS:
+        try:
+            values = _text_values(elem)
+            if values is None:
+                return _UNCHANGED, False
+            new_values = []
+            for v in values:
+                result = redacted[v]
+                if isinstance(result, Exception):
+                    raise result
+                new_values.append(result)
+            if new_values == values:
+                return _UNCHANGED, False
+            is_multi = isinstance(elem.value, dicom.multival.MultiValue)
+            return (tuple(new_values) if is_multi else new_values[0]), True
+        except Exception as e:
+            # Fail closed: a value that could not be analysed may still
+            # contain PHI, so blank it rather than leave the original.
+            logger.error(
+                "Failed to redact %s (%s), blanking it. %s: %s",
+                elem.tag, elem.name, type(e).__name__, e,
+            )
+            return "", True
+    return _UNCHANGED, False
+
+
+def _apply_decision(ds: dicom.dataset.Dataset,
+                    elem: dicom.dataelem.DataElement,
+                    decision: tuple,
+                    anonymised_headers: list) -> None:
+    new_value, flagged = decision
+    if new_value is not _UNCHANGED:
+        if isinstance(new_value, tuple):
+            # A fresh MultiValue per dataset: replayed decisions must not
+            # share one mutable value between the files of a series.
+            new_value = dicom.multival.MultiValue(str, new_value)
+        try:
+            ds[elem.tag].value = new_value
+        except Exception:
+            del ds[elem.tag]
+    if flagged:
+        anonymised_headers.append({"tag": str(elem.tag), "name": elem.name})
+
+
+class HeaderTemplate:
+    """Redaction decisions of one dataset of a series, replayed on the others.
+
+    The files of a series share nearly all of their header, apart from a few
+    instance-specific attributes (InstanceNumber, SOPInstanceUID,
+    SliceLocation, ...). The first dataset passed through _anonymise_ds with
+    a template is analysed in full and every decision is recorded against the
+    element's position and original value. Later datasets are diffed against
+    it: an element whose value is unchanged gets the recorded decision
+    replayed, and only the elements that differ go through the NER pipeline.
+
+    Decisions depend on the pipeline, so use one template per series and per
+    analyser configuration.
+    """
+
+    def __init__(self) -> None:
+        self._decisions: dict = {}
+        self.analysed = 0
+        self.replayed = 0
+
+    @staticmethod
+    def _snapshot(value):
+        if isinstance(value, dicom.multival.MultiValue):
+            return tuple(str(v) for v in value)
+        return None if value is None else str(value)
+
+    def lookup(self, path: tuple, elem: dicom.dataelem.DataElement) -> tuple | None:
+        """Returns the recorded decision if elem matches the template, else None."""
+        entry = self._decisions.get((path, elem.tag))
+        if entry is None:
+            return None
+        vr, snapshot, decision = entry
+        if vr != elem.VR or snapshot != self._snapshot(elem.value):
+            return None
+        self.replayed += 1
+        return decision
+
+    def record(self, path: tuple, elem: dicom.dataelem.DataElement, decision: tuple) -> None:
+        """Records the decision taken for elem (the first one recorded wins)."""
+        self.analysed += 1
+        key = (path, elem.tag)
+        if key not in self._decisions:
+            self._decisions[key] = (elem.VR, self._snapshot(elem.value), decision)
+
+
+def _collect_elements(ds: dicom.dataset.Dataset,
+                      private_only: bool,
+                      template: HeaderTemplate | None,
+                      items: list,
+                      duplicates: list | None = None) -> None:
+    """Collects the elements of ds, and of all its sequence items, that may
+    need redacting.
+
+    Appends (dataset, element, path, decision) to items in dataset order (an
+    item's elements before the elements following its sequence), decision
+    being the template's replayed decision or None when the element still has
+    to be analysed. The sequence tree is walked with a worklist rather than by
+    recursion, so its depth is not limited by the recursion limit.
+
+    When a duplicates list is given, an item identical to one met before (see
+    sequence_items.fingerprint) is not walked: (item, path, first) is
+    appended to duplicates instead, first being the earlier item's path and
+    the spans of items and duplicates collected from it, for _replay_duplicates.
+    """
+    found: dict = {}
+    firsts: dict = {}
+    # Each entry is a dataset, its path, an iterator over its elements (None
+    # until the dataset is first visited), its digest, and where its spans of
+    # items and duplicates start.
+    stack = [[ds, (), None, None, 0, 0]]
+    while stack:
+        frame = stack[-1]
+        ds, path, elements, digest = frame[:4]
+        if elements is None:
+            if duplicates is not None and path:
+                digest = sequence_items.fingerprint(ds, found)
+                if digest in firsts:
+                    stack.pop()
+                    duplicates.append((ds, path, firsts[digest]))
+                    continue
+            elements = iter(ds)
+            frame[2:] = elements, digest, len(items), len(duplicates or ())
+        elem = next(elements, None)
+        if elem is None:
+            stack.pop()
+            if digest is not None:
+                firsts.setdefault(
+                    digest, (path, frame[4], len(items), frame[5], len(duplicates))
+                )
+            continue
+        if elem.tag in _STRUCTURAL_TAGS:
+            continue
+        if elem.VR == "SQ":
+            # The first item on top, so items are collected in order.
+            tag = int(elem.tag)
+            stack.extend(
+                [sub_ds, path + ((tag, i),), None, None, 0, 0]
+                for i, sub_ds in reversed(list(enumerate(elem.value)))
+                if isinstance(sub_ds, dicom.dataset.Dataset)
+            )
+            continue
+        if private_only and (not elem.tag.is_private or elem.tag.is_private_creator):
+            # Only scrub private data elements; leave standard attributes (the
+            # caller already handled them) and private creators (scrubbing them
+            # would corrupt the block's creator-to-data mapping) untouched.
+            continue
+        if not _is_redactable(elem):
+            continue
+        if elem.VR == "CS" and defined_terms.only_defined_terms(
+            elem.tag, _text_values(elem) or ()
+        ):
+            # Only terms of the standard: nothing to analyse or redact.
+            continue
+        decision = template.lookup(path, elem) if template is not None else None
+        items.append((ds, elem, path, decision))
+
+
+def _anonymise_datasets(jobs: list,
+                        analyser: AnalyzerEngine,
+                        anonymizer: AnonymizerEngine,
+                        score_threshold: float,
+                        gliner_pii=None,
+                        private_only: bool = False,
+                        cache: RedactionCache | None = None,
+                        template: HeaderTemplate | None = None,
+                        batch_size: int = 32,
+                        routes: dict | None = None,
+                        cascade: Cascade | None = None,
+                        workers: int = 1) -> None:
+    """Anonymises the headers of several datasets in-place, in one batch.
+
+    The free-text values of every dataset (e.g. the files of a series) are
+    collected first and analysed together, one batch per route (the entities
+    looked for, see entity_routing), then the redactions are written back to
+    their elements and multi-value positions.
+
+    Parameters
+    ----------
+    jobs : list of (pydicom.dataset.Dataset, list)
+        Each dataset with the list its flagged-header records are appended to.
+
+    See _anonymise_ds for the other parameters.
+    """
+    collected = []
+    for ds, anonymised_headers in jobs:
+        items: list = []
+        duplicates: list = []
+        _collect_elements(ds, private_only, template, items, duplicates)
+        collected.append((items, duplicates, anonymised_headers))
+    routed: dict = {}
+    for items, _, _ in collected:
+        for _, elem, _, decision in items:
+            if decision is None and elem.VR in _TEXT_VRS:
+                entities = entity_routing.entities_for(elem.tag, elem.VR, routes)
+                routed.setdefault(entities, []).extend(_text_values(elem) or ())
+    redacted = {
+        entities: _redact_texts(texts, analyser, anonymizer, score_threshold,
+                                gliner_pii, cache, batch_size, entities, cascade, workers)
+        for entities, texts in routed.items()
+    }
+    for items, duplicates, anonymised_headers in collected:
+        decisions = []
+        for ds, elem, path, decision in items:
+            if decision is None:
+                entities = entity_routing.entities_for(elem.tag, elem.VR, routes)
+                decision = _redact_element(elem, redacted.get(entities, {}))
+                if template is not None:
+                    template.record(path, elem, decision)
+            _apply_decision(ds, elem, decision, anonymised_headers)
+            decisions.append(decision)
+        _replay_duplicates(items, decisions, duplicates, anonymised_headers)
+
+
+def _replay_duplicates(
+    items: list, decisions: list, duplicates: list, anonymised_headers: list
+) -> None:
+    """Redacts the duplicate items _collect_elements skipped as the identical
+    items met before them were redacted.
+
+    items and decisions are the elements collected and the decisions applied
+    to them. The changes made within the first item of each duplicate (its
+    span of items, and of duplicates within it, replayed before it) are made
+    again at the same places within the duplicate.
+    """
+    replayed = []
+    changes: dict = {}
+    for item, path, first in duplicates:
+        first_path, start, end, duplicates_start, duplicates_end = first
+        if first not in changes:
+            changes[first] = [
+                (items[k][2], items[k][1].tag, decisions[k])
+                for k in range(start, end)
+                if decisions[k][0] is not _UNCHANGED or decisions[k][1]
+            ] + [
+                change
+                for j in range(duplicates_start, duplicates_end)
+                for change in replayed[j]
+            ]
+        depth = len(first_path)
+        applied = []
+        for change_path, tag, decision in changes[first]:
+            relative = change_path[depth:]
+            ds = sequence_items.at(item, relative)
+            _apply_decision(ds, ds[tag], decision, anonymised_headers)
+            applied.append((path + relative, tag, decision))
+        replayed.append(applied)
+
+
 def _anonymise_ds(ds: dicom.dataset.Dataset,
                   analyser: AnalyzerEngine,
                   anonymizer: AnonymizerEngine,
@@ -420,109 +1131,486 @@ def _anonymise_ds(ds: dicom.dataset.Dataset,
                   gliner_pii=None,
                   use_case: str='Standard',
                   anonymised_headers: list | None = None,
-                  private_only: bool = False) -> None:
-    """Recursively anonymises all elements in a DICOM dataset in-place.
+                  private_only: bool = False,
+                  cache: RedactionCache | None = None,
+                  template: HeaderTemplate | None = None,
+                  batch_size: int = 32,
+                  routes: dict | None = None,
+                  cascade: Cascade | None = None,
+                  workers: int = 1) -> None:
+    """Anonymises all elements in a DICOM dataset, sequence items included, in-place.
 
     When ``private_only`` is True, only private attributes have their values
     scanned/redacted; standard attributes are left untouched (the caller has
     already de-identified them, e.g. via the PS3.15 Basic Profile). Sequences
-    are still recursed into so private attributes nested inside them are reached.
+    are still walked into so private attributes nested inside them are reached.
+
+    The elements of the whole sequence tree, however deep, are collected first
+    (see _collect_elements), and all their free-text values, deduplicated
+    across items, are analysed in one batch of up to
+    ``batch_size`` texts per NLP call. Items identical to an earlier one (see
+    sequence_items) are not walked: the redactions of the earlier item are
+    replayed on them. When a ``cache`` is given, values already
+    seen by the same pipeline are redacted from the cache instead of being
+    re-analysed. When a ``template`` is given, elements unchanged from the
+    series template replay its decisions instead of being analysed (see
+    HeaderTemplate). When ``routes`` is given, each value is analysed only for
+    the entities its tag is routed to (see entity_routing); every value is
+    analysed for every entity if None. When a ``cascade`` is given, the
+    analysis runs in stages, cheapest first (see cascade.Cascade). With more
+    than one of the ``workers``, spaCy parses the values in that many
+    processes (see _analyse_texts).
     """
     if anonymised_headers is None:
         anonymised_headers = []
-    for elem in ds:
-        if elem.tag in _STRUCTURAL_TAGS:
-            continue
-        if elem.VR == "SQ":
-            for sub_ds in elem.value:
-                if not isinstance(sub_ds, dicom.dataset.Dataset):
-                    continue
-                _anonymise_ds(
-                    sub_ds, analyser, anonymizer, score_threshold,
-                    gliner_pii, use_case,
-                    anonymised_headers, private_only
+    _anonymise_datasets([(ds, anonymised_headers)], analyser, anonymizer,
+                        score_threshold, gliner_pii, private_only, cache,
+                        template, batch_size, routes, cascade, workers)
+
+
+# Private tag holding the list of flagged headers. UT rather than LT because
+# the list can exceed LT's 10240-character limit.
+_FLAGGED_HEADERS_DICT_ENTRIES = {
+    0x02091000: ('UT', '1', 'Flagged Headers PHI-Finder'),
+    0x02091001: ('UT', '1', 'Burned-in Text Screen PHI-Finder'),
+}
+_private_dict_registered = False
+
+
+def _register_private_dictionary() -> None:
+    """Registers phi-finder's private tags with pydicom, once per process."""
+    global _private_dict_registered
+    if not _private_dict_registered:
+        add_private_dict_entries(private_creator="phi-finder",
+                                 new_entries_dict=_FLAGGED_HEADERS_DICT_ENTRIES)
+        _private_dict_registered = True
+
+
+class AnonymisationSession:
+    """Anonymises many DICOM datasets with one configuration.
+
+    Everything that does not depend on the dataset is done once, when the
+    session is created: the use case is resolved, the engines it needs are
+    built (or taken from the process-wide registry, see engines) and the
+    private dictionary is registered. A cache of header-value redactions is
+    shared by every dataset of the session.
+
+    Parameters
+    ----------
+    use_case : str, optional (default 'Standard')
+        How headers are de-identified; see anonymise_image.
+
+    score_threshold : float, optional (default 0.5)
+        The score threshold for entity recognition.
+
+    spacy_model_name : str, optional (default "en_core_web_md")
+        The spaCy model of the analyser, when it is not passed in.
+
+    analyser : AnalyzerEngine, optional
+        Presidio analyser engine. Taken from the registry if needed and not
+        provided.
+
+    anonymizer : AnonymizerEngine, optional
+        Presidio anonymizer engine. Taken from the registry if needed and not
+        provided.
+
+    image_redactor : DicomImageRedactorEngine, optional
+        It redacts burned-in PHI from the pixel data.
+
+    gliner_pii : UniEncoderSpanGLiNER, optional
+        If set, the model will be used for anonymisation on top of Presidio's output.
+
+    use_transformers : bool, optional (default False)
+        If True and gliner_pii is not given, the registry's GLiNER model is
+        used on the headers of the non-PS3.15 use cases.
+
+    redact_pixels : bool, optional (default False)
+        If True and image_redactor is not given, the registry's image
+        redactor is used on the pixel data.
+
+    destroy_pixels : bool, optional (default False)
+        If True, the pixel data is replaced by a small black matrix (see
+        destroy_pixels) after anonymisation.
+
+    preserve_geometry : bool, optional (default False)
+        With destroy_pixels, the pixel data is zeroed but keeps its rows,
+        columns, frames and samples per pixel, for tools that need the
+        original geometry. anonymise_file streams the zeros to the output
+        (see write_with_zero_pixels).
+
+    cache : RedactionCache, PersistentRedactionCache, str or Path, optional
+        Cache of header-value redactions. A path opens (or creates) the
+        on-disk cache there, shared with every other run and process using it
+        (see redaction_cache.PersistentRedactionCache). A new in-memory cache
+        is created if not given.
+
+    batch_size : int, optional (default 32)
+        Number of header values run through the NLP engine per batch.
+
+    profile_overrides : dict of int to str, optional
+        For the PS3.15 use cases, actions replacing the Basic Profile's for
+        some tags (see ps3_15.CompiledProfile).
+
+    uid_map : UIDMap, str or Path, optional
+        For the PS3.15 use cases, where UID replacements are memoised (see
+        uid_map.UIDMap); a path is loaded as the table of mappings of an
+        earlier run. The process-wide map if None.
+
+    prescreen_sensitivity : float, optional
+        If set (between 0 and 1), each image is screened for burned-in text
+        (see burned_in_text.screen) before the image redactor runs, and only
+        the images that may carry text go through OCR. The decision is
+        recorded in the private element (0209,1001). Every image goes through
+        OCR if None.
+
+    series_ocr_sample : int, optional
+        If set, the slices of a series anonymised with a BoxTemplate (see
+        box_template, anonymise_many) share their burned-in text boxes: OCR
+        runs on the first series_ocr_sample slices, and on any later slice
+        whose pixels under the boxes differ from the last slice OCR'd; the
+        others only have the boxes filled in. Every image goes through OCR if
+        None.
+
+    routes : dict, optional
+        For the NER pipeline, the entities the values of each tag (or VR) are
+        analysed for (see entity_routing; entity_routing.DEFAULT_ROUTES is
+        faster but redacts less). None, the default, analyses every value for
+        every entity.
+
+    cascade : Cascade or bool, optional
+        If set, the NER pipeline runs in stages, cheapest first, and counts
+        and times each of them (see cascade.Cascade; True for the default
+        configuration). Every value goes through every stage if None.
+
+    stream_frames : bool, optional (default False)
+        If True, anonymise_file redacts the burned-in text of multi-frame
+        images one frame at a time (see frame_streaming), so memory no longer
+        grows with the number of frames. The output pixel data is native
+        (Explicit VR Little Endian).
+
+    frame_workers : int, optional (default 1)
+        With stream_frames, the number of threads redacting frames.
+
+    header_workers : int, optional (default 1)
+        The number of processes spaCy parses the header values of a dataset
+        (sequence items included) in, through nlp.pipe(n_process=...). Each
+        process loads its own copy of the pipeline, so it only pays off on
+        several cores and for datasets with many values (e.g. RT Structure
+        Sets); the recognizers and GLiNER still run in this process.
+    """
+
+    def __init__(self,
+                 use_case: str = 'Standard',
+                 score_threshold: float = 0.5,
+                 spacy_model_name: str = "en_core_web_md",
+                 analyser: AnalyzerEngine = None,
+                 anonymizer: AnonymizerEngine = None,
+                 image_redactor: DicomImageRedactorEngine = None,
+                 gliner_pii: UniEncoderSpanGLiNER = None,
+                 use_transformers: bool = False,
+                 redact_pixels: bool = False,
+                 destroy_pixels: bool = False,
+                 preserve_geometry: bool = False,
+                 cache: RedactionCache | PersistentRedactionCache | str | os.PathLike = None,
+                 batch_size: int = 32,
+                 profile_overrides: dict = None,
+                 uid_map: UIDMap | str | os.PathLike = None,
+                 prescreen_sensitivity: float = None,
+                 series_ocr_sample: int = None,
+                 stream_frames: bool = False,
+                 frame_workers: int = 1,
+                 routes: dict | None = None,
+                 cascade: Cascade | bool | None = None,
+                 header_workers: int = 1) -> None:
+        _register_private_dictionary()
+        self.use_case = use_case
+        self.score_threshold = score_threshold
+        self.ps3_15_mode = ps3_15.is_ps3_15_use_case(use_case)
+        self.scan_private = ps3_15.scan_private_headers(use_case)
+        self.retain_patient_characteristics = ps3_15.retain_patient_characteristics(use_case)
+        self.profile = None
+        if self.ps3_15_mode:
+            self.profile = (
+                ps3_15.CompiledProfile(
+                    self.retain_patient_characteristics,
+                    self.scan_private,
+                    profile_overrides,
                 )
-            continue
-        if private_only and (not elem.tag.is_private or elem.tag.is_private_creator):
-            # Only scrub private data elements; leave standard attributes (the
-            # caller already handled them) and private creators (scrubbing them
-            # would corrupt the block's creator-to-data mapping) untouched.
-            continue
-        if elem.VR == "PN" or elem.tag == (0x0010, 0x0010):
-            ds[elem.tag].value = PersonName("XXXX")
-            anonymised_headers.append({"tag": str(elem.tag), "name": elem.name})
-        elif elem.tag == (0x0010, 0x0040):  # Sex unchanged.
-            continue
-        elif elem.tag == (0x0010, 0x0030):  # Birthdate
-            birthdate_str = str(elem.value).strip()
-            if birthdate_str == "":
-                continue
-            year = None
-            for fmt in ("%Y%m%d", "%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%Y"):
-                try:
-                    year = datetime.strptime(birthdate_str, fmt).year
-                    break
-                except ValueError:
-                    continue
-            # Fail-safe: if the format is unrecognised, scrub the value so the
-            # original birthdate never survives in the dataset.
-            ds[elem.tag].value = f"{year:04d}0101" if year is not None else "19000101"
-            anonymised_headers.append({"tag": str(elem.tag), "name": elem.name})
-        elif elem.VR == "AS":
-            if str(elem.value).strip() in ("", "000Y"):
-                continue
-            ds[elem.tag].value = "000Y"
-            anonymised_headers.append({"tag": str(elem.tag), "name": elem.name})
-        elif elem.VR in [
-            "LO",  # Long String
-            "LT",  # Long Text
-            #"OW",  # Other Word
-            "SH",  # Short String
-            "ST",  # Short Text
-            "UC",  # Unlimited Characters
-            "UT",  # Unlimited Text
-            #"DA",  # Date
-            "CS",  # Code String
-        ]:  # https://dicom.nema.org/medical/dicom/current/output/html/part05.html#table_6.2-1 and https://pydicom.github.io/pydicom/stable/guides/element_value_types.html
-            try:
-                original = elem.value
-                if original is None:
-                    continue
-                is_multi = isinstance(original, dicom.multival.MultiValue)
-                if is_multi and len(original) == 0:
-                    continue
-                if not is_multi and original == "":
-                    continue
-                values = [str(v) for v in original] if is_multi else [str(original)]
-                new_values = []
-                for v in values:
-                    analyzer_results = analyser.analyze(text=v, language="en", score_threshold=score_threshold)
-                    redacted = anonymizer.anonymize(
-                        text=v,
-                        analyzer_results=analyzer_results,
-                        operators={"DEFAULT": OperatorConfig("replace", {"new_value": "XXXX"})},
-                    ).text
-                    if gliner_pii and len(redacted) > 30:
-                        redacted = _anonymise_with_transformer(gliner_pii, redacted, threshold=score_threshold, return_entities=False)
-                    new_values.append(redacted)
-                if new_values != values:
-                    anonymised_headers.append({"tag": str(elem.tag), "name": elem.name})
-                if is_multi:
-                    ds[elem.tag].value = dicom.multival.MultiValue(str, new_values)
-                else:
-                    ds[elem.tag].value = new_values[0]
-            except Exception as e:
-                # Fail closed: a value that could not be analysed may still
-                # contain PHI, so blank it rather than leave the original.
-                logger.error(
-                    "Failed to redact %s (%s), blanking it. %s: %s",
-                    elem.tag, elem.name, type(e).__name__, e,
+                if profile_overrides
+                else ps3_15.compile_profile(
+                    self.retain_patient_characteristics, self.scan_private
+                )
+            )
+        if uid_map is not None and not isinstance(uid_map, UIDMap):
+            uid_map = UIDMap(table=uid_map)
+        self.uid_map = uid_map
+        # The NER engines are needed for the full pipeline and for the private-header
+        # scan that the "..._scan_private" PS3.15 variants run on top of the profile.
+        self.scans_headers = not self.ps3_15_mode or self.scan_private
+        if self.scans_headers:
+            if analyser is None:
+                analyser = engines.get_analyser(score_threshold, spacy_model_name)
+            if anonymizer is None:
+                anonymizer = engines.get_anonymizer()
+        if image_redactor is None and redact_pixels:
+            image_redactor = engines.get_image_redactor(score_threshold, spacy_model_name)
+        if gliner_pii is None and use_transformers and not self.ps3_15_mode:
+            gliner_pii = engines.get_transformer()
+        self.analyser = analyser
+        self.anonymizer = anonymizer
+        self.image_redactor = image_redactor
+        self.gliner_pii = gliner_pii
+        self.destroy_pixels = destroy_pixels
+        self.preserve_geometry = preserve_geometry
+        if prescreen_sensitivity is not None and not 0.0 <= prescreen_sensitivity <= 1.0:
+            raise ValueError(
+                f"prescreen_sensitivity must be between 0 and 1, got {prescreen_sensitivity}"
+            )
+        self.prescreen_sensitivity = prescreen_sensitivity
+        if series_ocr_sample is not None and series_ocr_sample < 1:
+            raise ValueError(f"series_ocr_sample must be positive, got {series_ocr_sample}")
+        self.series_ocr_sample = series_ocr_sample
+        if frame_workers < 1:
+            raise ValueError(f"frame_workers must be positive, got {frame_workers}")
+        if header_workers < 1:
+            raise ValueError(f"header_workers must be positive, got {header_workers}")
+        self.stream_frames = stream_frames
+        self.routes = routes
+        self.cascade = Cascade() if cascade is True else (cascade or None)
+        self.frame_workers = frame_workers
+        self.header_workers = header_workers
+        if isinstance(cache, (str, os.PathLike)):
+            cache = PersistentRedactionCache(cache)
+        self.cache = cache if cache is not None else RedactionCache()
+        self.batch_size = batch_size
+
+    def read(self, path) -> dicom.dataset.FileDataset:
+        """Reads a DICOM file to be anonymised by the session.
+
+        When the session destroys the pixels (and does not redact them), the
+        original pixel data would only be thrown away, so just the header is
+        read (see read_header): memory and I/O no longer grow with the size
+        of the image.
+        """
+        if self.destroy_pixels and self.image_redactor is None:
+            return read_header(path)
+        return dicom.dcmread(path)
+
+    def box_template(self) -> BoxTemplate | None:
+        """A new BoxTemplate for the slices of one series, or None if the
+        session does not share burned-in text boxes (see series_ocr_sample)."""
+        if self.image_redactor is None or self.series_ocr_sample is None:
+            return None
+        return BoxTemplate(self.series_ocr_sample)
+
+    def anonymise_file(
+        self, src, dst, template: HeaderTemplate = None, boxes: BoxTemplate = None
+    ) -> None:
+        """Anonymises a DICOM file into another.
+
+        When the pixel data is left as it is (no image redactor and no
+        destroy_pixels), only the header is read and anonymised, and the
+        pixel data is copied from src to dst without being loaded (see
+        pixel_passthrough). When the pixels are destroyed with their geometry
+        preserved, the zeros are streamed to dst (see write_with_zero_pixels).
+        With stream_frames, the frames of a multi-frame
+        image are redacted one at a time (see frame_streaming). Otherwise the
+        file is read with read() and the anonymised dataset saved.
+
+        Parameters
+        ----------
+        src : str or Path
+            The DICOM file to be anonymised.
+
+        dst : str or Path
+            Where to save the anonymised file.
+
+        template : HeaderTemplate, optional
+            If set, the dataset is diffed against the template of its series
+            (see HeaderTemplate).
+
+        boxes : BoxTemplate, optional
+            If set, the burned-in text boxes of the series (see anonymise).
+        """
+        if self.image_redactor is None and not self.destroy_pixels:
+            header = pixel_passthrough.read_header_with_pixel_range(src)
+            if header is not None:
+                ds, pixel_range = header
+                ds = self.anonymise(ds, template=template)
+                if pixel_range is None or not any(elem.tag >= pixel_range.tag for elem in ds):
+                    pixel_passthrough.write_with_pixel_passthrough(ds, src, dst, pixel_range)
+                    return
+        elif self.image_redactor is None and self.preserve_geometry:
+            # Only the header is read (see read), and the zeros of the same
+            # geometry are streamed to dst.
+            write_with_zero_pixels(self._anonymise_header(self.read(src), template, None), dst)
+            return
+        elif self.image_redactor is not None and self.stream_frames and not self.destroy_pixels:
+            header = pixel_passthrough.read_header_with_pixel_range(src)
+            if header is not None and frame_streaming.streamable(*header):
+                self._anonymise_file_by_frame(src, dst, header[0], template)
+                return
+        self.anonymise(self.read(src), template=template, boxes=boxes).save_as(dst)
+
+    def anonymise(self,
+                  ds: dicom.dataset.FileDataset,
+                  template: HeaderTemplate = None,
+                  boxes: BoxTemplate = None) -> dicom.dataset.FileDataset:
+        """Anonymises one DICOM dataset, in place.
+
+        Parameters
+        ----------
+        ds : pydicom.dataset.FileDataset
+            The DICOM dataset to be anonymised.
+
+        template : HeaderTemplate, optional
+            If set, the dataset is diffed against the template of its series
+            (see HeaderTemplate).
+
+        boxes : BoxTemplate, optional
+            If set (and there is an image redactor), the burned-in text boxes
+            of the dataset's series: the image goes through OCR only if the
+            template needs it, and the boxes found on the series so far are
+            filled in (see BoxTemplate), even on a slice the burned-in text
+            screen passes. Pass the same template for every slice of one
+            series, in order.
+
+        Returns
+        -------
+        pydicom.dataset.FileDataset
+            The anonymised DICOM.
+        """
+        screening = None
+        if self.image_redactor is not None and self.prescreen_sensitivity is not None:
+            screening = burned_in_text.screen(ds, self.prescreen_sensitivity)
+        if self.image_redactor is not None and (screening is None or screening.needs_ocr):
+            if boxes is not None:
+                ds = boxes.redact(ds, self._ocr)
+            else:
+                ds = self.image_redactor.redact(
+                    ds,
+                    fill="contrast",
+                    score_threshold=self.score_threshold,
+                    ocr_kwargs={"config": "--psm 11 --oem 1"},
+                )  # fill="background") --psm 11 ("sparse text)
+        elif self.image_redactor is not None and boxes is not None:
+            # The screen only decides whether OCR runs: the boxes already
+            # found on the series are filled on every slice, as faint text
+            # under them may pass the screen.
+            ds = boxes.fill(ds)
+        # operators = {"DEFAULT": OperatorConfig("replace", {"new_value": "[XXXX]"})}
+        ds = self._anonymise_header(ds, template, screening)
+        if self.destroy_pixels:
+            ds = destroy_pixels(ds, self.preserve_geometry)
+        return ds
+
+    def _anonymise_header(
+        self,
+        ds: dicom.dataset.FileDataset,
+        template: HeaderTemplate | None,
+        screening: burned_in_text.ScreenResult | None,
+    ) -> dicom.dataset.FileDataset:
+        """Anonymises the header of ds, once its pixel data is redacted, and
+        records the flagged headers and the burned-in text screen."""
+        anonymised_headers = []
+        if self.ps3_15_mode:
+            ps3_15.apply_basic_profile(
+                ds, anonymised_headers, profile=self.profile, uid_map=self.uid_map
+            )
+            if self.scan_private:
+                # Private attributes were kept by the profile; scrub PHI from their
+                # values with the NER pipeline instead of removing them outright.
+                _anonymise_ds(ds, self.analyser, self.anonymizer, self.score_threshold,
+                              self.gliner_pii, self.use_case, anonymised_headers,
+                              private_only=True, cache=self.cache, template=template,
+                              batch_size=self.batch_size, routes=self.routes,
+                              cascade=self.cascade, workers=self.header_workers)
+        else:
+            _anonymise_ds(ds, self.analyser, self.anonymizer, self.score_threshold,
+                          self.gliner_pii, self.use_case, anonymised_headers,
+                          cache=self.cache, template=template,
+                          batch_size=self.batch_size, routes=self.routes,
+                          cascade=self.cascade, workers=self.header_workers)
+        '''
+        Adding a private header with the flagged headers list.
+        private_block() reserves a slot (e.g., 0x10) and writes the creator name
+        at (0x0209, 0x0010). The actual data then lives at (0x0209, 0x10XX).
+        Then, ds.add_new([0x0209, 0x0010], ...) overwrites the Private Creator
+        element itself.
+        '''
+        flagged_headers = json.dumps(anonymised_headers)
+        block = ds.private_block(0x0209, "phi-finder", create=True)
+        # 0x00 offset within block → maps to (0x0209, 0x1000)
+        block.add_new(0x00, 'UT', flagged_headers)
+        if screening is not None:
+            # Audit trail of the burned-in text pre-screen, at (0x0209, 0x1001).
+            block.add_new(0x01, 'UT', json.dumps(screening._asdict()))
+        return ds
+
+    def _anonymise_file_by_frame(
+        self, src, dst, ds: dicom.dataset.FileDataset, template: HeaderTemplate | None
+    ) -> None:
+        """Anonymises the multi-frame file src, whose header is ds, redacting
+        its frames one at a time."""
+        screenings = []
+
+        def redact(frame_ds):
+            if self.prescreen_sensitivity is not None:
+                screening = burned_in_text.screen(frame_ds, self.prescreen_sensitivity)
+                screenings.append(screening)
+                if not screening.needs_ocr:
+                    return frame_ds
+            return self.image_redactor.redact(
+                frame_ds,
+                fill="contrast",
+                score_threshold=self.score_threshold,
+                ocr_kwargs={"config": "--psm 11 --oem 1"},
+            )
+
+        frames_path = Path(f"{dst}.frames")
+        try:
+            with open(frames_path, "wb") as frames:
+                length = frame_streaming.redact_frames(
+                    src, ds, redact, frames, self.frame_workers
                 )
-                try:
-                    ds[elem.tag].value = ""
-                except Exception:
-                    del ds[elem.tag]
-                anonymised_headers.append({"tag": str(elem.tag), "name": elem.name})
+            screening = burned_in_text.combine(screenings) if screenings else None
+            ds = self._anonymise_header(ds, template, screening)
+            frame_streaming.write_with_frames(ds, dst, frames_path, length)
+        finally:
+            frames_path.unlink(missing_ok=True)
+
+    def _ocr(self, ds: dicom.dataset.FileDataset) -> tuple:
+        """Redacts the burned-in text of ds; returns it with the boxes filled."""
+        return self.image_redactor.redact_and_return_bbox(
+            ds,
+            fill="contrast",
+            score_threshold=self.score_threshold,
+            ocr_kwargs={"config": "--psm 11 --oem 1"},
+        )
+
+    def anonymise_many(self, datasets, series_mode: bool = True):
+        """Anonymises the datasets of one series, one at a time.
+
+        Parameters
+        ----------
+        datasets : iterable of pydicom.dataset.FileDataset
+            The datasets to be anonymised. They are consumed lazily, so a
+            generator reading the files keeps one dataset in memory at a time.
+
+        series_mode : bool, optional (default True)
+            If True, the datasets share a HeaderTemplate: the first is
+            analysed in full and the later ones only where they differ. With
+            series_ocr_sample, they share a BoxTemplate too.
+
+        Yields
+        ------
+        pydicom.dataset.FileDataset
+            The anonymised DICOMs, in input order.
+        """
+        template = HeaderTemplate() if series_mode else None
+        boxes = self.box_template() if series_mode else None
+        for ds in datasets:
+            yield self.anonymise(ds, template=template, boxes=boxes)
 
 
 def anonymise_image(ds: dicom.dataset.FileDataset,
@@ -531,12 +1619,19 @@ def anonymise_image(ds: dicom.dataset.FileDataset,
                     image_redactor: DicomImageRedactorEngine = None,
                     score_threshold: float=0.5,
                     gliner_pii: UniEncoderSpanGLiNER=None,
-                    use_case: str='Standard') -> dicom.dataset.FileDataset:
+                    use_case: str='Standard',
+                    cache: RedactionCache=None,
+                    template: HeaderTemplate=None,
+                    batch_size: int=32,
+                    prescreen_sensitivity: float=None,
+                    boxes: BoxTemplate=None) -> dicom.dataset.FileDataset:
     """Anonymises a DICOM image by redacting personal information.
 
     This function processes the DICOM dataset, redacting personal names and other
     identifiable information based on the specified score threshold. It utilises
     named entity recognition pipelines to identify and replace sensitive information.
+    It is a one-off AnonymisationSession; create a session instead to anonymise
+    many datasets with the same configuration.
 
     Parameters
     ----------
@@ -544,10 +1639,12 @@ def anonymise_image(ds: dicom.dataset.FileDataset,
         The DICOM dataset containing the image data and metadata to be anonymised.
     
     analyser : AnalyzerEngine, optional
-        Presidio analyser engine. Built automatically if not provided.
+        Presidio analyser engine. If not provided, the engine shared by the
+        process for score_threshold is used (see engines.get_analyser).
 
     anonymizer : AnonymizerEngine, optional
-        Presidio anonymizer engine. Built automatically if not provided.
+        Presidio anonymizer engine. If not provided, the engine shared by the
+        process is used (see engines.get_anonymizer).
 
     image_redactor : DicomImageRedactorEngine, optional
         It redacts burned-in PHI from the pixel data.
@@ -574,54 +1671,42 @@ def anonymise_image(ds: dicom.dataset.FileDataset,
         Presidio NER pipeline (plus GLiNER when gliner_pii is given) and
         redacted.
 
+    cache : RedactionCache, optional
+        If set, header values are memoised in it, so strings repeated across
+        the files of a series are analysed only once. Share one cache between
+        calls to benefit from it.
+
+    template : HeaderTemplate, optional
+        If set, the dataset is diffed against the template of its series:
+        elements unchanged from the template replay its redaction decisions
+        and only the differing ones are analysed. Pass the same (initially
+        empty) template for every file of one series.
+
+    batch_size : int, optional (default 32)
+        Number of header values run through the NLP engine per batch.
+
+    prescreen_sensitivity : float, optional
+        If set, the image goes through the image redactor only if a cheap
+        screen finds it may carry burned-in text; see AnonymisationSession.
+
+    boxes : BoxTemplate, optional
+        If set, the burned-in text boxes of the image's series: OCR runs only
+        on the slices that need it and the boxes found on the series are
+        filled in (see series_boxes.BoxTemplate). Pass the same template for
+        every slice of one series, in order.
+
     Returns
     -------
     pydicom.dataset.FileDataset
         The anonymised DICOM.
     """
-    new_dict_items = {
-        # Private tag to store the list of anonymised headers. UT rather than
-        # LT because the list can exceed LT's 10240-character limit.
-        0x02091000: ('UT', '1', 'Flagged Headers PHI-Finder')
-    }
-    add_private_dict_entries(private_creator="phi-finder", new_entries_dict=new_dict_items)
-
-    ps3_15_mode = ps3_15.is_ps3_15_use_case(use_case)
-    scan_private = ps3_15.scan_private_headers(use_case)
-    # The NER engines are needed for the full pipeline and for the private-header
-    # scan that the "..._scan_private" PS3.15 variants run on top of the profile.
-    if not ps3_15_mode or scan_private:
-        if analyser is None:
-            analyser = _build_presidio_analyser(score_threshold)
-        if anonymizer is None:
-            anonymizer = AnonymizerEngine()
-    if image_redactor is not None:
-        ds = image_redactor.redact(ds, fill="contrast", score_threshold=score_threshold, ocr_kwargs={"config": "--psm 11 --oem 1"})  # fill="background") --psm 11 ("sparse text)
-    # operators = {"DEFAULT": OperatorConfig("replace", {"new_value": "[XXXX]"})}
-
-    anonymised_headers = []
-    if ps3_15_mode:
-        ps3_15.apply_basic_profile(
-            ds, anonymised_headers,
-            retain_patient_characteristics=ps3_15.retain_patient_characteristics(use_case),
-            scan_private=scan_private,
-        )
-        if scan_private:
-            # Private attributes were kept by the profile; scrub PHI from their
-            # values with the NER pipeline instead of removing them outright.
-            _anonymise_ds(ds, analyser, anonymizer, score_threshold,
-                          gliner_pii, use_case, anonymised_headers,
-                          private_only=True)
-    else:
-        _anonymise_ds(ds, analyser, anonymizer, score_threshold,
-                      gliner_pii, use_case, anonymised_headers)
-    '''
-    Adding a private header with the flagged headers list.
-    private_block() reserves a slot (e.g., 0x10) and writes the creator name at (0x0209, 0x0010).
-    The actual data then lives at (0x0209, 0x10XX).
-    Then, ds.add_new([0x0209, 0x0010], ...) overwrites the Private Creator element itself.
-    '''
-    flagged_headers = json.dumps(anonymised_headers)
-    block = ds.private_block(0x0209, "phi-finder", create=True)
-    block.add_new(0x00, 'UT', flagged_headers)  # 0x00 offset within block → maps to (0x0209, 0x1000)
-    return ds
+    session = AnonymisationSession(use_case=use_case,
+                                   score_threshold=score_threshold,
+                                   analyser=analyser,
+                                   anonymizer=anonymizer,
+                                   image_redactor=image_redactor,
+                                   gliner_pii=gliner_pii,
+                                   cache=cache,
+                                   batch_size=batch_size,
+                                   prescreen_sensitivity=prescreen_sensitivity)
+    return session.anonymise(ds, template=template, boxes=boxes)
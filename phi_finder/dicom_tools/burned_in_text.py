@@ -0,0 +1,232 @@
+"""Cheap pre-screen for burned-in text, run before OCR.
+
+OCR of the whole image is by far the most expensive step of redacting the
+pixel data, and most slices (CT, MR) carry no burned-in text at all. Burned-in
+annotations are glyphs drawn in one flat, high-contrast colour, usually along
+the edges of the image: many thin strokes, one or two pixels wide, both
+across the rows and across the columns of a small area, all at the brightest
+(or darkest) level of that area. Noise, anatomy and the background rarely
+look like that. The screen measures, with a few vectorised NumPy operations
+per frame (and per frame shrunk by half, for larger glyphs), the density of
+such stroke pixels in the tiles of the image's border, and sends the image to
+OCR only if a tile looks like text. Every frame of a multi-frame image is
+screened (cine and ultrasound clips may annotate a few frames only), unless
+the caller caps the number, in which case a clean sample still goes to OCR.
+
+The screen is a filter in front of OCR, not a text detector: it is tuned to
+miss as little as possible (see benchmarks/bench_burned_in_screen.py), and an
+image is always sent to OCR when it cannot be screened.
+"""
+import logging
+from collections import namedtuple
+
+import numpy as np
+import pydicom as dicom
+
+logger = logging.getLogger(__name__)
+
+# needs_ocr: whether the image should go through OCR; score: the text-likeness
+# of its most text-like border tile (None if not measured); threshold: the
+# score from which OCR is needed; reason: what the decision rests on.
+ScreenResult = namedtuple("ScreenResult", ["needs_ocr", "score", "threshold", "reason"])
+
+# Score of a border tile from which OCR is needed at sensitivity 0 (the
+# least sensitive); the threshold falls linearly to 0 at sensitivity 1.
+_MAX_THRESHOLD = 0.1
+# A stroke stands out from its surroundings by at least this fraction of
+# the frame's dynamic range.
+_CONTRAST = 0.2
+# A pixel is ink if it is within this fraction of the dynamic range of the
+# brightest (or darkest) pixel of its tile.
+_INK_TOLERANCE = 0.05
+# Frames are also scored shrunk by these factors, so the wider strokes of
+# larger glyphs count too.
+_SCALES = (1, 2)
+# Percentiles of the intensities taken as the frame's dynamic range, so a
+# few outliers (e.g. metal) do not flatten everything else.
+_RANGE_PERCENTILES = (1.0, 99.9)
+
+
+def _threshold(sensitivity: float) -> float:
+    if not 0.0 <= sensitivity <= 1.0:
+        raise ValueError(f"sensitivity must be between 0 and 1, got {sensitivity}")
+    return _MAX_THRESHOLD * (1.0 - sensitivity)
+
+
+def _frames(ds: dicom.dataset.Dataset, max_frames: int | None) -> tuple:
+    """The number of frames of ds, and an iterator over up to max_frames of
+    them (every frame if None; otherwise first, last and evenly in between)
+    as grey levels of shape (rows, columns), converted one at a time."""
+    pixels = ds.pixel_array
+    samples = int(ds.get("SamplesPerPixel", 1) or 1)
+    if samples > 1:
+        pixels = pixels.reshape(-1, *pixels.shape[-3:])
+    else:
+        pixels = pixels.reshape(-1, *pixels.shape[-2:])
+    n_frames = len(pixels)
+    indices = range(n_frames)
+    if max_frames is not None and n_frames > max_frames:
+        indices = np.linspace(0, n_frames - 1, max_frames).round().astype(int)
+    luminance = str(ds.get("PhotometricInterpretation", "")).startswith("YBR")
+
+    def grey(frame: np.ndarray) -> np.ndarray:
+        if samples > 1:
+            # The luminance: Y of YBR, the mean of RGB.
+            frame = frame[..., 0] if luminance else frame.mean(axis=-1)
+        return frame.astype(np.float32, copy=False)
+
+    return n_frames, (grey(pixels[index]) for index in indices)
+
+
+def _shrink(frame: np.ndarray, factor: int) -> np.ndarray:
+    """frame averaged over blocks of factor x factor pixels."""
+    if factor == 1:
+        return frame
+    rows, columns = frame.shape[0] // factor, frame.shape[1] // factor
+    return (
+        frame[: rows * factor, : columns * factor]
+        .reshape(rows, factor, columns, factor)
+        .mean(axis=(1, 3))
+    )
+
+
+def _stroke_count(
+    centre: np.ndarray, neighbours: list, step: float, ink: np.ndarray, shape: tuple
+) -> np.ndarray:
+    """Per tile, the number of ink pixels on a stroke one or two pixels wide
+    along one direction.
+
+    neighbours are the pixels 1 and 2 before and 1 and 2 after the centre.
+    A pixel is on a stroke if, on both sides, the pixel next to it or the one
+    after that differs from it by more than step (the same way on both sides).
+    """
+    before_1, before_2, after_1, after_2 = (centre - neighbour for neighbour in neighbours)
+    brighter = ((before_1 > step) | (before_2 > step)) & ((after_1 > step) | (after_2 > step))
+    darker = ((before_1 < -step) | (before_2 < -step)) & ((after_1 < -step) | (after_2 < -step))
+    return ((brighter | darker).reshape(shape) & ink).sum(axis=(1, 3))
+
+
+def _tile_scores(frame: np.ndarray, tile: int, border: float) -> np.ndarray:
+    """Text-likeness of the border tiles of one frame."""
+    # Estimated on every other pixel of every other row: a quarter of the cost.
+    low, high = np.percentile(frame[::2, ::2], _RANGE_PERCENTILES)
+    if high <= low:
+        return np.zeros(1, dtype=np.float32)  # Flat frame.
+    # Padded with NaNs, which make no strokes and are not counted, to whole
+    # tiles plus the two pixels around them the strokes are measured against.
+    rows, columns = (
+        -(-(frame.shape[0] - 4) // tile) * tile,
+        -(-(frame.shape[1] - 4) // tile) * tile,
+    )
+    frame = np.pad(frame, ((0, rows + 4 - frame.shape[0]), (0, columns + 4 - frame.shape[1])),
+                   constant_values=np.nan)
+    shape = (rows // tile, tile, columns // tile, tile)
+    centre = frame[2:-2, 2:-2]
+    tiles = centre.reshape(shape)
+    pixels = (~np.isnan(tiles)).sum(axis=(1, 3))
+    # Burned-in glyphs are drawn in one flat colour, the brightest (or the
+    # darkest) of their tile: the ridges of noise and anatomy (e.g. vessels)
+    # rarely reach either.
+    tolerance = _INK_TOLERANCE * (high - low)
+    ink = ((tiles >= np.nanmax(tiles, axis=(1, 3))[:, np.newaxis, :, np.newaxis] - tolerance)
+           | (tiles <= np.nanmin(tiles, axis=(1, 3))[:, np.newaxis, :, np.newaxis] + tolerance))
+    step = _CONTRAST * (high - low)
+    # Strokes of vertical lines (across the rows) and of horizontal ones.
+    across = [frame[2:-2, 1:-3], frame[2:-2, :-4], frame[2:-2, 3:-1], frame[2:-2, 4:]]
+    down = [frame[1:-3, 2:-2], frame[:-4, 2:-2], frame[3:-1, 2:-2], frame[4:, 2:-2]]
+    scores = (_stroke_count(centre, across, step, ink, shape)
+              + _stroke_count(centre, down, step, ink, shape)) / pixels
+    edge_rows = max(int(round(shape[0] * border)), 1)
+    edge_columns = max(int(round(shape[2] * border)), 1)
+    in_border = np.zeros(scores.shape, dtype=bool)
+    in_border[:edge_rows, :] = in_border[-edge_rows:, :] = True
+    in_border[:, :edge_columns] = in_border[:, -edge_columns:] = True
+    return scores[in_border]
+
+
+def screen(ds: dicom.dataset.Dataset,
+           sensitivity: float = 0.75,
+           tile: int = 16,
+           border: float = 0.2,
+           max_frames: int | None = None) -> ScreenResult:
+    """Decides whether the pixel data of ds needs OCR for burned-in text.
+
+    Parameters
+    ----------
+    ds : pydicom.dataset.Dataset
+        The DICOM dataset, with its pixel data.
+
+    sensitivity : float, optional (default 0.75)
+        Between 0 and 1. The higher, the more images are sent to OCR (and the
+        less likely text is to be missed); at 1 every image is.
+
+    tile : int, optional (default 16)
+        Side, in pixels, of the tiles the image is scored by.
+
+    border : float, optional (default 0.2)
+        Fraction of the tiles, from each edge of the image, that are screened.
+        1 screens the whole image.
+
+    max_frames : int, optional
+        If set, only this many frames of a multi-frame image are screened. A
+        sample without text-like tiles does not clear the image, which still
+        goes to OCR (frames that were not screened may carry annotations);
+        only a sample with text skips screening the rest. Every frame is
+        screened if None.
+
+    Returns
+    -------
+    ScreenResult
+        The decision, the score of the most text-like tile, the threshold it
+        was compared with and the reason of the decision.
+    """
+    threshold = _threshold(sensitivity)
+    if "PixelData" not in ds:
+        return ScreenResult(False, None, threshold, "no pixel data")
+    if str(ds.get("BurnedInAnnotation", "")).upper() == "YES":
+        return ScreenResult(True, None, threshold, "BurnedInAnnotation is YES")
+    if sensitivity >= 1.0:
+        return ScreenResult(True, None, threshold, "sensitivity 1")
+    try:
+        n_frames, frames = _frames(ds, max_frames)
+        score = None
+        screened = 0
+        for frame in frames:
+            screened += 1
+            frame_score = max(
+                float(_tile_scores(_shrink(frame, factor), tile, border).max())
+                for factor in _SCALES
+                if factor == 1 or min(frame.shape) // factor >= 2 * tile
+            )
+            score = frame_score if score is None else max(score, frame_score)
+            if score >= threshold:
+                # One frame with text is enough; the others need not be screened.
+                break
+    except Exception as e:
+        # Fail open: what cannot be screened is left to OCR.
+        logger.warning(
+            "Cannot screen the pixel data for burned-in text, sending it to OCR. %s: %s",
+            type(e).__name__,
+            e,
+        )
+        return ScreenResult(True, None, threshold, "pixel data not screened")
+    if score >= threshold:
+        return ScreenResult(True, score, threshold, "text-like border tile")
+    if screened < n_frames:
+        # A clean sample says nothing of the frames in between.
+        return ScreenResult(
+            True, score, threshold, f"only {screened} of {n_frames} frames screened"
+        )
+    return ScreenResult(False, score, threshold, "no text-like border tile")
+
+
+def combine(results: list) -> ScreenResult:
+    """One ScreenResult for the frames of an image screened one at a time.
+
+    The image needs OCR if any frame does; its score is that of its most
+    text-like frame.
+    """
+    scores = [result.score for result in results if result.score is not None]
+    sent = sum(result.needs_ocr for result in results)
+    return ScreenResult(sent > 0, max(scores) if scores else None, results[0].threshold,
+                        f"{sent} of {len(results)} frames sent to OCR")
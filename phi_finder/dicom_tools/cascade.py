@@ -0,0 +1,238 @@
+"""The header analysis as a cascade of stages, cheapest first.
+
+Without a cascade every header value goes through the whole Presidio pass
+(spaCy, then every recognizer) and GLiNER then runs on every value longer than
+30 characters. With one:
+
+1. patterns: the analyser's own compiled patterns and deny lists (the
+   recognizers that need neither spaCy nor context words) run on every value,
+   without the NLP pipeline;
+2. nlp: only the values that survive a triage (a capitalised or upper-case
+   word, two lower-case words, letters next to digits, an e-mail or URL) are
+   also run through spaCy and the remaining recognizers (spaCy's NER,
+   Presidio's predefined recognizers);
+3. gliner: GLiNER only sees the long values whose redacted text is still
+   ambiguous, i.e. would survive the triage again.
+
+Each stage keeps its own counters (values in, values with a hit) and time.
+"""
+import re
+import threading
+import time
+import weakref
+from collections import namedtuple
+
+StageInfo = namedtuple("StageInfo", ["values", "hits", "seconds"])
+
+STAGES = ("patterns", "nlp", "gliner")
+
+# Values worth the NLP stage: a capitalised word, an upper-case word (DICOM
+# text is often all upper case, e.g. "JOHN SMITH"), two lower-case words,
+# letters next to digits, an e-mail address or a URL. Only single lower-case
+# words, single letters and values without letters are left to the patterns.
+DEFAULT_TRIAGE = (
+    r"\b[A-Z][a-z]|\b[A-Z]{2,}\b|\b[a-z]{2,}\s+[a-z]{2,}\b"
+    r"|[A-Za-z]\d|\d[A-Za-z]|@|://|\bwww\."
+)
+
+# Entities of Presidio's predefined recognizers that only match text with a
+# digit in it.
+_DIGIT_ENTITIES = frozenset({
+    "CREDIT_CARD", "IBAN_CODE", "IP_ADDRESS", "MEDICAL_LICENSE", "PHONE_NUMBER", "UK_NHS",
+    "US_BANK_NUMBER", "US_DRIVER_LICENSE", "US_ITIN", "US_PASSPORT", "US_SSN",
+})
+_DIGIT = re.compile(r"\d")
+
+# The entities of the patterns stage, computed once per analyser instance.
+_PATTERN_ENTITIES: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _pattern_entities(analyser) -> frozenset:
+    """The entities only found by recognizers needing neither spaCy nor context.
+
+    Those are the analyser's compiled patterns (PatternRecognizer without
+    context words) and deny lists (DenyListRecognizer); an entity that any
+    other recognizer also reports is left to the NLP stage.
+    """
+    from presidio_analyzer import PatternRecognizer
+
+    from phi_finder.dicom_tools.deny_list_recognizer import DenyListRecognizer
+
+    try:
+        return _PATTERN_ENTITIES[analyser]
+    except (KeyError, TypeError):
+        pass
+    registry = getattr(analyser, "registry", None)
+    recognizers = registry.recognizers if registry is not None else []
+    cheap, other = set(), set()
+    for recognizer in recognizers:
+        if (
+            isinstance(recognizer, (PatternRecognizer, DenyListRecognizer))
+            and not recognizer.context
+        ):
+            cheap.update(recognizer.supported_entities)
+        else:
+            other.update(recognizer.supported_entities)
+    entities = frozenset(cheap - other)
+    try:
+        _PATTERN_ENTITIES[analyser] = entities
+    except TypeError:
+        pass
+    return entities
+
+
+class Cascade:
+    """Runs the header analysis in stages, and times and counts each stage.
+
+    Parameters
+    ----------
+    triage : str or callable, optional
+        Which values go on to the NLP stage: a regular expression searched in
+        the value (DEFAULT_TRIAGE if None), or a callable taking the value
+        and returning a bool.
+
+    gliner_min_length : int, optional (default 30)
+        Only redacted values longer than this are considered for GLiNER.
+    """
+
+    def __init__(self, triage=None, gliner_min_length: int = 30) -> None:
+        if triage is None:
+            triage = DEFAULT_TRIAGE
+        if isinstance(triage, str):
+            self._triage_pattern = triage
+            self._triage = re.compile(triage).search
+        else:
+            name = getattr(triage, "__qualname__", type(triage).__qualname__)
+            self._triage_pattern = f"{name}@{id(triage):x}"
+            self._triage = triage
+        self.gliner_min_length = gliner_min_length
+        self._stats = {stage: [0, 0, 0.0] for stage in STAGES}
+        self._lock = threading.Lock()
+
+    def fingerprint(self) -> str:
+        """Identifies the configuration, for the keys of a RedactionCache."""
+        return f"cascade:{self._triage_pattern}|{self.gliner_min_length}"
+
+    def survives_triage(self, text: str) -> bool:
+        """Whether text goes on to the NLP stage."""
+        return bool(self._triage(text))
+
+    def needs_gliner(self, redacted: str) -> bool:
+        """Whether a value, as redacted by Presidio, goes on to GLiNER."""
+        return len(redacted) > self.gliner_min_length and self.survives_triage(redacted)
+
+    def record(self, stage: str, values: int, hits: int, seconds: float) -> None:
+        """Adds to the counters of a stage."""
+        with self._lock:
+            stats = self._stats[stage]
+            stats[0] += values
+            stats[1] += hits
+            stats[2] += seconds
+
+    def info(self) -> dict[str, StageInfo]:
+        """The values in, values with a hit and time spent, per stage."""
+        with self._lock:
+            return {stage: StageInfo(*stats) for stage, stats in self._stats.items()}
+
+    def clear(self) -> None:
+        """Resets the counters."""
+        with self._lock:
+            self._stats = {stage: [0, 0, 0.0] for stage in STAGES}
+
+    def analyse(self, texts: list[str], analyser, score_threshold: float, analyse_batch,
+                entities: tuple | None = None) -> list:
+        """Runs the patterns and NLP stages over texts.
+
+        Parameters
+        ----------
+        texts : list of str
+            The values to analyse.
+
+        analyser : AnalyzerEngine
+            The Presidio analyser; the patterns stage runs its pattern and
+            deny-list recognizers, the NLP stage the others.
+
+        score_threshold : float
+            Confidence needed to flag an entity.
+
+        analyse_batch : callable
+            Runs the NLP stage: takes a list of texts and the entities to look
+            for, and returns one entry per text, its analyser results or the
+            exception raised (as anonymise_dicom._analyse_texts).
+
+        entities : tuple of str, optional
+            The entities looked for, all of them if None (see entity_routing).
+
+        Returns
+        -------
+        list
+            One entry per text: its analyser results, or the exception raised
+            while analysing it.
+        """
+        from presidio_analyzer import EntityRecognizer
+
+        if not texts:
+            return []
+        cheap = _pattern_entities(analyser)
+        wanted = set(
+            analyser.get_supported_entities(language="en")
+            if entities is None
+            else entities
+        )
+        first, second = sorted(wanted & cheap), sorted(wanted - cheap)
+
+        results: list = [[] for _ in texts]
+        if first:
+            # The recognizers are called directly, as AnalyzerEngine.analyze
+            # would (minus spaCy, and the context these ones do not use).
+            recognizers = analyser.registry.get_recognizers(language="en", entities=first)
+            start = time.perf_counter()
+            hits = 0
+            for i, text in enumerate(texts):
+                try:
+                    found = [
+                        result
+                        for recognizer in recognizers
+                        for result in recognizer.analyze(
+                            text=text, entities=first, nlp_artifacts=None
+                        )
+                        if result.score >= score_threshold
+                    ]
+                    results[i] = EntityRecognizer.remove_duplicates(found)
+                except Exception as e:
+                    results[i] = e
+                    continue
+                hits += bool(results[i])
+            self.record("patterns", len(texts), hits, time.perf_counter() - start)
+
+        if second:
+            # Values without a digit skip the recognizers that need one.
+            groups: dict = {}
+            for i, text in enumerate(texts):
+                if self.survives_triage(text):
+                    stage_entities = (
+                        second
+                        if _DIGIT.search(text)
+                        else [e for e in second if e not in _DIGIT_ENTITIES]
+                    )
+                    groups.setdefault(tuple(stage_entities), []).append(i)
+            start = time.perf_counter()
+            hits = 0
+            for stage_entities, survivors in groups.items():
+                analyses = (
+                    analyse_batch([texts[i] for i in survivors], stage_entities)
+                    if stage_entities
+                    else []
+                )
+                for i, analysis in zip(survivors, analyses):
+                    if isinstance(results[i], Exception):
+                        continue
+                    if isinstance(analysis, Exception):
+                        results[i] = analysis
+                        continue
+                    hits += bool(analysis)
+                    results[i] = list(results[i]) + list(analysis)
+            self.record(
+                "nlp", sum(map(len, groups.values())), hits, time.perf_counter() - start
+            )
+        return results
@@ -0,0 +1,257 @@
+"""Defined terms and enumerated values of DICOM Code String (CS) attributes.
+
+Built from the attribute descriptions of DICOM PS3.3 (release STANDARD_VERSION)
+and, for Body Part Examined, the defined terms of PS3.16 Annex L:
+https://dicom.nema.org/medical/dicom/current/output/chtml/part03/ps3.3.html
+https://dicom.nema.org/medical/dicom/current/output/chtml/part16/chapter_L.html
+
+Code strings are scanned with the NER pipeline because some of them may be
+typed in by hand (a vendor's ScanOptions, a site's BodyPartExamined), but
+most only ever hold terms of the standard: ScanningSequence 'SE', SequenceVariant
+'SK', Laterality 'L'. A value made only of terms listed here for its tag holds
+no PHI and skips the NER pipeline; so do not list tags whose values may
+include free terms (ImageType's third value onwards, ScanOptions in CT).
+
+Only terms are listed that the standard defines for the tag itself. A term
+missing here costs one NER call; a term that is not in the standard could let
+PHI through, so update STANDARD_VERSION along with the table.
+"""
+from collections.abc import Iterable
+
+from pydicom.tag import Tag
+
+STANDARD_VERSION = "2024c"
+
+_YES_NO = frozenset({"YES", "NO"})
+_Y_N = frozenset({"Y", "N"})
+_ROTATION_DIRECTION = frozenset({"CW", "CC", "NONE"})
+_ALGORITHM_TYPE = frozenset({"AUTOMATIC", "SEMIAUTOMATIC", "MANUAL"})
+
+_BODY_PARTS = frozenset({
+    "ABDOMEN", "ABDOMENPELVIS", "ADRENAL", "ANKLE", "AORTA", "ARM", "AXILLA", "BACK",
+    "BLADDER", "BRAIN", "BREAST", "BRONCHUS", "BUTTOCK", "CALCANEUS", "CALF", "CAROTID",
+    "CEREBELLUM", "CERVIX", "CHEEK", "CHEST", "CHESTABDOMEN", "CHESTABDPELVIS",
+    "CIRCLEOFWILLIS", "CLAVICLE", "COCCYX", "COLON", "CORNEA", "CORONARYARTERY",
+    "CSPINE", "CTSPINE", "DUODENUM", "EAR", "ELBOW", "ESOPHAGUS", "EXTREMITY", "EYE",
+    "EYELID", "FACE", "FEMUR", "FINGER", "FOOT", "FOREARM", "GALLBLADDER", "HAND",
+    "HEAD", "HEADNECK", "HEART", "HIP", "HUMERUS", "IAC", "ILEUM", "ILIUM", "JAW",
+    "JEJUNUM", "KIDNEY", "KNEE", "LARYNX", "LEG", "LIVER", "LSPINE", "LSSPINE", "LUNG",
+    "MAXILLA", "MEDIASTINUM", "MOUTH", "NECK", "NECKCHEST", "NECKCHESTABDOMEN",
+    "NECKCHESTABDPELV", "NOSE", "ORBIT", "OVARY", "PANCREAS", "PAROTID", "PATELLA",
+    "PELVIS", "PENIS", "PHARYNX", "PROSTATE", "RECTUM", "RIB", "SACRUM", "SCALP",
+    "SCAPULA", "SCLERA", "SCROTUM", "SHOULDER", "SKULL", "SPINE", "SPLEEN", "SSPINE",
+    "STERNUM", "STOMACH", "SUBMANDIBULAR", "TESTIS", "THIGH", "THUMB", "THYMUS",
+    "THYROID", "TOE", "TONGUE", "TRACHEA", "TSPINE", "TLSPINE", "UPRURINARYTRACT",
+    "URETER", "URETHRA", "UTERUS", "VAGINA", "VULVA", "WHOLEBODY", "WRIST", "ZYGOMA",
+})
+
+# Keys are tags (int): each value of the element must be one of the terms.
+DEFINED_TERMS: dict[int, frozenset[str]] = {
+    0x00080005: frozenset({  # Specific Character Set
+        "ISO_IR 6", "ISO_IR 100", "ISO_IR 101", "ISO_IR 109", "ISO_IR 110", "ISO_IR 144",
+        "ISO_IR 127", "ISO_IR 126", "ISO_IR 138", "ISO_IR 148", "ISO_IR 203", "ISO_IR 13",
+        "ISO_IR 166", "ISO_IR 192", "GB18030", "GBK",
+        "ISO 2022 IR 6", "ISO 2022 IR 100", "ISO 2022 IR 101", "ISO 2022 IR 109",
+        "ISO 2022 IR 110", "ISO 2022 IR 144", "ISO 2022 IR 127", "ISO 2022 IR 126",
+        "ISO 2022 IR 138", "ISO 2022 IR 148", "ISO 2022 IR 203", "ISO 2022 IR 13",
+        "ISO 2022 IR 166", "ISO 2022 IR 87", "ISO 2022 IR 159", "ISO 2022 IR 149",
+        "ISO 2022 IR 58",
+    }),
+    0x00080064: frozenset({  # Conversion Type
+        "DV", "DI", "DF", "WSD", "SD", "SI", "DRW", "SYN",
+    }),
+    0x00080068: frozenset({"FOR PRESENTATION", "FOR PROCESSING"}),  # Presentation Intent Type
+    0x00089205: frozenset({"MONOCHROME", "COLOR", "MIXED", "TRUE_COLOR"}),  # Pixel Presentation
+    0x00089206: frozenset({"VOLUME", "SAMPLED", "DISTORTED", "MIXED"}),  # Volumetric Properties
+    0x00089207: frozenset({  # Volume Based Calculation Technique
+        "MAX_IP", "MIN_IP", "VOLUME_RENDER", "SURFACE_RENDER", "MPR", "CURVED_MPR",
+        "NONE", "MIXED",
+    }),
+    0x00089208: frozenset({  # Complex Image Component
+        "MAGNITUDE", "PHASE", "REAL", "IMAGINARY", "MIXED",
+    }),
+    0x00089209: frozenset({  # Acquisition Contrast
+        "DIFFUSION", "FLOW_ENCODED", "FLUID_ATTENUATED", "PERFUSION", "PROTON_DENSITY", "STIR",
+        "TAGGING", "T1", "T2", "T2_STAR", "TOF", "UNKNOWN", "MIXED",
+    }),
+    0x00100022: frozenset({"TEXT", "RFID", "BARCODE"}),  # Type of Patient ID
+    0x00102203: frozenset({"ALTERED", "UNALTERED"}),  # Patient's Sex Neutered
+    0x00102210: frozenset({"BIPED", "QUADRUPED"}),  # Anatomical Orientation Type
+    0x001021A0: frozenset({"YES", "NO", "UNKNOWN"}),  # Smoking Status
+    0x00120062: _YES_NO,  # Patient Identity Removed
+    0x00180015: _BODY_PARTS,  # Body Part Examined
+    0x00180020: frozenset({"SE", "IR", "GR", "EP", "RM"}),  # Scanning Sequence
+    0x00180021: frozenset({  # Sequence Variant
+        "SK", "MTC", "SS", "TRSS", "SP", "MP", "OSP", "NONE",
+    }),
+    0x00180023: frozenset({"2D", "3D"}),  # MR Acquisition Type
+    0x00180025: _Y_N,  # Angio Flag
+    0x00180071: frozenset({  # Acquisition Termination Condition
+        "CNTS", "DENS", "RDD", "MANU", "OVFL", "TIME", "CARD_TRIG", "RESP_TRIG",
+    }),
+    0x00181048: frozenset({  # Contrast/Bolus Ingredient
+        "IODINE", "GADOLINIUM", "CARBON DIOXIDE", "BARIUM",
+    }),
+    0x00181140: frozenset({"CW", "CC"}),  # Rotation Direction
+    0x00181147: frozenset({"RECTANGLE", "ROUND", "HEXAGONAL"}),  # Field of View Shape
+    0x00181166: frozenset({  # Grid
+        "FIXED", "FOCUSED", "RECIPROCATING", "PARALLEL", "CROSSED", "NONE",
+    }),
+    0x00181301: frozenset({"1PS", "2PS", "PCN", "MSP"}),  # Whole Body Technique
+    0x00181312: frozenset({"ROW", "COL"}),  # In-plane Phase Encoding Direction
+    0x00181315: _Y_N,  # Variable Flip Angle Flag
+    0x00181600: frozenset({"RECTANGULAR", "CIRCULAR", "POLYGONAL"}),  # Shutter Shape
+    0x00185101: frozenset({  # View Position
+        "AP", "PA", "LL", "RL", "RLD", "LLD", "RLO", "LLO",
+    }),
+    0x00186031: frozenset({  # Transducer Type
+        "SECTOR_PHASED", "SECTOR_MECH", "SECTOR_ANNULAR", "LINEAR", "CURVED LINEAR",
+        "SINGLE CRYSTAL", "SPLIT XTAL CWD", "IV_PHASED", "IV_ROT XTAL", "IV_ROT MIRROR",
+        "ENDOCAV_PA", "ENDOCAV_MECH", "ENDOCAV_CLA", "ENDOCAV_AA", "ENDOCAV_LINEAR",
+        "VECTOR_PHASED",
+    }),
+    0x00187004: frozenset({"DIRECT", "SCINTILLATOR", "STORAGE", "FILM"}),  # Detector Type
+    0x00187005: frozenset({"AREA", "SLOT"}),  # Detector Configuration
+    0x00187060: frozenset({"MANUAL", "AUTOMATIC"}),  # Exposure Control Mode
+    0x00189004: frozenset({"PRODUCT", "RESEARCH", "SERVICE"}),  # Content Qualification
+    0x00189014: _YES_NO,  # Phase Contrast
+    0x00189100: frozenset({  # Resonant Nucleus
+        "1H", "3HE", "7LI", "13C", "19F", "23NA", "31P", "129XE",
+    }),
+    0x00200060: frozenset({"R", "L"}),  # Laterality
+    0x00200062: frozenset({"R", "L", "U", "B"}),  # Image Laterality
+    0x00209311: frozenset({  # Dimension Organization Type
+        "3D", "3D_TEMPORAL", "TILED_FULL", "TILED_SPARSE",
+    }),
+    0x00280051: frozenset({  # Corrected Image
+        "UNIF", "COR", "NCO", "DECY", "ATTN", "SCAT", "DTIM", "NRGY", "LIN", "MOTN", "PMOT",
+        "CLN", "RAN", "RADL", "DCAL", "NORM",
+    }),
+    0x00280300: frozenset({"YES", "NO", "BOTH"}),  # Quality Control Image
+    0x00280301: _YES_NO,  # Burned In Annotation
+    0x00280302: _YES_NO,  # Recognizable Visual Features
+    0x00280A02: frozenset({"GEOMETRY", "FIDUCIAL"}),  # Pixel Spacing Calibration Type
+    0x00281040: frozenset({"LIN", "LOG", "DISP"}),  # Pixel Intensity Relationship
+    0x00281056: frozenset({"LINEAR", "LINEAR_EXACT", "SIGMOID"}),  # VOI LUT Function
+    0x00281350: _YES_NO,  # Partial View
+    0x00282110: frozenset({"00", "01"}),  # Lossy Image Compression
+    0x00282114: frozenset({  # Lossy Image Compression Method
+        "ISO_10918_1", "ISO_14495_1", "ISO_15444_1", "ISO_15444_15", "ISO_18181_1",
+        "ISO_13818_2", "ISO_14496_10", "ISO_23008_2",
+    }),
+    0x003A0004: frozenset({"ORIGINAL", "DERIVED"}),  # Waveform Originality
+    0x0040A010: frozenset({  # Relationship Type
+        "CONTAINS", "HAS PROPERTIES", "HAS OBS CONTEXT", "HAS ACQ CONTEXT", "INFERRED FROM",
+        "SELECTED FROM", "HAS CONCEPT MOD",
+    }),
+    0x0040A040: frozenset({  # Value Type
+        "TEXT", "NUM", "CODE", "DATETIME", "DATE", "TIME", "UIDREF", "PNAME", "COMPOSITE",
+        "IMAGE", "WAVEFORM", "SCOORD", "SCOORD3D", "TCOORD", "CONTAINER", "TABLE",
+    }),
+    0x0040A050: frozenset({"SEPARATE", "CONTINUOUS"}),  # Continuity Of Content
+    0x0040A130: frozenset({  # Temporal Range Type
+        "POINT", "MULTIPOINT", "SEGMENT", "MULTISEGMENT", "BEGIN", "END",
+    }),
+    0x0040A491: frozenset({"PARTIAL", "COMPLETE"}),  # Completion Flag
+    0x0040A493: frozenset({"UNVERIFIED", "VERIFIED"}),  # Verification Flag
+    0x0040A496: frozenset({"PRELIMINARY", "FINAL"}),  # Preliminary Flag
+    0x00540202: frozenset({  # Type of Detector Motion
+        "STEP AND SHOOT", "CONTINUOUS", "ACQ DURING STEP",
+    }),
+    0x00541000: frozenset({  # Series Type
+        "STATIC", "DYNAMIC", "GATED", "WHOLE BODY", "IMAGE", "REPROJECTION",
+    }),
+    0x00541001: frozenset({  # Units
+        "CNTS", "NONE", "CM2", "CM2ML", "PCNT", "CPS", "BQML", "MGMINML", "UMOLMINML", "MLMING",
+        "MLG", "1CM", "UMOLML", "PROPCNTS", "PROPCPS", "MLMINML", "MLML", "GML", "STDDEV",
+    }),
+    0x00541002: frozenset({"EMISSION", "TRANSMISSION"}),  # Counts Source
+    0x00541004: frozenset({"SUM", "MAX PIXEL"}),  # Reprojection Method
+    0x00541100: frozenset({"NONE", "DLYD", "SING", "PDDL"}),  # Randoms Correction Method
+    0x00541102: frozenset({"NONE", "START", "ADMIN"}),  # Decay Correction
+    0x00620001: frozenset({"BINARY", "FRACTIONAL", "LABELMAP"}),  # Segmentation Type
+    0x00620008: _ALGORITHM_TYPE,  # Segment Algorithm Type
+    0x00620010: frozenset({"PROBABILITY", "OCCUPANCY"}),  # Segmentation Fractional Type
+    0x00700023: frozenset({  # Graphic Type
+        "POINT", "MULTIPOINT", "POLYLINE", "CIRCLE", "ELLIPSE",
+    }),
+    0x20500020: frozenset({"IDENTITY", "INVERSE"}),  # Presentation LUT Shape
+    0x30040002: frozenset({"GY", "RELATIVE"}),  # Dose Units
+    0x30040004: frozenset({"PHYSICAL", "EFFECTIVE", "ERROR"}),  # Dose Type
+    0x3004000A: frozenset({  # Dose Summation Type
+        "PLAN", "MULTI_PLAN", "FRACTION", "BEAM", "BRACHY", "FRACTION_SESSION", "BEAM_SESSION",
+        "BRACHY_SESSION", "CONTROL_POINT", "RECORD",
+    }),
+    0x30040014: frozenset({  # Tissue Heterogeneity Correction
+        "IMAGE", "ROI_OVERRIDE", "WATER",
+    }),
+    0x30060036: _ALGORITHM_TYPE,  # ROI Generation Algorithm
+    0x30060042: frozenset({  # Contour Geometric Type
+        "POINT", "OPEN_PLANAR", "OPEN_NONPLANAR", "CLOSED_PLANAR",
+    }),
+    0x300600A4: frozenset({  # RT ROI Interpreted Type
+        "EXTERNAL", "PTV", "CTV", "GTV", "TREATED_VOLUME", "IRRAD_VOLUME", "BOLUS", "AVOIDANCE",
+        "ORGAN", "MARKER", "REGISTRATION", "ISOCENTER", "CONTRAST_AGENT", "CAVITY",
+        "BRACHY_CHANNEL", "BRACHY_ACCESSORY", "BRACHY_SRC_APP", "BRACHY_CHNL_SHLD", "SUPPORT",
+        "FIXATION", "DOSE_REGION", "CONTROL", "DOSE_MEASUREMENT",
+    }),
+    0x300600B2: frozenset({  # ROI Physical Property
+        "REL_MASS_DENSITY", "REL_ELEC_DENSITY", "EFFECTIVE_Z", "EFF_Z_PER_A", "REL_STOP_RATIO",
+        "ELEM_FRACTION", "MEAN_EXCI_ENERGY",
+    }),
+    0x300A000A: frozenset({  # Plan Intent
+        "CURATIVE", "PALLIATIVE", "PROPHYLACTIC", "VERIFICATION", "MACHINE_QA", "RESEARCH",
+        "SERVICE",
+    }),
+    0x300A000C: frozenset({"PATIENT", "TREATMENT_DEVICE"}),  # RT Plan Geometry
+    0x300A0014: frozenset({  # Dose Reference Structure Type
+        "POINT", "VOLUME", "COORDINATES", "SITE",
+    }),
+    0x300A0020: frozenset({"TARGET", "ORGAN_AT_RISK"}),  # Dose Reference Type
+    0x300A0055: frozenset({  # RT Plan Relationship
+        "PRIOR", "ALTERNATIVE", "PREDECESSOR", "VERIFIED_PLAN", "CONCURRENT",
+    }),
+    0x300A00B3: frozenset({"MU", "MINUTE", "NP"}),  # Primary Dosimeter Unit
+    0x300A00B8: frozenset({  # RT Beam Limiting Device Type
+        "X", "Y", "ASYMX", "ASYMY", "MLCX", "MLCY",
+    }),
+    0x300A00C4: frozenset({"STATIC", "DYNAMIC"}),  # Beam Type
+    0x300A00C6: frozenset({"PHOTON", "ELECTRON", "NEUTRON", "PROTON", "ION"}),  # Radiation Type
+    0x300A00CE: frozenset({  # Treatment Delivery Type
+        "TREATMENT", "OPEN_PORTFILM", "TRMT_PORTFILM", "CONTINUATION", "SETUP",
+    }),
+    0x300A011F: _ROTATION_DIRECTION,  # Gantry Rotation Direction
+    0x300A0121: _ROTATION_DIRECTION,  # Beam Limiting Device Rotation Direction
+    0x300A0123: _ROTATION_DIRECTION,  # Patient Support Rotation Direction
+    0x300A0126: _ROTATION_DIRECTION,  # Table Top Eccentric Rotation Direction
+    0x300E0002: frozenset({"APPROVED", "UNAPPROVED", "REJECTED"}),  # Approval Status
+    0x54001006: frozenset({  # Waveform Sample Interpretation
+        "SB", "UB", "MB", "AB", "SS", "US", "SL", "UL", "SV", "UV",
+    }),
+}
+
+
+def only_defined_terms(tag: int, values: Iterable[str], terms: dict | None = None) -> bool:
+    """Whether every value of an element is a defined term of its tag.
+
+    Parameters
+    ----------
+    tag : int
+        The element's tag.
+
+    values : iterable of str
+        The element's values (see anonymise_dicom._text_values). Empty values
+        carry no PHI and are always accepted.
+
+    terms : dict, optional
+        The index, keyed by tag (int). DEFINED_TERMS if None.
+
+    Returns
+    -------
+    bool
+        False for tags the index does not list, private tags included.
+    """
+    allowed = (DEFINED_TERMS if terms is None else terms).get(int(Tag(tag)))
+    if allowed is None:
+        return False
+    return all(not value.strip() or value.strip() in allowed for value in values)
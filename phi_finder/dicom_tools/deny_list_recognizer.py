@@ -0,0 +1,138 @@
+"""A Presidio recognizer matching many deny lists with a single trie.
+
+Presidio's PatternRecognizer turns a deny list into one alternation regex,
+which the regex engine tries alternative by alternative at every position of
+every value. With the ~9,400 Australian suburbs that costs milliseconds per
+header value, plus a second or so to compile. DenyListRecognizer instead
+compiles all deny lists (suburbs, states, titles, institutes, ...) into one
+character trie, and walks it once from each word start of the value.
+
+Matching follows the PatternRecognizer deny-list semantics: case-insensitive,
+and a phrase only matches as a whole (at the start of the text or after a
+non-word character, and at the end of the text or before a non-word
+character). Where phrases of one entity overlap, the longest is reported.
+"""
+from presidio_analyzer import EntityRecognizer, RecognizerResult
+
+# Key of the entry holding the entity types of the phrase ending at a node.
+_TERMINAL = None
+
+
+def _fold(text: str) -> str:
+    """Lower-cases text without changing its length, so offsets still match."""
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    # A few characters (e.g. "İ") lower-case to two; keep those as they are.
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+def _is_word_char(c: str) -> bool:
+    return c.isalnum() or c == "_"
+
+
+class DenyListRecognizer(EntityRecognizer):
+    """Recognizes the phrases of several deny lists in a single pass.
+
+    Parameters
+    ----------
+    deny_lists : dict of str to list of str
+        Maps each entity type (e.g. "SUBURB") to its deny list. A phrase may
+        appear under several entity types; it is then reported once per type.
+
+    score : float, optional (default 1.0)
+        Score of every match, as PatternRecognizer's deny_list_score.
+
+    name : str, optional
+        Name of the recognizer in Presidio's registry.
+
+    supported_language : str, optional (default "en")
+        Language the recognizer is registered for.
+    """
+
+    def __init__(self,
+                 deny_lists: dict[str, list[str]],
+                 score: float = 1.0,
+                 name: str = "DenyListRecognizer",
+                 supported_language: str = "en") -> None:
+        self.deny_lists = {entity: list(phrases) for entity, phrases in deny_lists.items()}
+        self.score = score
+        self._trie: dict = {}
+        self._build()
+        super().__init__(
+            supported_entities=list(self.deny_lists),
+            name=name,
+            supported_language=supported_language,
+        )
+
+    def _build(self) -> None:
+        for entity, phrases in self.deny_lists.items():
+            for phrase in phrases:
+                phrase = phrase.strip()
+                if not phrase:
+                    continue
+                node = self._trie
+                for c in _fold(phrase):
+                    node = node.setdefault(c, {})
+                entities = node.get(_TERMINAL, ())
+                if entity not in entities:
+                    node[_TERMINAL] = entities + (entity,)
+
+    def load(self) -> None:
+        """Nothing to load: the trie is built in the constructor."""
+
+    def match(self, text: str) -> list[tuple[int, int, str]]:
+        """Finds the deny-listed phrases in text.
+
+        Returns
+        -------
+        list of (int, int, str)
+            (start, end, entity type) of each match. Matches of one entity
+            type never overlap; the longest phrase wins at a given start.
+        """
+        folded = _fold(text)
+        n = len(folded)
+        matches = []
+        next_free: dict[str, int] = {}
+        for start in range(n):
+            if start > 0 and _is_word_char(folded[start - 1]):
+                continue
+            node = self._trie.get(folded[start])
+            if node is None:
+                continue
+            longest: dict[str, int] = {}
+            end = start + 1
+            while node is not None:
+                entities = node.get(_TERMINAL)
+                if entities and (end == n or not _is_word_char(folded[end])):
+                    for entity in entities:
+                        longest[entity] = end
+                if end == n:
+                    break
+                node = node.get(folded[end])
+                end += 1
+            for entity, match_end in longest.items():
+                if start >= next_free.get(entity, 0):
+                    matches.append((start, match_end, entity))
+                    next_free[entity] = match_end
+        return matches
+
+    def analyze(
+        self, text: str, entities: list[str], nlp_artifacts=None
+    ) -> list[RecognizerResult]:
+        """Analyzes text for the requested entity types (Presidio interface)."""
+        wanted = set(entities) if entities else set(self.supported_entities)
+        return [
+            RecognizerResult(
+                entity_type=entity,
+                start=start,
+                end=end,
+                score=self.score,
+                recognition_metadata={
+                    RecognizerResult.RECOGNIZER_NAME_KEY: self.name,
+                    RecognizerResult.RECOGNIZER_IDENTIFIER_KEY: self.id,
+                },
+            )
+            for start, end, entity in self.match(text)
+            if entity in wanted
+        ]
@@ -0,0 +1,165 @@
+"""Process-wide registry of the NER and OCR engines.
+
+Building the Presidio analyser loads a spaCy model, reads the suburbs deny
+list and compiles every recognizer; loading GLiNER takes longer still. The
+engines are stateless once built, so one instance per configuration can be
+shared by every call (and every thread) of the process. The getters below
+build an engine the first time its configuration is asked for and return the
+same instance afterwards; evict() and clear() drop them again.
+"""
+import os
+import threading
+from pathlib import Path
+
+_SUBURBS_PATH = Path(__file__).with_name("suburbs_australia.txt")
+
+_ENGINES: dict = {}
+# One lock per key, so a slow build (e.g. GLiNER) does not block getters of
+# engines that are already built or of other configurations.
+_BUILD_LOCKS: dict = {}
+_LOCK = threading.Lock()
+
+
+def _deny_list_signature() -> tuple:
+    """Identifies the version of the deny-list files the analyser reads."""
+    try:
+        stat = os.stat(_SUBURBS_PATH)
+    except OSError:
+        return (str(_SUBURBS_PATH), None)
+    return (str(_SUBURBS_PATH), stat.st_mtime_ns, stat.st_size)
+
+
+def _get(key: tuple, build):
+    with _LOCK:
+        try:
+            return _ENGINES[key]
+        except KeyError:
+            build_lock = _BUILD_LOCKS.setdefault(key, threading.Lock())
+    with build_lock:
+        with _LOCK:
+            if key in _ENGINES:
+                return _ENGINES[key]
+        engine = build()
+        with _LOCK:
+            _ENGINES[key] = engine
+        return engine
+
+
+def get_analyser(score_threshold: float = 0.5, spacy_model_name: str = "en_core_web_md"):
+    """Returns the shared Presidio analyser of a configuration.
+
+    Parameters
+    ----------
+    score_threshold : float, optional (default 0.5)
+        Score of the pattern recognizers, as in _build_presidio_analyser.
+
+    spacy_model_name : str, optional (default "en_core_web_md")
+        The spaCy model of the NLP engine.
+
+    Returns
+    -------
+    AnalyzerEngine
+        Built on the first call for this configuration (and again if the
+        deny-list files changed on disk), shared afterwards.
+    """
+    from phi_finder.dicom_tools import anonymise_dicom
+
+    key = ("analyser", score_threshold, spacy_model_name, _deny_list_signature())
+    return _get(
+        key,
+        lambda: anonymise_dicom._build_presidio_analyser(
+            score_threshold, spacy_model_name
+        ),
+    )
+
+
+def get_anonymizer():
+    """Returns the shared Presidio AnonymizerEngine."""
+    def build():
+        from presidio_anonymizer import AnonymizerEngine
+        return AnonymizerEngine()
+
+    return _get(("anonymizer",), build)
+
+
+def get_image_redactor(score_threshold: float = 0.5, spacy_model_name: str = "en_core_web_md"):
+    """Returns the shared DICOM image redactor of a configuration.
+
+    The redactor runs OCR on the pixel data and analyses the recognised text
+    with the shared analyser of the same configuration (see get_analyser).
+    """
+    def build():
+        from presidio_image_redactor import (
+            DicomImageRedactorEngine, ImageAnalyzerEngine, ContrastSegmentedImageEnhancer)
+        return DicomImageRedactorEngine(
+            image_analyzer_engine=ImageAnalyzerEngine(
+                analyzer_engine=get_analyser(score_threshold, spacy_model_name),
+                image_preprocessor=ContrastSegmentedImageEnhancer(),
+            )
+        )
+
+    key = ("image_redactor", score_threshold, spacy_model_name, _deny_list_signature())
+    return _get(key, build)
+
+
+def get_transformer():
+    """Returns the shared GLiNER PII model."""
+    from phi_finder.dicom_tools import anonymise_dicom
+
+    return _get(("transformer",), anonymise_dicom._build_transformer)
+
+
+def warm_up(score_threshold: float = 0.5,
+            spacy_model_name: str = "en_core_web_md",
+            image_redactor: bool = False,
+            transformer: bool = False) -> None:
+    """Builds the engines of a configuration ahead of the first file.
+
+    Parameters
+    ----------
+    score_threshold : float, optional (default 0.5)
+        Score threshold of the analyser (and image redactor).
+
+    spacy_model_name : str, optional (default "en_core_web_md")
+        The spaCy model of the analyser.
+
+    image_redactor : bool, optional (default False)
+        Whether to build the DICOM image redactor too.
+
+    transformer : bool, optional (default False)
+        Whether to load the GLiNER model too.
+    """
+    get_analyser(score_threshold, spacy_model_name)
+    get_anonymizer()
+    if image_redactor:
+        get_image_redactor(score_threshold, spacy_model_name)
+    if transformer:
+        get_transformer()
+
+
+def evict(kind: str) -> int:
+    """Drops the shared engines of one kind.
+
+    Parameters
+    ----------
+    kind : str
+        One of "analyser", "anonymizer", "image_redactor" and "transformer".
+
+    Returns
+    -------
+    int
+        The number of engines dropped; they are rebuilt on next use.
+    """
+    with _LOCK:
+        keys = [key for key in _ENGINES if key[0] == kind]
+        for key in keys:
+            del _ENGINES[key]
+            _BUILD_LOCKS.pop(key, None)
+    return len(keys)
+
+
+def clear() -> None:
+    """Drops every shared engine, e.g. to free the memory of the models."""
+    with _LOCK:
+        _ENGINES.clear()
+        _BUILD_LOCKS.clear()
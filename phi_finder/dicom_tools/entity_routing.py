@@ -0,0 +1,105 @@
+"""Which entities the header values of each tag are analysed for.
+
+The NER pipeline runs every recognizer (regular expressions, deny lists and
+spaCy, see _build_presidio_analyser) on every free-text value, whatever the
+tag: the street and postcode patterns on Manufacturer, the MRN pattern on every
+code string. A routing table maps tags, and classes of tags by VR, to the
+entities worth looking for in their values; Presidio then runs only the
+recognizers of those entities.
+
+Routes are conservative. Only standard tags whose values cannot hold the
+other entities, or would never be redacted for them, are routed; every other
+value, and always the private tags the table does not name, is scanned for
+every entity (a full scan). Still, a routed value is not searched for the
+entities its route leaves out, so DEFAULT_ROUTES redacts less than a full scan
+(the README lists what each route drops) and routing is opt-in.
+"""
+from pydicom.tag import Tag
+
+# Groups of entities of the analyser built by _build_presidio_analyser
+# (custom recognizers, Presidio's predefined ones and spaCy's).
+PERSON = ("PERSON", "TITLE", "CORRESPONDENCE")
+IDENTIFIER = ("MRN", "PROVIDER_NUMBER", "MEDICAL_LICENSE", "US_SSN", "UK_NHS", "ID")
+CONTACT = ("PHONE", "PHONE_NUMBER", "EMAIL_ADDRESS", "EMAIL", "URL")
+DATE = ("DATE", "DATE_TIME", "AGE")
+PLACE = ("LOCATION", "STREET", "POSTCODE", "SUBURB", "STATE", "INSTITUTE", "ORGANIZATION")
+
+# Tags of the equipment and its software: no patient data, but an operator's
+# or engineer's name may be typed into them.
+_DEVICE_TAGS = (
+    Tag(0x0008, 0x0070),  # Manufacturer
+    Tag(0x0008, 0x1090),  # Manufacturer's Model Name
+    Tag(0x0018, 0x1016),  # Secondary Capture Device Manufacturer
+    Tag(0x0018, 0x1018),  # Secondary Capture Device Manufacturer's Model Name
+    Tag(0x0018, 0x1019),  # Secondary Capture Device Software Versions
+    Tag(0x0018, 0x1020),  # Software Versions
+    Tag(0x0018, 0x1210),  # Convolution Kernel
+)
+# Coded entries: a code and its scheme are identifiers of a concept, its
+# meaning the scheme's text for it, not the patient's.
+_CODED_ENTRY_TAGS = (
+    Tag(0x0008, 0x0100),  # Code Value
+    Tag(0x0008, 0x0102),  # Coding Scheme Designator
+    Tag(0x0008, 0x0103),  # Coding Scheme Version
+    Tag(0x0008, 0x0104),  # Code Meaning
+    Tag(0x0008, 0x0119),  # Long Code Value
+)
+# Tags naming the institution, its address and its equipment.
+_INSTITUTION_TAGS = (
+    Tag(0x0008, 0x0080),  # Institution Name
+    Tag(0x0008, 0x0081),  # Institution Address
+    Tag(0x0008, 0x1010),  # Station Name
+    Tag(0x0008, 0x1040),  # Institutional Department Name
+)
+
+# Code strings (CS) are at most 16 upper-case letters, digits, spaces and
+# underscores: no lower-case patterns (correspondence, street and institute
+# patterns, most place names) and no lone-letter GENDER matches, which would
+# corrupt defined terms such as ImageType's 'M'.
+_CODE_STRING = (
+    PERSON[:2]
+    + IDENTIFIER
+    + ("PHONE", "PHONE_NUMBER")
+    + DATE
+    + ("SUBURB", "STATE", "INSTITUTE")
+)
+
+# Keys are tags (int) or VRs (str); a tag's route wins over its VR's.
+DEFAULT_ROUTES = {
+    "CS": _CODE_STRING,
+    **{int(tag): PERSON + ("URL", "EMAIL_ADDRESS", "EMAIL") for tag in _DEVICE_TAGS},
+    **{int(tag): PERSON for tag in _CODED_ENTRY_TAGS},
+    **{int(tag): PERSON + CONTACT + PLACE for tag in _INSTITUTION_TAGS},
+}
+
+
+def entities_for(tag: int, vr: str, routes: dict | None) -> tuple | None:
+    """The entities the values of an element are analysed for.
+
+    Parameters
+    ----------
+    tag : int
+        The element's tag.
+
+    vr : str
+        The element's VR.
+
+    routes : dict or None
+        Routing table, keyed by tag (int) or VR (str), e.g. DEFAULT_ROUTES.
+        None scans every value for every entity.
+
+    Returns
+    -------
+    tuple of str or None
+        The entities, or None for a full scan: private tags the table does
+        not name, and tags neither named nor of a routed VR.
+    """
+    if not routes:
+        return None
+    route = routes.get(int(tag))
+    if route is not None:
+        return tuple(route)
+    if Tag(tag).is_private:
+        return None  # Unknown private content: always a full scan.
+    route = routes.get(vr)
+    return None if route is None else tuple(route)
@@ -0,0 +1,175 @@
+"""Redacting the burned-in text of a multi-frame image one frame at a time.
+
+The image redactor works on a dataset's whole pixel_array, so an enhanced
+multi-frame MR/CT or a long ultrasound cine loop used to be decoded into
+memory at once, several GB for some. Here the frames are decoded from the
+source file one by one (pydicom.pixels.iter_pixels), each is redacted as a
+single-frame dataset carrying the original header (which the redactor reads
+PHI from) and written out as soon as it is done, so memory holds a few frames
+whatever the length of the loop. Frames can be redacted by a pool of threads:
+OCR runs in tesseract subprocesses, which do not hold the GIL.
+
+The redacted frames are spooled to a file next to the output; the output is
+then written as the anonymised header, in Explicit VR Little Endian, followed
+by the spooled frames as native pixel data.
+"""
+import copy
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pydicom as dicom
+from pydicom.pixels import iter_pixels
+
+from phi_finder.dicom_tools.pixel_passthrough import (
+    PixelRange,
+    _copy_range,
+    native_pixel_data_header,
+)
+
+_PIXEL_DATA_TAG = 0x7FE00010
+# Photometric interpretations that iter_pixels converts to RGB.
+_CONVERTED_TO_RGB = {"YBR_FULL", "YBR_FULL_422", "YBR_ICT", "YBR_RCT"}
+# Offset tables of encapsulated pixel data, meaningless for native data.
+_OFFSET_TABLE_TAGS = (0x7FE00001, 0x7FE00002)
+# Per-frame Functional Groups Sequence: one item per frame, so copying it
+# with every frame (as the redactor does) would cost O(frames^2).
+_PER_FRAME_GROUPS_TAG = 0x52009230
+
+
+def streamable(ds: dicom.dataset.Dataset, pixel_range: PixelRange | None) -> bool:
+    """Whether the pixel data of a header read by read_header_with_pixel_range
+    can be redacted frame by frame.
+
+    It must be Pixel Data (not float) of more than one frame, of whole bytes
+    per pixel, in a little endian transfer syntax.
+    """
+    if pixel_range is None or pixel_range.tag != _PIXEL_DATA_TAG:
+        return False
+    if int(ds.get("NumberOfFrames", 1) or 1) < 2:
+        return False
+    if int(ds.get("BitsAllocated", 0) or 0) not in (8, 16, 32):
+        return False
+    return ds.original_encoding[1]
+
+
+def _photometric(ds: dicom.dataset.Dataset) -> str:
+    """The photometric interpretation of the frames as iter_pixels decodes them."""
+    photometric = str(ds.get("PhotometricInterpretation", "MONOCHROME2"))
+    return "RGB" if photometric in _CONVERTED_TO_RGB else photometric
+
+
+def _frame_template(header: dicom.dataset.FileDataset) -> dicom.dataset.Dataset:
+    """The original header, as the header of one native frame."""
+    template = copy.deepcopy(header)
+    template.NumberOfFrames = 1
+    template.PhotometricInterpretation = _photometric(header)
+    if int(header.get("SamplesPerPixel", 1) or 1) > 1:
+        template.PlanarConfiguration = 0
+    for tag in _OFFSET_TABLE_TAGS + (_PER_FRAME_GROUPS_TAG,):
+        if tag in template:
+            del template[tag]
+    template.file_meta.TransferSyntaxUID = dicom.uid.ExplicitVRLittleEndian
+    return template
+
+
+def _redact_frame(template: dicom.dataset.Dataset, frame: np.ndarray, redact) -> bytes:
+    """The bytes of one frame, redacted."""
+    # A dataset of its own (not sharing template's elements), so frames can
+    # be redacted concurrently.
+    frame_ds = dicom.dataset.Dataset(dict(template))
+    frame_ds.file_meta = template.file_meta
+    frame_ds.PixelData = frame.tobytes()
+    redacted = redact(frame_ds).pixel_array
+    if redacted.shape != frame.shape:
+        raise ValueError(f"Redacted frame of shape {redacted.shape}, expected {frame.shape}")
+    return redacted.astype(frame.dtype, copy=False).tobytes()
+
+
+def redact_frames(src, header: dicom.dataset.FileDataset, redact, out, workers: int = 1,
+                  window: int = None) -> int:
+    """Decodes the frames of src one at a time, redacts them and writes them to out.
+
+    Parameters
+    ----------
+    src : str or Path
+        The DICOM file, whose header is header.
+
+    header : pydicom.dataset.FileDataset
+        The original (not yet anonymised) header of src, see streamable.
+
+    redact : callable
+        Takes a single-frame dataset and returns it redacted, e.g.
+        DicomImageRedactorEngine.redact.
+
+    out : file object
+        Where the redacted frames are written, in order, as native pixel data.
+
+    workers : int, optional (default 1)
+        Number of threads redacting frames.
+
+    window : int, optional
+        Maximum number of frames decoded but not yet written: the memory used
+        is about window frames. 2 * workers if None.
+
+    Returns
+    -------
+    int
+        The number of bytes written.
+    """
+    template = _frame_template(header)
+    window = max(window or 2 * workers, 1)
+    written = 0
+    if workers <= 1:
+        for frame in iter_pixels(src):
+            written += out.write(_redact_frame(template, frame, redact))
+        return written
+    pending: deque = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for frame in iter_pixels(src):
+            if len(pending) >= window:
+                written += out.write(pending.popleft().result())
+            pending.append(pool.submit(_redact_frame, template, frame, redact))
+        while pending:
+            written += out.write(pending.popleft().result())
+    return written
+
+
+def write_with_frames(ds: dicom.dataset.FileDataset, dst, frames_path, length: int) -> None:
+    """Writes the header ds to dst, followed by the frames written by redact_frames.
+
+    Parameters
+    ----------
+    ds : pydicom.dataset.FileDataset
+        The (anonymised) header, without pixel data. Its transfer syntax and
+        image pixel module are set to those of the redacted frames.
+
+    dst : str or Path
+        Where to write the output.
+
+    frames_path : str or Path
+        The file redact_frames wrote the frames to.
+
+    length : int
+        The number of bytes redact_frames wrote.
+    """
+    if any(elem.tag >= _PIXEL_DATA_TAG for elem in ds):
+        raise ValueError("The header has elements sorting after its pixel data")
+    ds.PhotometricInterpretation = _photometric(ds)
+    if int(ds.get("SamplesPerPixel", 1) or 1) > 1:
+        ds.PlanarConfiguration = 0
+    for tag in _OFFSET_TABLE_TAGS:
+        if tag in ds:
+            del ds[tag]
+    ds.file_meta.TransferSyntaxUID = dicom.uid.ExplicitVRLittleEndian
+    vr = "OW" if int(ds.BitsAllocated) > 8 else "OB"
+    with open(dst, "wb") as out:
+        ds.save_as(out)
+        out.write(native_pixel_data_header(vr, length + length % 2))
+        out.flush()
+        with open(frames_path, "rb") as frames:
+            _copy_range(frames, out, 0, length)
+        if length % 2:
+            out.seek(0, os.SEEK_END)
+            out.write(b"\0")
@@ -0,0 +1,219 @@
+"""Copying the pixel data of a DICOM file without decoding or loading it.
+
+When only the header of a file is de-identified, its pixel data goes to the
+output unchanged. Rather than reading it into memory and writing it back out,
+the header is parsed up to the pixel data (stop_before_pixels), anonymised and
+written, and the pixel data element is then copied byte for byte from the
+source file to the output (with os.copy_file_range or os.sendfile where the
+platform has them), so a large multi-frame file costs about as much as its
+header.
+"""
+import os
+import shutil
+import struct
+from collections import namedtuple
+
+import pydicom as dicom
+
+# (7FE0,0008) Float Pixel Data, (7FE0,0009) Double Float Pixel Data and
+# (7FE0,0010) Pixel Data: where stop_before_pixels stops.
+PIXEL_DATA_TAGS = frozenset({0x7FE00008, 0x7FE00009, 0x7FE00010})
+_ITEM_TAG = 0xFFFEE000
+_SEQUENCE_DELIMITER_TAG = 0xFFFEE0DD
+_TRAILING_PADDING_TAG = 0xFFFCFFFC
+_UNDEFINED_LENGTH = 0xFFFFFFFF
+# Explicit VRs whose element header has 2 reserved bytes and a 4-byte length.
+_LONG_VRS = {
+    b"OB",
+    b"OD",
+    b"OF",
+    b"OL",
+    b"OV",
+    b"OW",
+    b"SQ",
+    b"SV",
+    b"UC",
+    b"UN",
+    b"UR",
+    b"UT",
+    b"UV",
+}
+
+# Byte range [start, end) of the pixel data element (header included) in
+# the source file, its tag and its VR.
+PixelRange = namedtuple("PixelRange", ["start", "end", "tag", "vr"])
+
+
+def _read_tag(fp, little_endian: bool) -> int | None:
+    raw = fp.read(4)
+    if len(raw) < 4:
+        return None
+    group, element = struct.unpack("<HH" if little_endian else ">HH", raw)
+    return group << 16 | element
+
+
+def _read_uint32(fp, little_endian: bool) -> int:
+    raw = fp.read(4)
+    if len(raw) < 4:
+        raise EOFError("DICOM file ends inside an element header")
+    return struct.unpack("<L" if little_endian else ">L", raw)[0]
+
+
+def locate_pixel_data(fp, ds: dicom.dataset.Dataset) -> PixelRange | None:
+    """Finds the byte range of the pixel data element following the header.
+
+    Parameters
+    ----------
+    fp : file object
+        The source file, positioned where dcmread(..., stop_before_pixels=True)
+        stopped reading it.
+
+    ds : pydicom.dataset.Dataset
+        The dataset read from fp, for its encoding.
+
+    Returns
+    -------
+    PixelRange or None
+        None if no pixel data element follows. Native pixel data has a defined
+        length; encapsulated pixel data is walked item by item up to its
+        sequence delimiter. fp is left at the end of the element.
+    """
+    implicit_vr, little_endian = ds.original_encoding
+    start = fp.tell()
+    tag = _read_tag(fp, little_endian)
+    if tag not in PIXEL_DATA_TAGS:
+        fp.seek(start)
+        return None
+    if implicit_vr:
+        vr = "OW"
+        length = _read_uint32(fp, little_endian)
+    else:
+        raw_vr = fp.read(2)
+        vr = raw_vr.decode("ascii", "replace")
+        if raw_vr in _LONG_VRS:
+            fp.read(2)
+            length = _read_uint32(fp, little_endian)
+        else:
+            length = struct.unpack("<H" if little_endian else ">H", fp.read(2))[0]
+    if length != _UNDEFINED_LENGTH:
+        fp.seek(length, os.SEEK_CUR)
+        return PixelRange(start, fp.tell(), tag, vr)
+    # Encapsulated: items (basic offset table, then fragments) up to the
+    # sequence delimiter, whose length field is always zero.
+    while True:
+        item_tag = _read_tag(fp, little_endian)
+        if item_tag is None:
+            raise EOFError("DICOM file ends inside the encapsulated pixel data")
+        item_length = _read_uint32(fp, little_endian)
+        if item_tag == _SEQUENCE_DELIMITER_TAG:
+            return PixelRange(start, fp.tell(), tag, vr)
+        if item_tag != _ITEM_TAG or item_length == _UNDEFINED_LENGTH:
+            raise ValueError(f"Unexpected element ({item_tag:08X}) in encapsulated pixel data")
+        fp.seek(item_length, os.SEEK_CUR)
+
+
+def read_header_with_pixel_range(
+    path,
+) -> tuple[dicom.dataset.FileDataset, PixelRange | None] | None:
+    """Reads the header of a DICOM file and locates its pixel data.
+
+    Parameters
+    ----------
+    path : str or Path
+        The DICOM file to read.
+
+    Returns
+    -------
+    tuple of (pydicom.dataset.FileDataset, PixelRange or None), or None
+        The header (without the pixel data) and the pixel data range (None if
+        the file has none). None if the pixel data cannot be passed through:
+        deflated files (whose dataset is inflated in memory), or files with
+        elements other than trailing padding after the pixel data.
+    """
+    with open(path, "rb") as fp:
+        ds = dicom.dcmread(fp, stop_before_pixels=True)
+        if ds.file_meta.get("TransferSyntaxUID") == dicom.uid.DeflatedExplicitVRLittleEndian:
+            return None
+        pixel_range = locate_pixel_data(fp, ds)
+        if pixel_range is not None:
+            following = _read_tag(fp, ds.original_encoding[1])
+            if following is not None and following != _TRAILING_PADDING_TAG:
+                return None
+    return ds, pixel_range
+
+
+def native_pixel_data_header(vr: str, length: int) -> bytes:
+    """The header of a (7FE0,0010) Pixel Data element of native data, in
+    Explicit VR Little Endian: tag, VR, 2 reserved bytes and 4-byte length."""
+    return struct.pack("<HH2sHL", 0x7FE0, 0x0010, vr.encode("ascii"), 0, length)
+
+
+def _copy_range(src, dst, offset: int, count: int) -> None:
+    """Copies count bytes of src from offset to the current end of dst."""
+    src_fd, dst_fd = src.fileno(), dst.fileno()
+    if hasattr(os, "copy_file_range"):
+        try:
+            while count > 0:
+                copied = os.copy_file_range(src_fd, dst_fd, count, offset)
+                if copied == 0:
+                    break
+                offset += copied
+                count -= copied
+            if count == 0:
+                return
+        except OSError:
+            # e.g. across file systems on older kernels: fall through.
+            pass
+    if hasattr(os, "sendfile"):
+        try:
+            while count > 0:
+                sent = os.sendfile(dst_fd, src_fd, offset, count)
+                if sent == 0:
+                    break
+                offset += sent
+                count -= sent
+            if count == 0:
+                return
+        except OSError:
+            pass
+    src.seek(offset)
+    dst.seek(0, os.SEEK_END)
+    while count > 0:
+        chunk = src.read(min(count, shutil.COPY_BUFSIZE))
+        if not chunk:
+            raise EOFError("Source DICOM file is shorter than its pixel data")
+        dst.write(chunk)
+        count -= len(chunk)
+
+
+def write_with_pixel_passthrough(ds: dicom.dataset.FileDataset,
+                                 src,
+                                 dst,
+                                 pixel_range: PixelRange | None) -> None:
+    """Writes the header ds to dst, followed by the pixel data of src.
+
+    Parameters
+    ----------
+    ds : pydicom.dataset.FileDataset
+        The (anonymised) header, as read by read_header_with_pixel_range. It
+        must keep the source's transfer syntax and have no element sorting
+        after the pixel data.
+
+    src : str or Path
+        The source file the header was read from.
+
+    dst : str or Path
+        Where to write the output.
+
+    pixel_range : PixelRange or None
+        The pixel data element of src, copied verbatim after the header.
+    """
+    if pixel_range is not None and any(elem.tag >= pixel_range.tag for elem in ds):
+        raise ValueError("The header has elements sorting after its pixel data")
+    with open(dst, "wb") as out:
+        ds.save_as(out)
+        if pixel_range is None:
+            return
+        out.flush()
+        with open(src, "rb") as source:
+            _copy_range(source, out, pixel_range.start, pixel_range.end - pixel_range.start)
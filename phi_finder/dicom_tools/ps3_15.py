@@ -19,11 +19,15 @@ than in this table: private attributes (odd group, X), Curve Data
 (50xx,xxxx, X), Overlay Data (60xx,3000, X) and Overlay Comments
 (60xx,4000, X).
 """
+import functools
 import logging
 import re
 
 import pydicom as dicom
-from pydicom.uid import generate_uid
+from pydicom.tag import Tag
+
+from phi_finder.dicom_tools import sequence_items
+from phi_finder.dicom_tools.uid_map import UIDMap, replace_uid
 
 logger = logging.getLogger(__name__)
 
@@ -829,15 +833,19 @@ def _resolve_action(action: str) -> str:
     return "X"
 
 
-def _replace_uid(original: str) -> str:
+def _replace_uid(original: str, uid_map: UIDMap | None = None) -> str:
     """Maps a UID to a replacement UID, deterministically.
 
-    Hashing the original UID (entropy_srcs) means the same input always maps
-    to the same output, so Study/Series/Frame-of-Reference UIDs stay
-    consistent across the files of a series without keeping any state, and
-    referential integrity between objects is preserved.
+    Hashing the original UID (generate_uid with entropy_srcs) means the same
+    input always maps to the same output, so Study/Series/Frame-of-Reference
+    UIDs stay consistent across the files of a series, and referential
+    integrity between objects is preserved. The replacements are memoised in
+    uid_map (the process-wide one if None), which may also carry a table of
+    mappings from an earlier run; see uid_map.
     """
-    return generate_uid(entropy_srcs=[original])
+    if uid_map is None:
+        return replace_uid(original)
+    return uid_map.replace(original)
 
 
 # String-based VRs, for which a zero-length value is the empty string. Using
@@ -848,94 +856,355 @@ _STRING_VRS = frozenset({
 })
 
 
+def _empty_value(vr: str):
+    if vr == "SQ":
+        return []
+    if vr in _STRING_VRS:
+        return ""
+    return None
+
+
 def _empty(elem: dicom.dataelem.DataElement) -> None:
+    elem.value = _empty_value(elem.VR)
+
+
+_UNDEFINED_LENGTH = 0xFFFFFFFF
+
+
+def _raw_vr(raw: dicom.dataelem.RawDataElement) -> str | None:
+    """The VR a raw element converts to, if known without converting it.
+
+    Implicit VR elements (VR None) and explicit UN elements get the VR of the
+    data dictionary, as pydicom's conversion does. None when that is not
+    known (unknown private tags) or ambiguous (e.g. "US or SS").
+    """
+    vr = raw.VR
+    if vr is None or vr == "UN":
+        try:
+            vr = dicom.datadict.dictionary_VR(raw.tag)
+        except KeyError:
+            return None
+    return None if " or " in vr else vr
+
+
+def _may_be_sequence(ds: dicom.dataset.Dataset, tag: dicom.tag.BaseTag) -> bool:
+    """True unless the element at tag is known not to be a sequence.
+
+    Looked up without converting a raw element: only elements that can be
+    sequences need converting, to walk their items.
+    """
+    elem = ds.get_item(tag)
+    if not isinstance(elem, dicom.dataelem.RawDataElement):
+        return elem.VR == "SQ"
     if elem.VR == "SQ":
-        elem.value = []
-    elif elem.VR in _STRING_VRS:
-        elem.value = ""
-    else:
-        elem.value = None
+        return True
+    if elem.VR is None or elem.VR == "UN":
+        # Implicit VR (or UN) elements of undefined length can only be
+        # sequences; pydicom parses them as such.
+        return elem.length == _UNDEFINED_LENGTH or _raw_vr(elem) == "SQ"
+    return False
 
 
-def _dummify(elem: dicom.dataelem.DataElement) -> None:
+def _private_creators(ds: dicom.dataset.Dataset, tags: list) -> dict:
+    """Maps the private creator tags among tags to their values."""
+    return {
+        tag: ds[tag].value
+        for tag in tags
+        if tag.is_private and 0x0010 <= tag.element <= 0x00FF
+    }
+
+
+def _element_name(ds: dicom.dataset.Dataset, tag: dicom.tag.BaseTag, creators: dict) -> str:
+    """DataElement.name of the element at tag, without converting its value.
+
+    creators holds the values of the dataset's private creators, taken before
+    any of them is removed.
+    """
+    elem = ds.get_item(tag)
+    if isinstance(elem, dicom.dataelem.DataElement) and (
+        elem.private_creator or not tag.is_private
+    ):
+        return elem.name
+    probe = dicom.dataelem.DataElement(tag, "UN", None)
+    if tag.is_private:
+        # As Dataset.__setitem__ does when it converts the element.
+        creator_tag = Tag(tag.group, tag.element >> 8)
+        if creator_tag != tag and creator_tag in creators:
+            probe.private_creator = creators[creator_tag]
+    return probe.name
+
+
+def _empty_at(ds: dicom.dataset.Dataset, tag: dicom.tag.BaseTag) -> None:
+    """The Z action: replaces the element's value by an empty one.
+
+    A raw element of known VR is replaced without converting (and so
+    decoding) the value it is about to lose.
+    """
+    elem = ds.get_item(tag)
+    if isinstance(elem, dicom.dataelem.RawDataElement):
+        vr = _raw_vr(elem)
+        if vr is not None:
+            ds[tag] = dicom.dataelem.DataElement(tag, vr, _empty_value(vr))
+            return
+    _empty(ds[tag])
+
+
+def _dummify(elem: dicom.dataelem.DataElement, uid_map: UIDMap | None = None) -> None:
     if elem.VR == "SQ":
         elem.value = []
     elif elem.VR == "UI":
-        _replace_uids(elem)
+        _replace_uids(elem, uid_map)
     elif elem.VR in _BINARY_VRS:
         elem.value = b""
     else:
         elem.value = _DUMMY_VALUES.get(elem.VR, "XXXX")
 
 
-def _replace_uids(elem: dicom.dataelem.DataElement) -> None:
+def _replace_uids(elem: dicom.dataelem.DataElement, uid_map: UIDMap | None = None) -> None:
     value = elem.value
     if value in (None, ""):
         return
     if isinstance(value, (list, dicom.multival.MultiValue)):
-        elem.value = [_replace_uid(str(v)) for v in value]
+        elem.value = [_replace_uid(str(v), uid_map) for v in value]
     else:
-        elem.value = _replace_uid(str(value))
+        elem.value = _replace_uid(str(value), uid_map)
 
 
 def _action_for(tag: dicom.tag.Tag, scan_private: bool = False) -> str | None:
     action = BASIC_PROFILE_ACTIONS.get(int(tag))
     if action is not None:
         return action
-    if tag.is_private:
+    return _group_rule_action(int(tag), scan_private)
+
+
+def _group_rule_action(tag: int, scan_private: bool) -> str | None:
+    """Action of the rows that cover tag ranges rather than single tags."""
+    group = tag >> 16
+    if group & 1:  # Private attribute
         # In scan-private mode private attributes are left for the NER pipeline
         # to scrub, so report "no action" instead of removing them outright.
         return None if scan_private else "X"
-    if (tag.group & 0xFF00) == 0x5000:  # Curve Data (50xx,xxxx)
+    if (group & 0xFF00) == 0x5000:  # Curve Data (50xx,xxxx)
         return "X"
-    if (tag.group & 0xFF00) == 0x6000 and tag.element in (0x3000, 0x4000):
+    if (group & 0xFF00) == 0x6000 and (tag & 0xFFFF) in (0x3000, 0x4000):
         return "X"  # Overlay Data / Overlay Comments
     return None
 
 
+# Resolved action meaning "leave the attribute (and its items) untouched", as
+# for the Retain Patient Characteristics Option. A None action instead leaves
+# the attribute alone but still processes the items of a sequence.
+KEEP = "K"
+_ACTIONS = frozenset({"X", "Z", "D", "U", KEEP})
+_UNRESOLVED = object()
+
+
+class CompiledProfile:
+    """The Basic Profile resolved for one set of options.
+
+    Every Table E.1-1 row is resolved once (combined actions included, see
+    _resolve_action), the Retain Patient Characteristics Option and any
+    overrides are folded in, and the range rules (private, curve and overlay
+    groups) are evaluated once per tag and memoised, so applying the profile
+    is one dict lookup per element.
+
+    Parameters
+    ----------
+    retain_patient_characteristics : bool, optional (default False)
+        Whether to apply the Retain Patient Characteristics Option.
+
+    scan_private : bool, optional (default False)
+        Whether to leave private attributes in place (see apply_basic_profile).
+
+    overrides : dict of int to str or None, optional
+        Actions replacing the profile's for some tags, on top of everything
+        else: "X", "Z", "D", "U" (or a combined Table E.1-1 action), KEEP to
+        leave the attribute untouched, or None for no action (the items of a
+        sequence are still processed).
+    """
+
+    def __init__(self,
+                 retain_patient_characteristics: bool = False,
+                 scan_private: bool = False,
+                 overrides: dict[int, str | None] | None = None) -> None:
+        self.retain_patient_characteristics = retain_patient_characteristics
+        self.scan_private = scan_private
+        self.overrides = dict(overrides or {})
+        actions = {
+            tag: _resolve_action(action)
+            for tag, action in BASIC_PROFILE_ACTIONS.items()
+        }
+        if retain_patient_characteristics:
+            actions.update(dict.fromkeys(RETAIN_PATIENT_CHARACTERISTICS_KEEP, KEEP))
+        for tag, action in self.overrides.items():
+            if action is not None and action != KEEP:
+                if not set(action.split("/")) <= _ACTIONS:
+                    raise ValueError(f"Unknown PS3.15 action {action!r} for tag {Tag(tag)}")
+                action = _resolve_action(action)
+            actions[int(tag)] = action
+        # Tags only covered by the range rules are added as they are met.
+        self._actions = actions
+
+    def action_for(self, tag: int) -> str | None:
+        """Returns the resolved action ("X", "Z", "D", "U", KEEP or None) of tag."""
+        # Plain int keys: looking a pydicom Tag up directly would go through
+        # its Python-level __eq__.
+        tag = int(tag)
+        action = self._actions.get(tag, _UNRESOLVED)
+        if action is _UNRESOLVED:
+            action = _group_rule_action(tag, self.scan_private)
+            if action is not None:
+                action = _resolve_action(action)
+            self._actions[tag] = action
+        return action
+
+    def apply(self,
+              ds: dicom.dataset.Dataset,
+              anonymised_headers: list,
+              uid_map: UIDMap | None = None) -> None:
+        """Applies the actions to ds in-place, walking into sequences.
+
+        The sequence tree is walked with a worklist rather than by recursion,
+        depth first and in tag order, so arbitrarily deep trees (e.g. nested
+        SR content) are processed without hitting the recursion limit.
+        Identical items (see sequence_items.fingerprint) are processed once:
+        the actions taken on the first are replayed on the others, so the
+        time taken grows with the number of distinct items, not of frames.
+
+        Elements are looked at in their raw form where they were read from a
+        file: only the values an action needs (D and U, and the items of the
+        sequences walked into) are converted. Elements that are kept, removed
+        or blanked are never decoded. UIDs are replaced through uid_map (the
+        process-wide one if None).
+        """
+        action_for = self.action_for
+        # The digests of the items, taken before they are changed. The memo
+        # holds the items too, so an item freed by an action cannot pass its
+        # id, and digest, on to one parsed later.
+        digests = {}
+        # The actions taken, in order: (item path, tag, action, record, walked
+        # into). Those taken on an item and its descendants are contiguous.
+        log = []
+        # For the first item of each digest: its path and span of log.
+        firsts = {}
+        # Each entry is a dataset, its path, its digest, its private creators
+        # and an iterator over its remaining tags (None until the dataset is
+        # first visited), and where its span of log starts.
+        stack = [[ds, (), None, None, None, 0]]
+        while stack:
+            frame = stack[-1]
+            ds, path, digest, creators, tags, start = frame
+            if tags is None:
+                if path:
+                    digest = sequence_items.fingerprint(ds, digests)
+                    if digest in firsts:
+                        stack.pop()
+                        _replay(ds, path, firsts[digest], log, anonymised_headers, uid_map)
+                        continue
+                tags = sorted(ds.keys())
+                creators = _private_creators(ds, tags)
+                frame[2:] = digest, creators, iter(tags), len(log)
+                tags = frame[4]
+            tag = next(tags, None)
+            if tag is None:
+                stack.pop()
+                if digest is not None:
+                    firsts.setdefault(digest, (path, start, len(log)))
+                continue
+            action = action_for(tag)
+            if action == KEEP:
+                continue
+            if action is None:
+                if _may_be_sequence(ds, tag):
+                    elem = ds[tag]
+                    if elem.VR == "SQ":
+                        _push_items(stack, elem, path)
+                continue
+            name = _element_name(ds, tag, creators)
+            record = {"tag": str(tag), "name": name}
+            walked = _act(ds, tag, action, name, uid_map)
+            if walked is not None:
+                _push_items(stack, walked, path)
+            log.append((path, tag, action, record, walked is not None))
+            anonymised_headers.append(record)
+
+
+def _act(ds: dicom.dataset.Dataset,
+         tag: dicom.tag.BaseTag,
+         action: str,
+         name: str,
+         uid_map: UIDMap | None) -> dicom.dataelem.DataElement | None:
+    """Takes action ("X", "Z", "U" or "D") on the element of ds at tag.
+
+    Returns the sequence to walk into for a U action on one, else None.
+    """
+    try:
+        if action == "X":
+            del ds[tag]
+        elif action == "Z":
+            _empty_at(ds, tag)
+        elif action == "U":
+            elem = ds[tag]
+            if elem.VR == "SQ":
+                # U* rows (e.g. Source Image Sequence): the sequence is
+                # kept and the UIDs within its items are replaced, so
+                # walk into the items instead of rewriting the SQ.
+                return elem
+            _replace_uids(elem, uid_map)
+        else:  # D
+            _dummify(ds[tag], uid_map)
+    except Exception as e:
+        # Fail closed: an attribute that could not be processed may still
+        # contain PHI, so remove it rather than leave the original.
+        logger.error(
+            "Failed to apply PS3.15 action %s to %s (%s), removing it. %s: %s",
+            action, tag, name, type(e).__name__, e,
+        )
+        if tag in ds:
+            del ds[tag]
+    return None
+
+
+def _push_items(stack: list, elem: dicom.dataelem.DataElement, path: tuple) -> None:
+    """Pushes the items of the sequence elem, in the dataset at path, onto
+    the worklist of CompiledProfile.apply, the first item on top."""
+    tag = int(elem.tag)
+    stack.extend(
+        [item, path + ((tag, i),), None, None, None, 0]
+        for i, item in reversed(list(enumerate(elem.value)))
+        if isinstance(item, dicom.dataset.Dataset)
+    )
+
+
+def _replay(item: dicom.dataset.Dataset,
+            path: tuple,
+            first: tuple,
+            log: list,
+            anonymised_headers: list,
+            uid_map: UIDMap | None) -> None:
+    """Replays on item, at path, the actions CompiledProfile.apply logged for
+    an identical item: first is that item's path and span of log."""
+    first_path, start, end = first
+    depth = len(first_path)
+    for entry_path, tag, action, record, walked in log[start:end]:
+        relative = entry_path[depth:]
+        if not walked:
+            _act(sequence_items.at(item, relative), tag, action, record["name"], uid_map)
+        log.append((path + relative, tag, action, record, walked))
+        anonymised_headers.append(dict(record))
+
+
+@functools.lru_cache(maxsize=None)
+def compile_profile(retain_patient_characteristics: bool = False,
+                    scan_private: bool = False) -> CompiledProfile:
+    """Returns the (shared) CompiledProfile of an option set, without overrides."""
+    return CompiledProfile(retain_patient_characteristics, scan_private)
+
+
 def _apply(ds: dicom.dataset.Dataset, anonymised_headers: list,
            retain_patient_characteristics: bool = False,
            scan_private: bool = False) -> None:
-    for elem in list(ds):
-        # Retain Patient Characteristics Option: leave these attributes intact,
-        # overriding the Basic Profile action that would otherwise remove them.
-        if retain_patient_characteristics and int(elem.tag) in RETAIN_PATIENT_CHARACTERISTICS_KEEP:
-            continue
-        action = _action_for(elem.tag, scan_private)
-        if action is None:
-            if elem.VR == "SQ":
-                for item in elem.value:
-                    if isinstance(item, dicom.dataset.Dataset):
-                        _apply(item, anonymised_headers, retain_patient_characteristics, scan_private)
-            continue
-        record = {"tag": str(elem.tag), "name": elem.name}
-        resolved = _resolve_action(action)
-        try:
-            if resolved == "X":
-                del ds[elem.tag]
-            elif resolved == "Z":
-                _empty(elem)
-            elif resolved == "U":
-                if elem.VR == "SQ":
-                    # U* rows (e.g. Source Image Sequence): the sequence is
-                    # kept and the UIDs within its items are replaced, so
-                    # recurse into the items instead of rewriting the SQ.
-                    for item in elem.value:
-                        if isinstance(item, dicom.dataset.Dataset):
-                            _apply(item, anonymised_headers, retain_patient_characteristics, scan_private)
-                else:
-                    _replace_uids(elem)
-            else:  # D
-                _dummify(elem)
-        except Exception as e:
-            # Fail closed: an attribute that could not be processed may still
-            # contain PHI, so remove it rather than leave the original.
-            logger.error(
-                "Failed to apply PS3.15 action %s to %s (%s), removing it. %s: %s",
-                resolved, elem.tag, elem.name, type(e).__name__, e,
-            )
-            del ds[elem.tag]
-        anonymised_headers.append(record)
+    compile_profile(retain_patient_characteristics, scan_private).apply(ds, anonymised_headers)
 
 
 def _code_item(code_value: str, code_meaning: str) -> dicom.dataset.Dataset:
@@ -950,7 +1219,9 @@ def _code_item(code_value: str, code_meaning: str) -> dicom.dataset.Dataset:
 def apply_basic_profile(ds: dicom.dataset.Dataset,
                         anonymised_headers: list | None = None,
                         retain_patient_characteristics: bool = False,
-                        scan_private: bool = False) -> dicom.dataset.Dataset:
+                        scan_private: bool = False,
+                        profile: CompiledProfile | None = None,
+                        uid_map: UIDMap | None = None) -> dicom.dataset.Dataset:
     """De-identifies DICOM headers in-place per PS3.15 Annex E Basic Profile.
 
     Applies the Basic Application Level Confidentiality Profile actions from
@@ -983,6 +1254,16 @@ def apply_basic_profile(ds: dicom.dataset.Dataset,
         caller can scan them with the NER pipeline afterwards. The Basic
         Profile actions for standard attributes are unchanged.
 
+    profile : CompiledProfile, optional
+        The compiled profile to apply, e.g. one with overrides. If given, its
+        options take the place of retain_patient_characteristics and
+        scan_private; otherwise the shared profile of those options is used
+        (see compile_profile).
+
+    uid_map : uid_map.UIDMap, optional
+        Where UID replacements are memoised (and recorded, or read from a
+        table of an earlier run). The process-wide map if None.
+
     Returns
     -------
     pydicom.dataset.Dataset
@@ -990,7 +1271,10 @@ def apply_basic_profile(ds: dicom.dataset.Dataset,
     """
     if anonymised_headers is None:
         anonymised_headers = []
-    _apply(ds, anonymised_headers, retain_patient_characteristics, scan_private)
+    if profile is None:
+        profile = compile_profile(retain_patient_characteristics, scan_private)
+    retain_patient_characteristics = profile.retain_patient_characteristics
+    profile.apply(ds, anonymised_headers, uid_map)
     ds.PatientIdentityRemoved = "YES"
     method_codes = [_code_item("113100", "Basic Application Confidentiality Profile")]
     # Deidentification Method (0012,0063) is VR LO (max 64 chars), so keep the
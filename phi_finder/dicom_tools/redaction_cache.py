@@ -0,0 +1,332 @@
+"""Memoisation of header-value redactions.
+
+The files of a series repeat the same header strings over and over (protocol,
+station and series names, private vendor blobs, ...). The NER pipeline is a
+pure function of the value text and of the pipeline configuration, so its
+output can be cached and a repeated string analysed only once.
+
+The same strings also come back from one run to the next, so the cache can
+be kept on disk (PersistentRedactionCache) and shared by every run and worker
+process of a project. Only digests of the values are written to it, never
+the values themselves.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict, namedtuple
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class RedactionCache:
+    """Bounded, thread-safe LRU cache of redacted header values.
+
+    Keys are built with :meth:`key` from the value text, the score threshold
+    and a fingerprint of the analyser/GLiNER configuration, so one cache can
+    safely be shared by pipelines that are configured differently.
+
+    Parameters
+    ----------
+    maxsize : int, optional (default 100000)
+        Maximum number of entries kept; the least recently used entry is
+        dropped once the limit is reached.
+    """
+
+    def __init__(self, maxsize: int = 100_000) -> None:
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be positive, got {maxsize}")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text: str, score_threshold: float, fingerprint: str) -> tuple:
+        """Builds the cache key of a value analysed by a given pipeline."""
+        return (text, score_threshold, fingerprint)
+
+    def get(self, key: tuple) -> str | None:
+        """Returns the cached redaction for key, or None on a miss."""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: tuple, value: str) -> None:
+        """Stores the redaction for key, evicting the oldest entry if full."""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drops every entry and resets the hit/miss counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        """Hit/miss counters and size, in the style of functools.lru_cache."""
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class PersistentRedactionCache:
+    """On-disk cache of redacted header values, shared across runs and processes.
+
+    A drop-in for RedactionCache backed by an SQLite database, which any
+    number of sessions, threads and worker processes may open at once (the
+    database is in WAL mode; it must be on a local file system).
+
+    No header value is stored in clear. An entry is looked up by a keyed
+    BLAKE2b digest of the value, the score threshold and the pipeline
+    fingerprint, and the redacted value is encrypted with a key derived (by
+    another digest) from the same inputs: the file alone only reveals whether
+    a value that one can guess was seen. A secret, if given, is mixed into
+    both digests so that even guessed values cannot be checked without it.
+
+    Parameters
+    ----------
+    path : str or Path
+        The database file, created if needed.
+
+    maxsize : int, optional (default 1000000)
+        Maximum number of entries kept; the least recently used entries are
+        dropped once the limit is reached. Eviction runs every few hundred
+        writes of a process, so the file may briefly hold a few more.
+
+    secret : bytes or str, optional
+        Mixed into the digests of the keys and of the encryption keys. Every
+        process sharing the file must use the same secret.
+    """
+
+    # Bumping the schema invalidates the entries of older versions.
+    _SCHEMA = b"phi-finder-cache-1"
+    # Least-recently-used times are refreshed on a hit only if older than
+    # this (in ns), so most lookups do not write to the file.
+    _TOUCH_AFTER = 60 * 10**9
+    # Number of writes of a process between evictions.
+    _EVICT_EVERY = 256
+
+    def __init__(self, path: str | os.PathLike, maxsize: int = 1_000_000,
+                 secret: bytes | str | None = None) -> None:
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be positive, got {maxsize}")
+        self.path = os.fspath(path)
+        self.maxsize = maxsize
+        if isinstance(secret, str):
+            secret = secret.encode("utf8")
+        self._secret = secret
+        # BLAKE2b keys are at most 64 bytes long.
+        self._digest_key = hashlib.blake2b(secret).digest() if secret else b""
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections may not be shared between threads (nor across
+        # a fork), so each thread of each process opens its own.
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+        connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS redactions "
+            "(key BLOB PRIMARY KEY, value BLOB NOT NULL, used INTEGER NOT NULL) WITHOUT ROWID"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS redactions_used ON redactions (used)")
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    def key(self, text: str, score_threshold: float, fingerprint: str) -> tuple:
+        """Builds the cache key of a value analysed by a given pipeline.
+
+        The key is a pair of digests: the one the entry is stored under, and
+        the one its redacted value is encrypted with.
+        """
+        material = b"\0".join((self._SCHEMA, text.encode("utf8", "surrogatepass"),
+                               repr(score_threshold).encode(), str(fingerprint).encode("utf8")))
+        return (
+            hashlib.blake2b(material, key=self._digest_key, person=b"phi-finder-key").digest(),
+            hashlib.blake2b(material, key=self._digest_key, person=b"phi-finder-val").digest(),
+        )
+
+    @staticmethod
+    def _cipher(data: bytes, value_key: bytes) -> bytes:
+        # XOR with a SHAKE-256 keystream; the key is never reused, as it is
+        # derived from the value itself.
+        stream = hashlib.shake_256(value_key).digest(len(data))
+        return (
+            int.from_bytes(data, "little") ^ int.from_bytes(stream, "little")
+        ).to_bytes(len(data), "little")
+
+    def get(self, key: tuple) -> str | None:
+        """Returns the cached redaction for key, or None on a miss."""
+        lookup, value_key = key
+        connection = self._connect()
+        row = connection.execute(
+            "SELECT value, used FROM redactions WHERE key = ?", (lookup,)
+        ).fetchone()
+        value = None
+        if row is not None:
+            try:
+                value = self._cipher(row[0], value_key).decode("utf8", "surrogatepass")
+            except UnicodeDecodeError:
+                value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        now = time.time_ns()
+        if now - row[1] > self._TOUCH_AFTER:
+            connection.execute("UPDATE redactions SET used = ? WHERE key = ?", (now, lookup))
+        return value
+
+    def put(self, key: tuple, value: str) -> None:
+        """Stores the redaction for key, evicting the oldest entries if full."""
+        lookup, value_key = key
+        connection = self._connect()
+        connection.execute(
+            "INSERT OR REPLACE INTO redactions (key, value, used) VALUES (?, ?, ?)",
+            (
+                lookup,
+                self._cipher(value.encode("utf8", "surrogatepass"), value_key),
+                time.time_ns(),
+            ),
+        )
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % self._EVICT_EVERY == 0
+        if evict:
+            self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        connection.execute(
+            "DELETE FROM redactions WHERE key IN (SELECT key FROM redactions ORDER BY used "
+            "LIMIT max(0, (SELECT count(*) FROM redactions) - ?))",
+            (self.maxsize,),
+        )
+
+    def clear(self) -> None:
+        """Drops every entry (of every process) and resets the hit/miss counters."""
+        self._connect().execute("DELETE FROM redactions")
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        """Hit/miss counters of this instance and size of the file."""
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self))
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT count(*) FROM redactions").fetchone()[0]
+
+    def __getstate__(self) -> dict:
+        # Connections cannot be pickled: worker processes open the file again.
+        return {"path": self.path, "maxsize": self.maxsize, "secret": self._secret}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["path"], state["maxsize"], state["secret"])
+
+
+# Fingerprinting an analyser walks every recognizer (including the large
+# suburb deny list), so it is done once per analyser instance.
+_ANALYSER_FINGERPRINTS: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _analyser_fingerprint(analyser) -> str:
+    try:
+        return _ANALYSER_FINGERPRINTS[analyser]
+    except (KeyError, TypeError):
+        pass
+    registry = getattr(analyser, "registry", None)
+    if registry is None:
+        # Nothing to introspect: fall back to the object identity so two
+        # unrelated engines never share cache entries.
+        return f"{type(analyser).__qualname__}@{id(analyser):x}"
+    nlp_engine = getattr(analyser, "nlp_engine", None)
+    parts = [repr(getattr(nlp_engine, "models", None))]
+    # The name and version of each loaded spaCy pipeline, so that a model
+    # upgrade changes the fingerprint.
+    for lang, nlp in sorted((getattr(nlp_engine, "nlp", None) or {}).items()):
+        meta = getattr(nlp, "meta", None) or {}
+        parts.append(repr((lang, meta.get("lang"), meta.get("name"), meta.get("version"))))
+    for recognizer in registry.recognizers:
+        parts.append(
+            repr(
+                (
+                    type(recognizer).__qualname__,
+                    getattr(recognizer, "name", None),
+                    tuple(getattr(recognizer, "supported_entities", ()) or ()),
+                    tuple(
+                        (p.name, p.regex, p.score)
+                        for p in getattr(recognizer, "patterns", None) or ()
+                    ),
+                    tuple(getattr(recognizer, "deny_list", None) or ()),
+                    tuple(
+                        (entity, tuple(phrases))
+                        for entity, phrases in (
+                            getattr(recognizer, "deny_lists", None) or {}
+                        ).items()
+                    ),
+                )
+            )
+        )
+    fingerprint = hashlib.sha256("\n".join(parts).encode("utf8")).hexdigest()
+    try:
+        _ANALYSER_FINGERPRINTS[analyser] = fingerprint
+    except TypeError:
+        pass
+    return fingerprint
+
+
+def pipeline_fingerprint(analyser, gliner_pii=None) -> str:
+    """Identifies the configuration of a header redaction pipeline.
+
+    Parameters
+    ----------
+    analyser : AnalyzerEngine
+        The Presidio analyser; its NLP models (with the name and version of
+        each spaCy pipeline) and recognizers (patterns and deny lists) are
+        part of the fingerprint.
+
+    gliner_pii : UniEncoderSpanGLiNER, optional
+        The GLiNER model run on top of Presidio, if any. It is identified by
+        its checkpoint attribute (the model id or path it was loaded from,
+        set by engines.get_transformer); a model without one is identified by
+        the object itself, so its redactions are never shared across runs.
+
+    Returns
+    -------
+    str
+        A digest that changes whenever the pipeline would redact differently.
+    """
+    fingerprint = _analyser_fingerprint(analyser)
+    if gliner_pii is not None:
+        checkpoint = getattr(gliner_pii, "checkpoint", None)
+        if checkpoint is None:
+            checkpoint = f"@{id(gliner_pii):x}"
+        fingerprint += f"|{type(gliner_pii).__qualname__}:{checkpoint}"
+    return fingerprint
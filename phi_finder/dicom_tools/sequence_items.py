@@ -0,0 +1,102 @@
+"""Content fingerprints of sequence items, to process identical items once.
+
+Enhanced multi-frame objects repeat the same functional group items frame
+after frame (Pixel Measures, Plane Orientation, MR Echo, ...): the items of
+PerFrameFunctionalGroupsSequence differ in a few position and timing
+attributes, and their nested items often not at all. The de-identification
+of an item only depends on its content, so identical items need processing
+only once; the changes made to the first of them are then replayed on the
+others (see ps3_15.CompiledProfile.apply and anonymise_dicom._anonymise_datasets).
+
+An item's fingerprint is a hash of its encoded content: the tag, VR and raw
+bytes of each element as read from the file. pydicom only parses a sequence
+read from a file when it is accessed, and until then its raw bytes hold all
+its items, so the nested sequences of an item that turns out to be a
+duplicate are never parsed at all.
+"""
+import hashlib
+
+import pydicom as dicom
+
+
+def fingerprint(item: dicom.dataset.Dataset, found: dict | None = None) -> bytes:
+    """The digest of the content of item.
+
+    Items with the same digest have the same elements and values, sequences
+    included. Raw elements are hashed as they were read; sequences already
+    parsed (or built in memory) through the digests of their items.
+
+    Parameters
+    ----------
+    item : pydicom.dataset.Dataset
+        The sequence item.
+
+    found : dict, optional
+        Memoises digests by id() of the item, for the items of parsed
+        sequences: pass the same dict for every item of one tree, so nested
+        items are hashed once. Only valid while the items are unchanged.
+        Each entry keeps its item alive, so an id is never reused by another
+        item while the memo holds it.
+    """
+    if found is None:
+        found = {}
+    # The tree of parsed sequences is walked with a worklist, not by
+    # recursion; descendants are met after their ancestors, so in reverse
+    # order they are all hashed first. Each item's digest goes to a slot of
+    # its parent's list of item digests.
+    order = []
+    root = [None]
+    stack = [(item, root, 0)]
+    while stack:
+        ds, slots, index = stack.pop()
+        known = _memoised(found, ds)
+        if known is not None:
+            slots[index] = known
+            continue
+        digest = hashlib.blake2b(digest_size=16)
+        sequences = []
+        for tag in ds.keys():
+            elem = ds.get_item(tag)
+            if isinstance(elem, dicom.dataelem.RawDataElement):
+                value = elem.value or b""
+            elif elem.VR == "SQ":
+                children = [
+                    child
+                    for child in elem.value
+                    if isinstance(child, dicom.dataset.Dataset)
+                ]
+                digests = [None] * len(children)
+                sequences.append((int(tag), digests))
+                stack.extend((child, digests, i) for i, child in enumerate(children))
+                continue
+            else:
+                value = (
+                    elem.value
+                    if isinstance(elem.value, bytes)
+                    else repr(elem.value).encode()
+                )
+            digest.update(b"%08x:%s:%d:" % (int(tag), str(elem.VR).encode(), len(value)))
+            digest.update(value)
+        order.append((ds, digest, sequences, slots, index))
+    for ds, digest, sequences, slots, index in reversed(order):
+        for tag, digests in sequences:
+            digest.update(b"%08x:items:%d:" % (tag, len(digests)))
+            for child in digests:
+                digest.update(child)
+        slots[index] = digest.digest()
+        found[id(ds)] = (ds, slots[index])
+    return root[0]
+
+
+def _memoised(found: dict, item: dicom.dataset.Dataset) -> bytes | None:
+    entry = found.get(id(item))
+    if entry is None or entry[0] is not item:
+        return None
+    return entry[1]
+
+
+def at(ds: dicom.dataset.Dataset, path: tuple) -> dicom.dataset.Dataset:
+    """The item of ds at path, a tuple of (sequence tag, item index) steps."""
+    for tag, index in path:
+        ds = ds[tag].value[index]
+    return ds
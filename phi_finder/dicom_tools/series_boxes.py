@@ -0,0 +1,197 @@
+"""Burned-in text boxes shared by the slices of a series.
+
+A vendor's burned-in annotations (patient name, dates, institution) sit at the
+same pixel positions on every slice of a series, yet OCR, by far the most
+expensive step of redacting pixel data, used to run on every slice. A
+BoxTemplate lets OCR run on a sample of the slices only: the union of the text
+boxes found on them is filled on every slice with one vectorised assignment.
+
+A slice is sent to OCR again when the pixels under the boxes differ from
+those of the last slice OCR'd: different text there (e.g. a longer name, a
+different overlay) may also reach outside the boxes. Text at other positions
+of the slices that are not OCR'd is not looked for, so use the template only
+for series whose annotations do not move from slice to slice. Until OCR has
+found a box, every slice goes through OCR (the burned-in text screen, see
+AnonymisationSession, is what skips the clean ones).
+"""
+import logging
+
+import numpy as np
+import pydicom as dicom
+
+logger = logging.getLogger(__name__)
+
+
+class BoxTemplate:
+    """Burned-in text boxes of a series, found by OCR on some of its slices
+    and filled in on all of them.
+
+    Use one template per series, in slice order (see
+    AnonymisationSession.anonymise).
+
+    Parameters
+    ----------
+    sample_size : int, optional (default 3)
+        Number of slices (the first ones) that always go through OCR.
+
+    max_changed : float, optional (default 0.0)
+        Fraction of the pixels under the boxes that may differ from those of
+        the last slice OCR'd before a slice is sent to OCR again. 0 sends
+        every slice whose boxes are not pixel-identical.
+    """
+
+    def __init__(self, sample_size: int = 3, max_changed: float = 0.0) -> None:
+        if sample_size < 1:
+            raise ValueError(f"sample_size must be positive, got {sample_size}")
+        if not 0.0 <= max_changed <= 1.0:
+            raise ValueError(f"max_changed must be between 0 and 1, got {max_changed}")
+        self.sample_size = sample_size
+        self.max_changed = max_changed
+        self.boxes: list = []
+        self.ocr_runs = 0
+        self.reused = 0
+        self._shape = None
+        self._mask = None
+        self._colour = None
+        self._reference = None
+
+    @staticmethod
+    def _image_shape(pixels: np.ndarray, ds: dicom.dataset.Dataset) -> tuple:
+        """(rows, columns) of the frames of pixels."""
+        if int(ds.get("SamplesPerPixel", 1) or 1) > 1:
+            return pixels.shape[-3:-1]
+        return pixels.shape[-2:]
+
+    @classmethod
+    def _frames(cls, pixels: np.ndarray, ds: dicom.dataset.Dataset) -> np.ndarray:
+        """pixels as (frames, rows, columns[, samples])."""
+        samples = int(ds.get("SamplesPerPixel", 1) or 1)
+        return pixels.reshape(
+            -1, *cls._image_shape(pixels, ds), *((samples,) if samples > 1 else ())
+        )
+
+    @staticmethod
+    def _under(pixels: np.ndarray, mask: np.ndarray, ds: dicom.dataset.Dataset) -> np.ndarray:
+        """The pixels of every frame (and sample) under mask."""
+        if int(ds.get("SamplesPerPixel", 1) or 1) > 1:
+            return pixels[..., mask, :]
+        return pixels[..., mask]
+
+    def needs_ocr(self, ds: dicom.dataset.Dataset) -> bool:
+        """Whether the slice ds must go through OCR, rather than only have the
+        template's boxes filled in."""
+        if self.ocr_runs < self.sample_size or self._shape is None:
+            return True
+        pixels = ds.pixel_array
+        if pixels.shape != self._shape:
+            return True
+        if self._mask is None:
+            # No text found on the sample says nothing of the later slices
+            # (localisers, annotated key images, a summary slice): fail
+            # towards OCR, as burned_in_text.screen does.
+            return True
+        if self._colour is None:
+            return True  # The boxes cannot be filled without OCR.
+        changed = np.count_nonzero(self._under(pixels, self._mask, ds) != self._reference)
+        return changed > self.max_changed * self._reference.size
+
+    def add(
+        self, ds: dicom.dataset.Dataset, redacted: dicom.dataset.Dataset, bboxes: list
+    ) -> None:
+        """Adds the boxes OCR found on the slice ds to the template.
+
+        Parameters
+        ----------
+        ds : pydicom.dataset.Dataset
+            The slice, before redaction.
+
+        redacted : pydicom.dataset.Dataset
+            The slice as redacted by the image redactor; the boxes are filled
+            with its colour.
+
+        bboxes : list of dict
+            The boxes the image redactor filled (top, left, width, height).
+        """
+        self.ocr_runs += 1
+        pixels = ds.pixel_array
+        if self._shape is None:
+            self._shape = pixels.shape
+        elif pixels.shape != self._shape:
+            # Not a slice of the series' geometry: redacted on its own.
+            logger.debug(
+                "Slice of shape %s does not match the box template %s.",
+                pixels.shape,
+                self._shape,
+            )
+            return
+        rows, columns = self._image_shape(pixels, ds)
+        for bbox in bboxes:
+            top, left = max(int(bbox["top"]), 0), max(int(bbox["left"]), 0)
+            bottom, right = min(top + int(bbox["height"]), rows), min(
+                left + int(bbox["width"]), columns
+            )
+            if bottom <= top or right <= left:
+                continue
+            if self._mask is None:
+                self._mask = np.zeros((rows, columns), dtype=bool)
+            if self._colour is None and redacted.pixel_array.shape == pixels.shape:
+                # The colour the image redactor chose, read back from its box
+                # (on the first frame).
+                self._colour = self._frames(redacted.pixel_array, ds)[0, top, left].copy()
+            self._mask[top:bottom, left:right] = True
+            self.boxes.append(
+                {
+                    "top": top,
+                    "left": left,
+                    "width": right - left,
+                    "height": bottom - top,
+                }
+            )
+        if self._mask is not None:
+            self._reference = self._under(pixels, self._mask, ds).copy()
+
+    def fill(self, ds: dicom.dataset.Dataset) -> dicom.dataset.Dataset:
+        """Fills the template's boxes on every frame of ds, in place.
+
+        Compressed pixel data is decompressed first. Slices that do not have
+        the series' geometry are returned unchanged.
+        """
+        if self._mask is None or self._colour is None:
+            return ds
+        if ds.file_meta.TransferSyntaxUID.is_compressed:
+            ds.decompress()
+        pixels = ds.pixel_array
+        if pixels.shape != self._shape:
+            return ds
+        if int(ds.get("SamplesPerPixel", 1) or 1) > 1:
+            pixels[..., self._mask, :] = self._colour
+        else:
+            pixels[..., self._mask] = self._colour
+        ds.PixelData = pixels.tobytes()
+        return ds
+
+    def redact(self, ds: dicom.dataset.Dataset, ocr) -> dicom.dataset.Dataset:
+        """Redacts the burned-in text of the next slice of the series.
+
+        Parameters
+        ----------
+        ds : pydicom.dataset.Dataset
+            The slice.
+
+        ocr : callable
+            Takes a slice and returns it redacted, with the boxes it filled,
+            e.g. DicomImageRedactorEngine.redact_and_return_bbox. Called only
+            for the slices that need OCR (see needs_ocr).
+
+        Returns
+        -------
+        pydicom.dataset.Dataset
+            The slice with the template's boxes filled in.
+        """
+        if self.needs_ocr(ds):
+            redacted, bboxes = ocr(ds)
+            self.add(ds, redacted, bboxes)
+            ds = redacted
+        else:
+            self.reused += 1
+        return self.fill(ds)
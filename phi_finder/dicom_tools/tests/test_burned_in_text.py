@@ -0,0 +1,94 @@
+import json
+
+import pydicom
+import pytest
+from pydicom.data import get_testdata_files
+
+from phi_finder.dicom_tools import anonymise_dicom, burned_in_text
+
+
+def _with_text(ds: pydicom.Dataset) -> pydicom.Dataset:
+    """ds with a row of one-pixel-wide glyph-like boxes burned into its top-left corner."""
+    pixels = ds.pixel_array.copy()
+    ink = pixels.max()
+    for left in range(4, 60, 6):
+        pixels[4:12, left] = pixels[4:12, left + 3] = ink
+        pixels[4, left:left + 4] = pixels[8, left:left + 4] = pixels[11, left:left + 4] = ink
+    ds.PixelData = pixels.tobytes()
+    return ds
+
+
+def test_screen_tells_images_with_text_apart():
+    clean = pydicom.dcmread(get_testdata_files("CT_small.dcm")[0])
+    assert not burned_in_text.screen(clean).needs_ocr
+    assert burned_in_text.screen(_with_text(clean)).needs_ocr
+    ultrasound = pydicom.dcmread(get_testdata_files("examples_palette.dcm")[0])
+    result = burned_in_text.screen(ultrasound)
+    assert result.needs_ocr
+    assert result.score >= result.threshold
+
+
+def _cine(text_frame: int | None, n_frames: int = 7) -> pydicom.Dataset:
+    """CT_small repeated n_frames times, with text on frame text_frame only."""
+    ds = pydicom.dcmread(get_testdata_files("CT_small.dcm")[0])
+    frame = ds.pixel_array
+    frames = [frame] * n_frames
+    if text_frame is not None:
+        frames[text_frame] = _with_text(
+            pydicom.dcmread(get_testdata_files("CT_small.dcm")[0])
+        ).pixel_array
+    ds.NumberOfFrames = n_frames
+    ds.PixelData = b"".join(f.tobytes() for f in frames)
+    return ds
+
+
+def test_screen_looks_at_every_frame():
+    # Frame 2 is not among the first, middle and last frames.
+    assert not burned_in_text.screen(_cine(None)).needs_ocr
+    assert burned_in_text.screen(_cine(2)).needs_ocr
+    # A clean sample of the frames does not clear the image.
+    sampled = burned_in_text.screen(_cine(None), max_frames=3)
+    assert sampled.needs_ocr
+    assert sampled.reason == "only 3 of 7 frames screened"
+
+
+def test_screen_defers_to_ocr():
+    ds = pydicom.dcmread(get_testdata_files("CT_small.dcm")[0])
+    assert burned_in_text.screen(ds, sensitivity=1).needs_ocr
+    ds.BurnedInAnnotation = "YES"
+    assert burned_in_text.screen(ds, sensitivity=0).needs_ocr
+    with pytest.raises(ValueError):
+        burned_in_text.screen(ds, sensitivity=1.5)
+    waveform = pydicom.dcmread(get_testdata_files("waveform_ecg.dcm")[0])
+    assert not burned_in_text.screen(waveform).needs_ocr
+
+
+class _CountingRedactor:
+    def __init__(self):
+        self.calls = 0
+
+    def redact(self, ds, **kwargs):
+        self.calls += 1
+        return ds
+
+
+def test_session_skips_ocr_and_records_the_screen():
+    redactor = _CountingRedactor()
+    session = anonymise_dicom.AnonymisationSession(use_case="PS3.15",
+                                                   image_redactor=redactor,
+                                                   prescreen_sensitivity=0.75)
+    clean = session.anonymise(pydicom.dcmread(get_testdata_files("CT_small.dcm")[0]))
+    assert redactor.calls == 0
+    record = json.loads(clean[0x0209, 0x1001].value)
+    assert record["needs_ocr"] is False
+    assert record["reason"] == "no text-like border tile"
+    session.anonymise(_with_text(pydicom.dcmread(get_testdata_files("CT_small.dcm")[0])))
+    assert redactor.calls == 1
+    # Without the screen, every image goes through OCR and nothing is recorded.
+    unscreened = anonymise_dicom.AnonymisationSession(
+        use_case="PS3.15", image_redactor=redactor
+    )
+    assert (0x0209, 0x1001) not in unscreened.anonymise(
+        pydicom.dcmread(get_testdata_files("CT_small.dcm")[0])
+    )
+    assert redactor.calls == 2
@@ -0,0 +1,113 @@
+import pytest
+
+from phi_finder.dicom_tools import anonymise_dicom
+from phi_finder.dicom_tools.cascade import Cascade
+
+# Values the full Presidio pass redacts: the cascade must too.
+PHI_VALUES = [
+    "Patient lives in Sydney",
+    "Female",
+    "F",
+    "01/01/1980",
+    "19430617",
+    "076Y",
+    "Dr Smith",
+    "DR JONES",
+    "0412 345 678",
+    "12 Smith Street",
+    "Kogarah NSW 2217",
+    "St George Hospital",
+    "john.smith@example.com",
+    "Dear Mary Brown",
+]
+CLEAN_VALUES = ["t1_mprage_sag", "ORIGINAL", "head first", "Not sensitive", "AX T2 FLAIR"]
+
+
+@pytest.fixture(scope="module")
+def analyser():
+    return anonymise_dicom._build_presidio_analyser(0.5)
+
+
+def test_cascade_keeps_recall(analyser):
+    anonymizer = anonymise_dicom.AnonymizerEngine()
+    values = PHI_VALUES + CLEAN_VALUES
+    full = anonymise_dicom._redact_texts(values, analyser, anonymizer, 0.5)
+    cascade = Cascade()
+    cascaded = anonymise_dicom._redact_texts(values, analyser, anonymizer, 0.5, cascade=cascade)
+    assert cascaded == full
+    assert all(cascaded[v] != v for v in PHI_VALUES)
+    info = cascade.info()
+    assert info["patterns"].values == len(values)
+    # Only values with words, letters next to digits, e-mails or URLs reach
+    # spaCy.
+    survivors = [v for v in values if cascade.survives_triage(v)]
+    assert info["nlp"].values == len(survivors) < len(values)
+    assert "F" not in survivors and "0412 345 678" not in survivors
+    assert {
+        "Kogarah NSW 2217",
+        "076Y",
+        "john.smith@example.com",
+        "t1_mprage_sag",
+    } <= set(survivors)
+    cascade.clear()
+    assert cascade.info()["patterns"].values == 0
+
+
+def test_upper_and_lower_case_names_reach_the_nlp_stage(analyser):
+    cascade = Cascade()
+    values = ["JOHN SMITH", "DR JONES", "john smith", "head", "1.5"]
+    anonymise_dicom._redact_texts(
+        values, analyser, anonymise_dicom.AnonymizerEngine(), 0.5, cascade=cascade
+    )
+    assert [cascade.survives_triage(v) for v in values] == [True, True, True, False, False]
+    assert cascade.info()["nlp"].values == 3
+
+
+class _GLiNER:
+    def __init__(self):
+        self.texts = []
+
+    def batch_predict_entities(self, texts, labels, threshold=0.5):
+        self.texts.extend(texts)
+        return [[{"start": 0, "end": 4, "label": "person"}] for _ in texts]
+
+
+def test_gliner_only_sees_long_ambiguous_values(analyser):
+    gliner = _GLiNER()
+    cascade = Cascade(triage=lambda text: "Smythe" in text)
+    values = [
+        "Smythe reviewed the images on the ward",
+        "reviewed the images on the ward today",
+        "Smythe",
+    ]
+    redacted = anonymise_dicom._redact_texts(
+        values,
+        analyser,
+        anonymise_dicom.AnonymizerEngine(),
+        0.5,
+        gliner_pii=gliner,
+        cascade=cascade,
+    )
+    assert gliner.texts == ["Smythe reviewed the images on the ward"]
+    assert (
+        redacted["reviewed the images on the ward today"]
+        == "reviewed the images on the ward today"
+    )
+    assert cascade.info()["gliner"][:2] == (1, 1)
+
+
+def test_session_cascade_is_part_of_the_cache_key(analyser):
+    cache = anonymise_dicom.RedactionCache()
+    session = anonymise_dicom.AnonymisationSession(analyser=analyser, cache=cache, cascade=True)
+    assert isinstance(session.cascade, Cascade)
+    assert anonymise_dicom.AnonymisationSession(analyser=analyser).cascade is None
+    for cascade in (session.cascade, None):
+        anonymise_dicom._redact_texts(
+            ["Dr Smith"],
+            analyser,
+            anonymise_dicom.AnonymizerEngine(),
+            0.5,
+            cache=cache,
+            cascade=cascade,
+        )
+    assert cache.info().misses == 2
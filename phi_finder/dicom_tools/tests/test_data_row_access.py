@@ -1,6 +1,12 @@
+import shutil
+import threading
+import time
+import types
 import numpy as np
+import pytest
 from pathlib import Path
 from frametree.core.row import DataRow
+from pydicom.data import get_testdata_files
 
 from phi_finder.dicom_tools import utils
 
@@ -80,6 +86,204 @@ def test_ingest_anonymised_dicom(data_row: DataRow):
     assert n_scans_after == 12
 
 
+def test_ingest_anonymised_dicom_with_workers(data_row: DataRow):
+    utils.deidentify_dicom_files(data_row,
+                                 score_threshold=0.5,
+                                 spacy_model_name="en_core_web_md",
+                                 destroy_pixels=True,
+                                 use_transformers=False,
+                                 dry_run=False,
+                                 workers=2)
+    n_scans_after = utils._count_dicom_files(data_row, resource_path=None)
+    dicom_files = utils._get_dicom_files(data_row)
+    assert n_scans_after == 12
+    for dicom_file in dicom_files[6:]:
+        assert np.all(dicom_file == 0)
+        assert dicom_file.shape == (8, 8)
+
+
+def test_chunk_bounds_are_contiguous_and_cover_the_series():
+    assert utils._chunk_bounds(10, 4) == [(0, 3), (3, 6), (6, 8), (8, 10)]
+    assert utils._chunk_bounds(2, 4) == [(0, 1), (1, 2)]
+    assert utils._chunk_bounds(0, 4) == []
+
+
+def test_ingest_anonymised_dicom_one_entry_in_flight(data_row: DataRow):
+    utils.deidentify_dicom_files(data_row,
+                                 score_threshold=0.5,
+                                 spacy_model_name="en_core_web_md",
+                                 destroy_pixels=True,
+                                 use_transformers=False,
+                                 dry_run=False,
+                                 max_in_flight=1,
+                                 max_disk_bytes=1)
+    assert utils._count_dicom_files(data_row, resource_path=None) == 12
+
+
+def test_in_flight_budget_always_admits_one_entry():
+    budget = utils._InFlightBudget(max_entries=2, max_bytes=100)
+    assert budget.acquire()
+    budget.add_bytes(500)  # Over the disk budget: no second entry...
+    assert not budget._has_room()
+    budget.release(500)  # ...until the first one is done.
+    assert budget.acquire() and budget.acquire()
+    assert not budget._has_room()  # Two entries in flight.
+    budget.abort()
+    assert not budget.acquire()
+
+
+class _Store:
+    """Stands in for the store connection; records the calls made to it.
+
+    Entry creations and field writes count how many overlapped. A transfer
+    named in meet waits (for up to 5 s) for the transfer it names to start,
+    and records whether it did.
+    """
+
+    def __init__(self, meet=None):
+        self.events = []
+        self.active = 0
+        self.max_active = 0
+        self.meet = meet or {}
+        self.met = {}
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def _event(self, name: str) -> threading.Event:
+        with self._lock:
+            return self._started.setdefault(name, threading.Event())
+
+    def transfer(self, event: str):
+        with self._lock:
+            self.events.append(event)
+        self._event(event).set()
+        if event in self.meet:
+            self.met[event] = self._event(self.meet[event]).wait(5)
+
+    def call(self, event: str):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.events.append(event)
+        time.sleep(0.02)
+        with self._lock:
+            self.active -= 1
+
+
+class _Fields(dict):
+    def __init__(self, store):
+        super().__init__()
+        self.store = store
+
+    def __setitem__(self, key, value):
+        self.store.call(f"field {key}")
+        super().__setitem__(key, value)
+
+
+class _Entry:
+    def __init__(self, store, name, paths=()):
+        self.store = store
+        self.name = name
+        self.paths = list(paths)
+        self.datatype = utils.DicomSeries
+        self.is_derivative = False
+
+    @property
+    def item(self):
+        self.store.transfer(f"download {self.name}")
+        return types.SimpleNamespace(contents=self.paths)
+
+    @item.setter
+    def item(self, series):
+        self.store.transfer(f"upload {self.name}")
+
+
+class _Connection:
+    def __init__(self, session):
+        self.session = session
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return None
+
+
+class _Row:
+    def __init__(self, store, entries):
+        self.store = store
+        self.id = "session"
+        self.entries_dict = entries
+        xsession = types.SimpleNamespace(fields=_Fields(store))
+        session = types.SimpleNamespace(
+            projects={
+                "project": types.SimpleNamespace(experiments={"session": xsession})
+            }
+        )
+        self.frameset = types.SimpleNamespace(
+            id="project", store=types.SimpleNamespace(connection=_Connection(session))
+        )
+
+    def create_entry(self, path, datatype, order_key):
+        self.store.call(f"create {path}")
+        return _Entry(self.store, path.split("_")[0])
+
+
+def _fake_row(tmp_path, store, n_entries=4):
+    entries = {}
+    for i in range(n_entries):
+        path = tmp_path / f"scan{i}.dcm"
+        shutil.copy(get_testdata_files("CT_small.dcm")[0], path)
+        entries[(f"scan{i}/DICOM", str(i))] = _Entry(store, str(i), [path])
+    return _Row(store, entries)
+
+
+def test_downloads_and_uploads_overlap(tmp_path):
+    # The third download and the first upload each wait for the other to
+    # start: they only both succeed if they run at the same time.
+    store = _Store(meet={"download 2": "upload 0", "upload 0": "download 2"})
+    utils.deidentify_dicom_files(
+        _fake_row(tmp_path, store),
+        use_case="PS3.15",
+        destroy_pixels=True,
+        redact_pixels=False,
+        max_in_flight=3,
+    )
+    assert store.met == {"download 2": True, "upload 0": True}
+    assert [event for event in store.events if event.startswith("upload")] == [
+        f"upload {i}" for i in range(4)
+    ]
+    # Entries are created and fields written one at a time.
+    assert store.max_active == 1
+
+
+def test_failed_anonymisation_frees_its_entry(tmp_path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    temp = tmp_path / "temp"
+    temp.mkdir()
+    monkeypatch.setattr(utils.tempfile, "tempdir", str(temp))
+    monkeypatch.setattr(utils, "_anonymise_job", fail)
+    releases = []
+    release = utils._InFlightBudget.release
+    monkeypatch.setattr(
+        utils._InFlightBudget,
+        "release",
+        lambda self, n_bytes: releases.append(n_bytes) or release(self, n_bytes),
+    )
+    with pytest.raises(RuntimeError):
+        utils.deidentify_dicom_files(
+            _fake_row(tmp_path, _Store(), n_entries=1),
+            use_case="PS3.15",
+            destroy_pixels=True,
+            redact_pixels=False,
+        )
+    # The job's temp dir and budget were freed before the error surfaced.
+    assert list(temp.iterdir()) == []
+    assert len(releases) == 1
+
+
 def test_dry_run(data_row: DataRow):
     n_scans_before = utils._count_dicom_files(data_row, resource_path=None)
     assert n_scans_before == 6
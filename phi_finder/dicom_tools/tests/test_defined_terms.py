@@ -0,0 +1,55 @@
+import pydicom
+from pydicom.tag import Tag
+
+from phi_finder.dicom_tools import anonymise_dicom, defined_terms
+
+
+class _RecordingAnalyser:
+    def __init__(self):
+        self.texts = []
+
+    def analyze(self, text, *args, **kwargs):
+        self.texts.append(text)
+        return []
+
+
+def _mr_header() -> pydicom.Dataset:
+    ds = pydicom.Dataset()
+    ds.ScanningSequence = ["SE", "IR"]
+    ds.SequenceVariant = ["SK", "SP", "MP"]
+    ds.MRAcquisitionType = "2D"
+    ds.BodyPartExamined = "HEAD"
+    ds.Laterality = ""
+    ds.ScanOptions = ["SAT2", "FS"]
+    return ds
+
+
+def test_defined_terms_skip_ner():
+    analyser = _RecordingAnalyser()
+    ds = _mr_header()
+    anonymise_dicom._anonymise_ds(ds, analyser, anonymise_dicom.AnonymizerEngine(), 0.5)
+    # ScanOptions is not in the index: its values are still analysed.
+    assert sorted(analyser.texts) == ["FS", "SAT2"]
+    assert list(ds.ScanningSequence) == ["SE", "IR"]
+
+
+def test_values_outside_the_defined_terms_are_analysed():
+    analyser = _RecordingAnalyser()
+    ds = _mr_header()
+    ds.BodyPartExamined = "SMITH"
+    ds.SequenceVariant = ["SK", "JONES"]
+    anonymise_dicom._anonymise_ds(ds, analyser, anonymise_dicom.AnonymizerEngine(), 0.5)
+    assert {"SMITH", "SK", "JONES"} <= set(analyser.texts)
+
+
+def test_only_defined_terms():
+    assert defined_terms.only_defined_terms(Tag("ImageLaterality"), ["L "])
+    assert defined_terms.only_defined_terms(Tag("SpecificCharacterSet"), ["", "ISO 2022 IR 87"])
+    assert not defined_terms.only_defined_terms(Tag("Laterality"), ["L", "X"])
+    # Tags the index does not list, private ones included, always go to NER.
+    assert not defined_terms.only_defined_terms(Tag("ScanOptions"), ["FS"])
+    assert not defined_terms.only_defined_terms(0x00191001, ["YES"])
+    assert defined_terms.only_defined_terms(
+        0x00191001, ["YES"], {0x00191001: frozenset({"YES"})}
+    )
+    assert defined_terms.STANDARD_VERSION
@@ -0,0 +1,36 @@
+from phi_finder.dicom_tools.deny_list_recognizer import DenyListRecognizer
+
+
+def _recognizer():
+    return DenyListRecognizer({
+        "SUBURB": ["Abercrombie", "Abercrombie River", "Newcastle"],
+        "INSTITUTE": ["Newcastle", "Prince of Wales", "Prince of Wales Hospital"],
+        "TITLE": ["A/Prof."],
+    })
+
+
+def test_matches_whole_phrases_case_insensitively():
+    matches = _recognizer().match("seen at PRINCE OF WALES hospital")
+    assert matches == [(8, 32, "INSTITUTE")]
+
+
+def test_requires_word_boundaries():
+    recognizer = _recognizer()
+    assert recognizer.match("Abercrombies") == []
+    assert recognizer.match("NewNewcastle") == []
+    assert recognizer.match("(Newcastle)") == [(1, 10, "SUBURB"), (1, 10, "INSTITUTE")]
+
+
+def test_prefers_the_longest_phrase():
+    assert _recognizer().match("Abercrombie River") == [(0, 17, "SUBURB")]
+
+
+def test_phrases_ending_in_punctuation():
+    assert _recognizer().match("A/Prof. Jones") == [(0, 7, "TITLE")]
+
+
+def test_analyze_filters_requested_entities():
+    results = _recognizer().analyze("Newcastle", ["INSTITUTE"])
+    assert [(r.entity_type, r.start, r.end, r.score) for r in results] == [
+        ("INSTITUTE", 0, 9, 1.0)
+    ]
@@ -0,0 +1,75 @@
+import threading
+import time
+
+import pydicom
+import pytest
+from pydicom.data import get_testdata_files
+
+from phi_finder.dicom_tools import anonymise_dicom, engines
+
+
+@pytest.fixture
+def built(monkeypatch):
+    """Replaces the analyser builder with a cheap one recording its calls."""
+    calls = []
+
+    def build(score_threshold=0.5, spacy_model_name="en_core_web_md"):
+        calls.append((score_threshold, spacy_model_name))
+        time.sleep(0.01)  # Widens the window for concurrent builds.
+        return object()
+
+    monkeypatch.setattr(anonymise_dicom, "_build_presidio_analyser", build)
+    engines.clear()
+    yield calls
+    engines.clear()
+
+
+def test_analyser_built_once_per_configuration(built):
+    first = engines.get_analyser(0.5, "en_core_web_md")
+    assert engines.get_analyser(0.5, "en_core_web_md") is first
+    other = engines.get_analyser(0.15, "en_core_web_md")
+    assert other is not first
+    assert built == [(0.5, "en_core_web_md"), (0.15, "en_core_web_md")]
+
+
+def test_concurrent_getters_share_one_build(built):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(engines.get_analyser()))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(built) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_evict_and_clear_rebuild_on_next_use(built):
+    first = engines.get_analyser()
+    anonymizer = engines.get_anonymizer()
+    assert engines.evict("analyser") == 1
+    assert engines.get_anonymizer() is anonymizer
+    second = engines.get_analyser()
+    assert second is not first
+    engines.clear()
+    assert engines.get_analyser() is not second
+    assert engines.get_anonymizer() is not anonymizer
+    assert len(built) == 3
+
+
+def test_anonymise_image_uses_shared_engines(built, monkeypatch):
+    # With no engines passed in, anonymise_image must reuse the registry's
+    # instead of building its own for every call.
+    seen = []
+    monkeypatch.setattr(
+        anonymise_dicom,
+        "_anonymise_ds",
+        lambda ds, analyser, anonymizer, *args, **kwargs: seen.append(
+            (analyser, anonymizer)
+        ),
+    )
+    for _ in range(2):
+        anonymise_dicom.anonymise_image(pydicom.dcmread(get_testdata_files("CT_small.dcm")[0]))
+    assert len(built) == 1
+    assert seen[0][0] is seen[1][0]
+    assert seen[0][1] is seen[1][1]
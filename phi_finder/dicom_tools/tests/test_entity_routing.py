@@ -0,0 +1,106 @@
+import copy
+
+import pydicom
+import pytest
+from pydicom.data import get_testdata_files
+from pydicom.tag import Tag
+
+from phi_finder.dicom_tools import anonymise_dicom, entity_routing
+
+
+@pytest.fixture(scope="module")
+def analyser():
+    return anonymise_dicom._build_presidio_analyser(0.5)
+
+
+def _dataset() -> pydicom.Dataset:
+    """CT_small with PHI typed into routed tags, a CS and a private tag."""
+    ds = pydicom.dcmread(get_testdata_files("CT_small.dcm")[0])
+    ds.InstitutionName = "St George Hospital"
+    ds.InstitutionAddress = "12 Smith Street, Kogarah NSW 2217"
+    ds.StationName = "0412 345 678"
+    ds.Manufacturer = "Serviced by Dr Smith"
+    ds.ImageType = ["ORIGINAL", "PRIMARY", "AXIAL", "M"]
+    ds.add_new((0x0009, 0x0010), "LO", "ACME 1.0")
+    ds.add_new((0x0009, 0x1001), "LO", "Call 0412 345 678, 1 Main Street 2000")
+    return ds
+
+
+def _anonymise(ds, analyser, routes):
+    flagged = []
+    anonymise_dicom._anonymise_ds(ds, analyser, anonymise_dicom.AnonymizerEngine(), 0.5,
+                                  anonymised_headers=flagged, routes=routes)
+    return {e["tag"] for e in flagged}
+
+
+def test_routed_values_are_redacted_like_a_full_scan(analyser):
+    routed, full = _dataset(), _dataset()
+    routed_tags = _anonymise(routed, analyser, entity_routing.DEFAULT_ROUTES)
+    full_tags = _anonymise(full, analyser, None)
+    for tag in ("InstitutionName", "InstitutionAddress", "StationName", "Manufacturer"):
+        assert str(Tag(tag)) in routed_tags
+        assert routed[tag].value == full[tag].value
+    assert routed[0x0009, 0x1001].value == full[0x0009, 0x1001].value
+    assert "0412" not in routed[0x0009, 0x1001].value
+    # Routing only narrows the search: it never flags more than a full scan.
+    assert routed_tags <= full_tags
+
+
+def test_defined_terms_untouched(analyser):
+    ds = _dataset()
+    _anonymise(ds, analyser, entity_routing.DEFAULT_ROUTES)
+    assert list(ds.ImageType) == ["ORIGINAL", "PRIMARY", "AXIAL", "M"]
+    assert ds.Modality == "CT"
+
+
+def test_entities_for():
+    routes = {"CS": ("DATE",), 0x00080080: ("INSTITUTE",), 0x00091001: ("PHONE",)}
+    # A tag's route wins over its VR's.
+    assert entity_routing.entities_for(0x00080080, "CS", routes) == ("INSTITUTE",)
+    assert entity_routing.entities_for(0x00080060, "CS", routes) == ("DATE",)
+    assert entity_routing.entities_for(0x00081030, "LO", routes) is None
+    # Private tags the table does not name are always scanned in full.
+    assert entity_routing.entities_for(0x00091001, "LO", routes) == ("PHONE",)
+    assert entity_routing.entities_for(0x00091002, "CS", routes) is None
+    assert entity_routing.entities_for(0x00080060, "CS", None) is None
+
+
+def test_routes_are_part_of_the_cache_key():
+    class _Analyser:
+        def __init__(self):
+            self.entities = []
+
+        def analyze(self, text, *args, entities=None, **kwargs):
+            self.entities.append(entities)
+            return []
+
+    analyser = _Analyser()
+    cache = anonymise_dicom.RedactionCache()
+    ds = pydicom.Dataset()
+    ds.StationName = "CT1"
+    for routes in (entity_routing.DEFAULT_ROUTES, None):
+        anonymise_dicom._anonymise_ds(
+            copy.deepcopy(ds),
+            analyser,
+            anonymise_dicom.AnonymizerEngine(),
+            0.5,
+            cache=cache,
+            routes=routes,
+        )
+    assert analyser.entities[0] == list(entity_routing.DEFAULT_ROUTES[0x00081010])
+    assert analyser.entities[1] is None
+
+
+def test_session_scans_every_value_for_every_entity_by_default(analyser):
+    session = anonymise_dicom.AnonymisationSession(
+        analyser=analyser, anonymizer=anonymise_dicom.AnonymizerEngine()
+    )
+    assert session.routes is None
+    for name in ("rtplan.dcm", "JPEG2000.dcm", "waveform_ecg.dcm"):
+        filename = get_testdata_files(name)[0]
+        full = pydicom.dcmread(filename)
+        anonymise_dicom._anonymise_ds(full, analyser, anonymise_dicom.AnonymizerEngine(), 0.5)
+        default = session.anonymise(pydicom.dcmread(filename))
+        assert [
+            e.value for e in default.iterall() if e.tag.group == 0x0008 and e.VR != "SQ"
+        ] == [e.value for e in full.iterall() if e.tag.group == 0x0008 and e.VR != "SQ"]
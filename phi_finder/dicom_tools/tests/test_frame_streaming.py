@@ -0,0 +1,69 @@
+import copy
+import json
+
+import numpy as np
+import pydicom
+import pytest
+from pydicom.data import get_testdata_files
+
+from phi_finder.dicom_tools import anonymise_dicom, frame_streaming, pixel_passthrough
+
+
+class _BoxRedactor:
+    """Fills the top-left corner of single-frame datasets."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def redact(self, ds, **kwargs):
+        assert int(ds.NumberOfFrames) == 1
+        self.calls += 1
+        ds = copy.deepcopy(ds)
+        pixels = ds.pixel_array.copy()
+        pixels[0:5, 0:20] = 0
+        ds.PixelData = pixels.tobytes()
+        return ds
+
+
+@pytest.mark.parametrize("name,workers", [
+    ("SC_rgb_rle_2frame.dcm", 1),  # Encapsulated RGB.
+    ("examples_ybr_color.dcm", 3),  # JPEG YBR_FULL_422, decoded to RGB.
+    ("rtdose.dcm", 2),  # Native 32-bit, implicit VR.
+])
+def test_frames_are_redacted_one_at_a_time(tmp_path, name: str, workers: int):
+    src = get_testdata_files(name)[0]
+    redactor = _BoxRedactor()
+    session = anonymise_dicom.AnonymisationSession(use_case="PS3.15", image_redactor=redactor,
+                                                   stream_frames=True, frame_workers=workers)
+    session.anonymise_file(src, tmp_path / "out.dcm")
+    source = pydicom.dcmread(src)
+    expected = source.pixel_array.copy()
+    expected[:, 0:5, 0:20] = 0
+    output = pydicom.dcmread(tmp_path / "out.dcm")
+    assert redactor.calls == source.NumberOfFrames
+    assert output.file_meta.TransferSyntaxUID == pydicom.uid.ExplicitVRLittleEndian
+    assert np.array_equal(output.pixel_array, expected)
+    assert output.PatientIdentityRemoved == "YES"
+    assert not (tmp_path / "out.dcm.frames").exists()
+
+
+def test_frames_are_screened_one_at_a_time(tmp_path):
+    redactor = _BoxRedactor()
+    session = anonymise_dicom.AnonymisationSession(
+        use_case="PS3.15",
+        image_redactor=redactor,
+        stream_frames=True,
+        prescreen_sensitivity=0.75,
+    )
+    session.anonymise_file(get_testdata_files("rtdose.dcm")[0], tmp_path / "out.dcm")
+    assert redactor.calls == 0
+    record = json.loads(pydicom.dcmread(tmp_path / "out.dcm")[0x0209, 0x1001].value)
+    assert record["reason"] == "0 of 15 frames sent to OCR"
+
+
+def test_only_multi_frame_little_endian_images_are_streamed():
+    assert frame_streaming.streamable(*pixel_passthrough.read_header_with_pixel_range(
+        get_testdata_files("rtdose.dcm")[0]))
+    for name in ("CT_small.dcm", "rtdose_expb.dcm"):
+        assert not frame_streaming.streamable(*pixel_passthrough.read_header_with_pixel_range(
+            get_testdata_files(name)[0]))
@@ -0,0 +1,54 @@
+import os
+
+import pydicom
+import pytest
+from pydicom.data import get_testdata_files
+
+from phi_finder.dicom_tools import anonymise_dicom, pixel_passthrough
+
+
+@pytest.mark.parametrize("name", [
+    "CT_small.dcm",  # Native, explicit VR little endian.
+    "MR_small_implicit.dcm",  # Native, implicit VR.
+    "MR_small_bigendian.dcm",  # Native, explicit VR big endian.
+    "MR_small_RLE.dcm",  # Encapsulated.
+    "SC_rgb_rle_2frame.dcm",  # Encapsulated, two fragments.
+])
+def test_anonymise_file_copies_pixel_data_verbatim(tmp_path, name: str):
+    src = get_testdata_files(name)[0]
+    ds, pixel_range = pixel_passthrough.read_header_with_pixel_range(src)
+    assert "PixelData" not in ds
+    assert pixel_range.tag == 0x7FE00010
+    session = anonymise_dicom.AnonymisationSession(use_case="PS3.15")
+    session.anonymise_file(src, tmp_path / "out.dcm")
+    expected = session.anonymise(pydicom.dcmread(src))
+    output = pydicom.dcmread(tmp_path / "out.dcm")
+    assert output.PixelData == expected.PixelData
+    assert output["PixelData"].VR == expected["PixelData"].VR
+    assert output.SOPInstanceUID == expected.SOPInstanceUID
+    assert output.PatientIdentityRemoved == "YES"
+
+
+def test_copy_falls_back_to_plain_reads(tmp_path, monkeypatch):
+    monkeypatch.delattr(os, "copy_file_range", raising=False)
+    monkeypatch.delattr(os, "sendfile", raising=False)
+    src = get_testdata_files("CT_small.dcm")[0]
+    anonymise_dicom.AnonymisationSession(use_case="PS3.15").anonymise_file(
+        src, tmp_path / "out.dcm"
+    )
+    assert pydicom.dcmread(tmp_path / "out.dcm").PixelData == pydicom.dcmread(src).PixelData
+
+
+def test_deflated_files_are_not_passed_through():
+    src = get_testdata_files("image_dfl.dcm")[0]
+    assert pixel_passthrough.read_header_with_pixel_range(src) is None
+
+
+def test_file_without_pixel_data(tmp_path):
+    src = get_testdata_files("waveform_ecg.dcm")[0]
+    ds, pixel_range = pixel_passthrough.read_header_with_pixel_range(src)
+    assert pixel_range is None
+    anonymise_dicom.AnonymisationSession(use_case="PS3.15").anonymise_file(
+        src, tmp_path / "out.dcm"
+    )
+    assert "PixelData" not in pydicom.dcmread(tmp_path / "out.dcm")
@@ -1,8 +1,13 @@
+import builtins
+import io
+import sys
+
+import pytest
 import pydicom
 from pydicom.data import get_testdata_files
 from pydicom.valuerep import PersonName
 
-from phi_finder.dicom_tools import ps3_15
+from phi_finder.dicom_tools import ps3_15, sequence_items
 
 
 def test_is_ps3_15_use_case_matching():
@@ -93,3 +98,154 @@ def test_ps3_15_removes_private_tags_and_recurses_into_sq():
     nested_after = dataset.AnatomicRegionSequence[0]
     assert str(nested_after.PatientName) == ""  # Z
     assert nested_after.PatientID == "XXXX"  # Z/D resolved to dummy
+
+
+def test_compiled_profile_resolves_like_the_table():
+    profile = ps3_15.compile_profile()
+    assert ps3_15.compile_profile() is profile  # One per option set.
+    assert profile.action_for(0x00100010) == "Z"  # Patient's Name
+    assert profile.action_for(0x00080013) == "D"  # X/Z/D resolved
+    assert profile.action_for(0x00091010) == "X"  # Private
+    assert profile.action_for(0x60003000) == "X"  # Overlay Data
+    assert profile.action_for(0x00280010) is None  # Rows
+    assert ps3_15.compile_profile(scan_private=True).action_for(0x00091010) is None
+    retain = ps3_15.compile_profile(retain_patient_characteristics=True)
+    assert retain.action_for(0x00101010) == ps3_15.KEEP  # Patient's Age
+
+
+def test_compiled_profile_overrides():
+    dataset = pydicom.dcmread(get_testdata_files("CT_small.dcm")[0])
+    original_name = dataset.PatientName
+    profile = ps3_15.CompiledProfile(overrides={
+        0x00100010: ps3_15.KEEP,  # Keep Patient's Name...
+        0x00280030: "X",  # ...and remove Pixel Spacing.
+    })
+    ps3_15.apply_basic_profile(dataset, profile=profile)
+    assert dataset.PatientName == original_name
+    assert "PixelSpacing" not in dataset
+    assert dataset.PatientIdentityRemoved == "YES"
+    with pytest.raises(ValueError):
+        ps3_15.CompiledProfile(overrides={0x00100010: "Q"})
+
+
+def test_apply_leaves_untouched_values_undecoded():
+    dataset = pydicom.dcmread(get_testdata_files("rtstruct.dcm")[0], force=True)
+    ps3_15.apply_basic_profile(dataset)
+    contour = dataset.ROIContourSequence[0].ContourSequence[0]
+    # Contour Data has no action: it is written back as it was read.
+    assert isinstance(contour.get_item(0x30060050), pydicom.dataelem.RawDataElement)
+    assert len(contour.ContourData) == 3 * contour.NumberOfContourPoints
+    assert dataset.PatientName == ""
+
+
+def test_apply_records_private_names_of_removed_blocks():
+    dataset = pydicom.dcmread(get_testdata_files("CT_small.dcm")[0])
+    anonymised_headers = []
+    ps3_15._apply(dataset, anonymised_headers)
+    # The block's creator is removed before its elements, but they are still
+    # recorded under their private dictionary names.
+    assert {"tag": "(0009,1001)", "name": "[Full fidelity]"} in anonymised_headers
+    assert not any(tag.group == 0x0009 for tag in dataset.keys())
+
+
+def test_apply_walks_trees_deeper_than_the_recursion_limit():
+    dataset = pydicom.Dataset()
+    item = dataset
+    for _ in range(sys.getrecursionlimit() + 100):
+        child = pydicom.Dataset()
+        child.ReferencedSOPInstanceUID = "1.2.3.4"
+        item.ROIContourSequence = pydicom.Sequence([child])
+        item = child
+    item.PatientName = "Doe^John"
+    anonymised_headers = []
+    ps3_15._apply(dataset, anonymised_headers)
+    assert item.PatientName == ""
+    assert item.ReferencedSOPInstanceUID != "1.2.3.4"
+    assert {"tag": "(0010,0010)", "name": "Patient's Name"} in anonymised_headers
+
+
+def test_apply_replays_actions_on_identical_items():
+    frames = []
+    for position in (0.0, 0.0, 1.0, 0.0):
+        frame = pydicom.Dataset()
+        plane = pydicom.Dataset()
+        plane.ImagePositionPatient = [0, 0, position]
+        frame.PlanePositionSequence = pydicom.Sequence([plane])
+        derivation = pydicom.Dataset()
+        derivation.DerivationDescription = "Scanned at St George Hospital"
+        source = pydicom.Dataset()
+        source.ReferencedSOPInstanceUID = "1.2.3.4"
+        derivation.SourceImageSequence = pydicom.Sequence([source])
+        frame.DerivationImageSequence = pydicom.Sequence([derivation])
+        frames.append(frame)
+    dataset = pydicom.Dataset()
+    dataset.SOPClassUID = "1.2.840.10008.5.1.4.1.1.4.1"
+    dataset.SOPInstanceUID = "1.2.3.5"
+    dataset.PerFrameFunctionalGroupsSequence = pydicom.Sequence(frames)
+    dataset.file_meta = pydicom.dataset.FileMetaDataset()
+    dataset.file_meta.MediaStorageSOPClassUID = dataset.SOPClassUID
+    dataset.file_meta.MediaStorageSOPInstanceUID = dataset.SOPInstanceUID
+    dataset.file_meta.TransferSyntaxUID = pydicom.uid.ExplicitVRLittleEndian
+    buffer = io.BytesIO()
+    dataset.save_as(buffer, enforce_file_format=True)
+    buffer.seek(0)
+    dataset = pydicom.dcmread(buffer)
+    anonymised_headers = []
+    ps3_15._apply(dataset, anonymised_headers)
+    frames = dataset.PerFrameFunctionalGroupsSequence
+    uids = set()
+    for frame in frames:
+        derivation = frame.DerivationImageSequence[0]
+        assert "DerivationDescription" not in derivation
+        uids.add(derivation.SourceImageSequence[0].ReferencedSOPInstanceUID)
+    assert len(uids) == 1 and "1.2.3.4" not in uids
+    # Each frame is recorded, the duplicates included.
+    assert sum(r["name"] == "Derivation Description" for r in anonymised_headers) == 4
+    # The duplicates were not walked: their sequences without actions are
+    # still unparsed.
+    assert isinstance(frames[1].get_item(0x00209113), pydicom.dataelem.RawDataElement)
+    assert not isinstance(frames[2].get_item(0x00209113), pydicom.dataelem.RawDataElement)
+
+
+def test_apply_does_not_replay_on_items_reusing_a_freed_id(monkeypatch):
+    # The item of Referenced Study Sequence (parsed when read, undefined
+    # length) is identical to the one walked before it, and freed when the
+    # sequence is emptied; the item of the next (raw) sequence, parsed later,
+    # may get its id. Every item is given the same id so it always does.
+    monkeypatch.setattr(sequence_items, "id",
+                        lambda obj: 0 if isinstance(obj, pydicom.Dataset) else builtins.id(obj),
+                        raising=False)
+
+    def code():
+        item = pydicom.Dataset()
+        item.CodeValue = "A"
+        item.CodingSchemeDesignator = "DCM"
+        return item
+
+    walked = pydicom.Dataset()
+    walked.PerformedProtocolCodeSequence = pydicom.Sequence([code()])
+    frame = pydicom.Dataset()
+    frame.ReferencedStudySequence = pydicom.Sequence([code()])
+    frame["ReferencedStudySequence"].is_undefined_length = True
+    patient = pydicom.Dataset()
+    patient.PatientName = "Doe^John"
+    patient.PatientID = "SECRET123"
+    frame.PerformedProtocolCodeSequence = pydicom.Sequence([patient])
+    dataset = pydicom.Dataset()
+    dataset.SOPClassUID = "1.2.840.10008.5.1.4.1.1.4.1"
+    dataset.SOPInstanceUID = "1.2.3.5"
+    dataset.PerFrameFunctionalGroupsSequence = pydicom.Sequence([walked, frame])
+    dataset.file_meta = pydicom.dataset.FileMetaDataset()
+    dataset.file_meta.MediaStorageSOPClassUID = dataset.SOPClassUID
+    dataset.file_meta.MediaStorageSOPInstanceUID = dataset.SOPInstanceUID
+    dataset.file_meta.TransferSyntaxUID = pydicom.uid.ExplicitVRLittleEndian
+    buffer = io.BytesIO()
+    dataset.save_as(buffer, enforce_file_format=True)
+    buffer.seek(0)
+    dataset = pydicom.dcmread(buffer)
+    frame = dataset.PerFrameFunctionalGroupsSequence[1]
+    assert isinstance(frame.get_item(0x00400260), pydicom.dataelem.RawDataElement)
+    ps3_15._apply(dataset, [])
+    patient = dataset.PerFrameFunctionalGroupsSequence[1].PerformedProtocolCodeSequence[0]
+    assert str(patient.PatientName) != "Doe^John"
+    assert patient.PatientID != "SECRET123"
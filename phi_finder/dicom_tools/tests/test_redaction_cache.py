@@ -0,0 +1,148 @@
+import multiprocessing
+import types
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from phi_finder.dicom_tools.redaction_cache import (
+    PersistentRedactionCache,
+    RedactionCache,
+    pipeline_fingerprint,
+)
+
+def test_cache_counts_hits_and_misses():
+    cache = RedactionCache(maxsize=4)
+    key = cache.key("ACME SCANNER", 0.5, "fp")
+    assert cache.get(key) is None
+    cache.put(key, "ACME SCANNER")
+    assert cache.get(key) == "ACME SCANNER"
+    info = cache.info()
+    assert (info.hits, info.misses, info.maxsize, info.currsize) == (1, 1, 4, 1)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = RedactionCache(maxsize=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"  # "b" is now the least recently used
+    cache.put("c", "C")
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+
+
+def test_cache_rejects_non_positive_size():
+    with pytest.raises(ValueError):
+        RedactionCache(maxsize=0)
+
+
+def test_key_depends_on_threshold_and_pipeline():
+    assert RedactionCache.key("x", 0.5, "fp") != RedactionCache.key("x", 0.6, "fp")
+    assert RedactionCache.key("x", 0.5, "fp") != RedactionCache.key("x", 0.5, "other")
+
+
+class _Analyser:
+    pass
+
+
+class _SpacyAnalyser:
+    """An analyser with one spaCy pipeline, as presidio's SpacyNlpEngine holds."""
+
+    def __init__(self, version):
+        nlp = types.SimpleNamespace(
+            meta={"lang": "en", "name": "core_web_md", "version": version}
+        )
+        self.nlp_engine = types.SimpleNamespace(
+            models=[{"lang_code": "en", "model_name": "en_core_web_md"}],
+            nlp={"en": nlp},
+        )
+        self.registry = types.SimpleNamespace(recognizers=[])
+
+
+def test_fingerprint_distinguishes_engines():
+    a, b = _Analyser(), _Analyser()
+    assert pipeline_fingerprint(a) == pipeline_fingerprint(a)
+    assert pipeline_fingerprint(a) != pipeline_fingerprint(b)
+
+
+def test_persistent_cache_is_kept_across_instances(tmp_path):
+    path = tmp_path / "redactions.sqlite"
+    cache = PersistentRedactionCache(path)
+    key = cache.key("Reviewed by Dr Smith", 0.5, "fp")
+    assert cache.get(key) is None
+    cache.put(key, "Reviewed by XXXX")
+    reopened = PersistentRedactionCache(path)
+    assert reopened.get(reopened.key("Reviewed by Dr Smith", 0.5, "fp")) == "Reviewed by XXXX"
+    assert reopened.get(reopened.key("Reviewed by Dr Smith", 0.6, "fp")) is None
+    assert reopened.get(reopened.key("Reviewed by Dr Smith", 0.5, "other")) is None
+    info = reopened.info()
+    assert (info.hits, info.misses, info.currsize) == (1, 2, 1)
+
+
+def test_persistent_cache_stores_no_values_in_clear(tmp_path):
+    path = tmp_path / "redactions.sqlite"
+    cache = PersistentRedactionCache(path)
+    cache.put(cache.key("Doe^John", 0.5, "fp"), "Doe^John")
+    del cache
+    content = b"".join(f.read_bytes() for f in tmp_path.iterdir())
+    assert b"Doe^John" not in content
+    # Entries written without the secret cannot be found with it.
+    salted = PersistentRedactionCache(path, secret="s3cret")
+    assert salted.get(salted.key("Doe^John", 0.5, "fp")) is None
+
+
+def test_persistent_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(PersistentRedactionCache, "_EVICT_EVERY", 1)
+    cache = PersistentRedactionCache(tmp_path / "redactions.sqlite", maxsize=2)
+    cache.put(cache.key("a", 0.5, "fp"), "A")
+    cache.put(cache.key("b", 0.5, "fp"), "B")
+    cache.put(cache.key("c", 0.5, "fp"), "C")
+    assert len(cache) == 2
+    assert cache.get(cache.key("a", 0.5, "fp")) is None
+    assert cache.get(cache.key("c", 0.5, "fp")) == "C"
+
+
+def _fill(cache, start):
+    for i in range(start, start + 50):
+        cache.put(cache.key(f"value {i}", 0.5, "fp"), f"redacted {i}")
+    return len(cache)
+
+
+def test_persistent_cache_is_shared_by_worker_processes(tmp_path):
+    cache = PersistentRedactionCache(tmp_path / "redactions.sqlite")
+    with ProcessPoolExecutor(
+        max_workers=2, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        list(pool.map(_fill, [cache] * 4, range(0, 200, 50)))
+    assert len(cache) == 200
+    assert all(
+        cache.get(cache.key(f"value {i}", 0.5, "fp")) == f"redacted {i}"
+        for i in range(200)
+    )
+
+
+def test_model_upgrades_miss_the_persistent_cache(tmp_path):
+    cache = PersistentRedactionCache(tmp_path / "redactions.sqlite")
+    gliner = types.SimpleNamespace(checkpoint="nvidia/gliner-pii")
+    fingerprint = pipeline_fingerprint(_SpacyAnalyser("3.7.1"), gliner)
+    cache.put(cache.key("Dr Smith", 0.5, fingerprint), "XXXX")
+    assert (
+        cache.get(
+            cache.key(
+                "Dr Smith", 0.5, pipeline_fingerprint(_SpacyAnalyser("3.7.1"), gliner)
+            )
+        )
+        == "XXXX"
+    )
+    upgraded = [
+        pipeline_fingerprint(_SpacyAnalyser("3.8.0"), gliner),
+        pipeline_fingerprint(
+            _SpacyAnalyser("3.7.1"),
+            types.SimpleNamespace(checkpoint="/models/gliner-pii-v2"),
+        ),
+        # A model without a checkpoint is never shared across runs.
+        pipeline_fingerprint(_SpacyAnalyser("3.7.1"), types.SimpleNamespace()),
+    ]
+    for other in upgraded:
+        assert cache.get(cache.key("Dr Smith", 0.5, other)) is None
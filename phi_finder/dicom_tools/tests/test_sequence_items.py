@@ -0,0 +1,73 @@
+import io
+import sys
+
+import pydicom
+from pydicom.dataelem import RawDataElement
+
+from phi_finder.dicom_tools import sequence_items
+
+
+def _frame(position: float, explanation: str = "Reviewed by Dr Smith") -> pydicom.Dataset:
+    item = pydicom.Dataset()
+    plane = pydicom.Dataset()
+    plane.ImagePositionPatient = [0, 0, position]
+    item.PlanePositionSequence = pydicom.Sequence([plane])
+    voi = pydicom.Dataset()
+    voi.WindowCenter = 40
+    voi.WindowCenterWidthExplanation = explanation
+    item.FrameVOILUTSequence = pydicom.Sequence([voi])
+    return item
+
+
+def _read_back(ds: pydicom.Dataset) -> pydicom.Dataset:
+    ds.file_meta = pydicom.dataset.FileMetaDataset()
+    ds.file_meta.MediaStorageSOPClassUID = ds.SOPClassUID = "1.2.840.10008.5.1.4.1.1.4.1"
+    ds.file_meta.MediaStorageSOPInstanceUID = ds.SOPInstanceUID = "1.2.3.4"
+    ds.file_meta.TransferSyntaxUID = pydicom.uid.ExplicitVRLittleEndian
+    buffer = io.BytesIO()
+    ds.save_as(buffer, enforce_file_format=True)
+    buffer.seek(0)
+    return pydicom.dcmread(buffer)
+
+
+def test_fingerprint_hashes_content():
+    for read in (lambda ds: ds, _read_back):
+        ds = pydicom.Dataset()
+        ds.PerFrameFunctionalGroupsSequence = pydicom.Sequence(
+            [_frame(0.0), _frame(0.0), _frame(1.0), _frame(0.0, "Reviewed by Dr Jones")]
+        )
+        frames = read(ds).PerFrameFunctionalGroupsSequence
+        found: dict = {}
+        digests = [sequence_items.fingerprint(frame, found) for frame in frames]
+        assert digests[0] == digests[1]
+        assert len(set(digests)) == 3
+    # Sequences read from a file are hashed from their raw bytes, not parsed.
+    assert isinstance(frames[1].get_item(0x00209113), RawDataElement)
+
+
+def test_fingerprint_of_deep_trees():
+    items = []
+    for text in ("finding", "other finding"):
+        item = top = pydicom.Dataset()
+        for _ in range(sys.getrecursionlimit() + 100):
+            child = pydicom.Dataset()
+            child.TextValue = "finding"
+            item.ContentSequence = pydicom.Sequence([child])
+            item = child
+        item.TextValue = text
+        items.append(top)
+    found: dict = {}
+    assert sequence_items.fingerprint(items[0], found) != sequence_items.fingerprint(
+        items[1], found
+    )
+    assert sequence_items.at(items[0], ((0x0040A730, 0),) * 3).TextValue == "finding"
+
+
+def test_fingerprint_memo_is_not_fooled_by_reused_ids(monkeypatch):
+    # A freed item's id can be reused by an item parsed later; give every
+    # item the same id to make that happen every time.
+    monkeypatch.setattr(sequence_items, "id", lambda obj: 0, raising=False)
+    found: dict = {}
+    first, second = _frame(0.0), _frame(1.0)
+    assert sequence_items.fingerprint(first, found) != sequence_items.fingerprint(second, found)
+    assert sequence_items.fingerprint(first, {}) == sequence_items.fingerprint(first, found)
@@ -0,0 +1,115 @@
+import copy
+
+import numpy as np
+import pydicom
+import pytest
+from pydicom.data import get_testdata_files
+
+from phi_finder.dicom_tools import anonymise_dicom, burned_in_text, series_boxes
+
+_BOX = {"top": 4, "left": 4, "width": 40, "height": 8}
+
+
+def _slice(text_value: int) -> pydicom.Dataset:
+    """CT_small with a 'text' block at _BOX, drawn with text_value."""
+    ds = pydicom.dcmread(get_testdata_files("CT_small.dcm")[0])
+    pixels = ds.pixel_array.copy()
+    pixels[4:12, 4:44:3] = text_value
+    ds.PixelData = pixels.tobytes()
+    return ds
+
+
+class _BoxRedactor:
+    """Finds _BOX on every slice and fills it with 0."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def redact_and_return_bbox(self, ds, **kwargs):
+        self.calls += 1
+        ds = copy.deepcopy(ds)
+        pixels = ds.pixel_array.copy()
+        pixels[4:12, 4:44] = 0
+        ds.PixelData = pixels.tobytes()
+        return ds, [dict(_BOX)]
+
+
+class _LateTextRedactor(_BoxRedactor):
+    """Finds no text on the first slice, then _BOX on every slice."""
+
+    def redact_and_return_bbox(self, ds, **kwargs):
+        if self.calls == 0:
+            self.calls += 1
+            return ds, []
+        return super().redact_and_return_bbox(ds, **kwargs)
+
+
+def test_ocr_runs_on_the_sample_only():
+    redactor = _BoxRedactor()
+    session = anonymise_dicom.AnonymisationSession(use_case="PS3.15", image_redactor=redactor,
+                                                   series_ocr_sample=2)
+    slices = [_slice(2000) for _ in range(5)]
+    outputs = list(session.anonymise_many(slices))
+    assert redactor.calls == 2
+    for ds in outputs:
+        assert (ds.pixel_array[4:12, 4:44] == 0).all()
+        assert ds.pixel_array[20, 20] != 0
+
+
+def test_slices_whose_boxes_differ_are_ocred_again():
+    redactor = _BoxRedactor()
+    boxes = series_boxes.BoxTemplate(sample_size=1)
+    session = anonymise_dicom.AnonymisationSession(use_case="PS3.15", image_redactor=redactor)
+    for value in (2000, 2000, 1500, 1500):
+        ds = session.anonymise(_slice(value), boxes=boxes)
+        assert (ds.pixel_array[4:12, 4:44] == 0).all()
+    assert redactor.calls == 2
+    assert (boxes.ocr_runs, boxes.reused) == (2, 2)
+    assert boxes.boxes == [_BOX, _BOX]
+
+
+def test_text_on_slices_after_a_clean_sample_is_ocred():
+    redactor = _LateTextRedactor()
+    boxes = series_boxes.BoxTemplate(sample_size=1)
+    session = anonymise_dicom.AnonymisationSession(use_case="PS3.15", image_redactor=redactor)
+    session.anonymise(_slice(2000), boxes=boxes)
+    ds = session.anonymise(_slice(2000), boxes=boxes)
+    assert redactor.calls == 2
+    assert (ds.pixel_array[4:12, 4:44] == 0).all()
+
+
+def test_boxes_are_filled_on_slices_the_screen_passes(monkeypatch):
+    # The first slice is screened as needing OCR; the later ones, with
+    # fainter text under the same box, pass the screen.
+    decisions = iter([True, False, False])
+    monkeypatch.setattr(
+        anonymise_dicom.burned_in_text,
+        "screen",
+        lambda ds, sensitivity: burned_in_text.ScreenResult(
+            next(decisions), 0.0, 0.0, "test"
+        ),
+    )
+    redactor = _BoxRedactor()
+    session = anonymise_dicom.AnonymisationSession(
+        use_case="PS3.15",
+        image_redactor=redactor,
+        prescreen_sensitivity=0.5,
+        series_ocr_sample=1,
+    )
+    outputs = list(session.anonymise_many([_slice(2000), _slice(700), _slice(700)]))
+    assert redactor.calls == 1
+    for ds in outputs:
+        assert (ds.pixel_array[4:12, 4:44] == 0).all()
+
+
+def test_box_template_without_boxes_or_with_other_geometry():
+    boxes = series_boxes.BoxTemplate(sample_size=1)
+    first = _slice(2000)
+    boxes.add(first, first, [])
+    # No text on the sample: the later slices still go through OCR.
+    assert boxes.needs_ocr(_slice(1500))
+    mr = pydicom.dcmread(get_testdata_files("MR_small.dcm")[0])
+    assert boxes.needs_ocr(mr)
+    assert np.array_equal(boxes.fill(copy.deepcopy(mr)).pixel_array, mr.pixel_array)
+    with pytest.raises(ValueError):
+        series_boxes.BoxTemplate(sample_size=0)
@@ -0,0 +1,50 @@
+import pickle
+
+import pydicom
+import pytest
+from pydicom.data import get_testdata_files
+from pydicom.uid import generate_uid
+
+from phi_finder.dicom_tools import ps3_15, uid_map
+
+
+def test_replacements_are_memoised_and_deterministic():
+    mapping = uid_map.UIDMap(maxsize=2)
+    original = "1.2.840.113619.2.1.1.322987881.621.736170080.681"
+    replacement = mapping.replace(original)
+    assert replacement == generate_uid(entropy_srcs=[original])
+    assert mapping.replace(original) == replacement
+    mapping.replace("1.2.3")
+    mapping.replace("1.2.4")  # Evicts original.
+    assert mapping.info() == uid_map.CacheInfo(1, 3, 2, 2)
+    assert mapping.replace(original) == replacement
+
+
+def test_dump_and_load_table(tmp_path):
+    mapping = uid_map.UIDMap(record=True)
+    originals = ["1.2.3", "1.2.3.4", "1.2", "1.10"]
+    expected = {original: mapping.replace(original) for original in originals}
+    mapping.dump(tmp_path / "uids.tbl")
+    table = uid_map.UIDTable(tmp_path / "uids.tbl")
+    assert len(table) == 4
+    assert dict(table.items()) == expected
+    assert [original for original, _ in table.items()] == sorted(originals)
+    assert table.get("1.2.3") == expected["1.2.3"]
+    assert table.get("1.2.3.5") is None
+    assert pickle.loads(pickle.dumps(table)).get("1.10") == expected["1.10"]
+    # The table's mappings take precedence over hashing.
+    uid_map.dump_table({"1.2.3": "2.25.1"}, tmp_path / "fixed.tbl")
+    assert uid_map.UIDMap(table=tmp_path / "fixed.tbl").replace("1.2.3") == "2.25.1"
+    with pytest.raises(ValueError):
+        uid_map.UIDMap().mappings()
+
+
+def test_profile_replaces_uids_through_the_map(tmp_path):
+    dataset = pydicom.dcmread(get_testdata_files("CT_small.dcm")[0])
+    study, sop = dataset.StudyInstanceUID, dataset.SOPInstanceUID
+    uid_map.dump_table({study: "2.25.1234"}, tmp_path / "uids.tbl")
+    mapping = uid_map.UIDMap(table=tmp_path / "uids.tbl", record=True)
+    ps3_15.apply_basic_profile(dataset, uid_map=mapping)
+    assert dataset.StudyInstanceUID == "2.25.1234"
+    assert dataset.SOPInstanceUID == generate_uid(entropy_srcs=[sop])
+    assert mapping.mappings()[sop] == dataset.SOPInstanceUID
@@ -0,0 +1,237 @@
+"""Memoised UID replacement, and the mapping tables it can be dumped to.
+
+The PS3.15 profile replaces every UID by hashing it (generate_uid with the
+original as entropy source, a SHA-512 digest). The same Study, Series and
+Frame of Reference UIDs appear in every file of a series and again in its
+reference sequences, so the replacements are cached and a series costs about
+one digest per distinct UID.
+
+The original -> replacement mapping can be dumped to a table file, for audit
+or to map the UIDs of a later run the same way. A table is a sorted array of
+fixed-width records, read through a memory map and binary-searched, so it is
+opened instantly and its pages are shared by every process that maps it.
+"""
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict, namedtuple
+from pathlib import Path
+
+from pydicom.uid import generate_uid
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+_MAGIC = b"PHIUID01"
+# Magic, then the number of records.
+_HEADER = struct.Struct("<8sQ")
+# A UID has at most 64 characters; shorter ones are padded with NULs, which
+# sort before every UID character, so padded records sort like the UIDs.
+_UID_WIDTH = 64
+_RECORD_SIZE = 2 * _UID_WIDTH
+
+
+def _pad(uid: str) -> bytes:
+    return uid.encode("ascii").ljust(_UID_WIDTH, b"\0")
+
+
+def _unpad(raw: bytes) -> str:
+    return raw.rstrip(b"\0").decode("ascii")
+
+
+def dump_table(mappings: dict, path) -> None:
+    """Writes a UID mapping table.
+
+    Parameters
+    ----------
+    mappings : dict of str to str
+        Original UIDs and their replacements. Both must be valid UIDs (at most
+        64 ASCII characters).
+
+    path : str or Path
+        The table file to write. It is written next to its final name and
+        renamed into place, so readers never see a partial table.
+    """
+    records = []
+    for original, replacement in mappings.items():
+        if len(original) > _UID_WIDTH or len(replacement) > _UID_WIDTH:
+            raise ValueError(
+                f"UID longer than {_UID_WIDTH} characters: {original!r} -> {replacement!r}"
+            )
+        records.append(_pad(original) + _pad(replacement))
+    records.sort()
+    path = Path(path)
+    partial = path.with_name(path.name + ".partial")
+    with open(partial, "wb") as fp:
+        fp.write(_HEADER.pack(_MAGIC, len(records)))
+        fp.writelines(records)
+    os.replace(partial, path)
+
+
+class UIDTable:
+    """Read-only UID mapping table written by dump_table.
+
+    Parameters
+    ----------
+    path : str or Path
+        The table file; it is memory-mapped, not read.
+    """
+
+    def __init__(self, path) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as fp:
+            header = fp.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError(f"{self.path} is not a UID mapping table")
+            magic, count = _HEADER.unpack(header)
+            if (
+                magic != _MAGIC
+                or os.fstat(fp.fileno()).st_size != _HEADER.size + count * _RECORD_SIZE
+            ):
+                raise ValueError(f"{self.path} is not a UID mapping table")
+            self._count = count
+            self._map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) if count else None
+
+    def _original_at(self, index: int) -> bytes:
+        start = _HEADER.size + index * _RECORD_SIZE
+        return self._map[start:start + _UID_WIDTH]
+
+    def get(self, original: str) -> str | None:
+        """Returns the replacement of original, or None if it is not in the table."""
+        if self._map is None or len(original) > _UID_WIDTH:
+            return None
+        key = _pad(original)
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._original_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count and self._original_at(low) == key:
+            start = _HEADER.size + low * _RECORD_SIZE + _UID_WIDTH
+            return _unpad(self._map[start:start + _UID_WIDTH])
+        return None
+
+    def items(self):
+        """Yields the (original, replacement) pairs, in order."""
+        for index in range(self._count):
+            start = _HEADER.size + index * _RECORD_SIZE
+            record = self._map[start:start + _RECORD_SIZE]
+            yield _unpad(record[:_UID_WIDTH]), _unpad(record[_UID_WIDTH:])
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getstate__(self) -> dict:
+        # A memory map cannot be pickled: worker processes map the file again.
+        return {"path": self.path}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["path"])
+
+
+class UIDMap:
+    """Bounded, thread-safe memo of UID replacements.
+
+    A UID is looked up in the cache, then in the table (if any), and only
+    then hashed; replacements are the same as generate_uid(entropy_srcs=
+    [original]) for UIDs that are not in the table.
+
+    Parameters
+    ----------
+    maxsize : int, optional (default 65536)
+        Maximum number of replacements kept in memory; the least recently
+        used one is dropped once the limit is reached.
+
+    table : UIDTable, str or Path, optional
+        A table written by dump_table (e.g. by an earlier run). Its mappings
+        take precedence over hashing.
+
+    record : bool, optional (default False)
+        If True, every replacement handed out is also kept (without bound)
+        so the mapping can be dumped, see dump.
+    """
+
+    def __init__(self, maxsize: int = 65536, table=None, record: bool = False) -> None:
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be positive, got {maxsize}")
+        if table is not None and not isinstance(table, UIDTable):
+            table = UIDTable(table)
+        self.maxsize = maxsize
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._recorded: dict | None = {} if record else None
+        self._lock = threading.Lock()
+
+    def replace(self, original: str) -> str:
+        """Returns the replacement UID of original."""
+        with self._lock:
+            try:
+                replacement = self._data[original]
+            except KeyError:
+                self.misses += 1
+            else:
+                self._data.move_to_end(original)
+                self.hits += 1
+                return replacement
+        replacement = self.table.get(original) if self.table is not None else None
+        if replacement is None:
+            replacement = generate_uid(entropy_srcs=[original])
+        with self._lock:
+            self._data[original] = replacement
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            if self._recorded is not None:
+                self._recorded[original] = replacement
+        return replacement
+
+    def mappings(self) -> dict:
+        """The replacements handed out so far (requires record=True)."""
+        if self._recorded is None:
+            raise ValueError("UIDMap was created without record=True")
+        with self._lock:
+            return dict(self._recorded)
+
+    def dump(self, path) -> None:
+        """Writes the table's mappings and those handed out so far to path.
+
+        Requires record=True. The result can be loaded with UIDMap(table=path)
+        to map the same UIDs the same way in a later run.
+        """
+        mappings = dict(self.table.items()) if self.table is not None else {}
+        mappings.update(self.mappings())
+        dump_table(mappings, path)
+
+    def clear(self) -> None:
+        """Drops the cached (and recorded) replacements and resets the counters."""
+        with self._lock:
+            self._data.clear()
+            if self._recorded is not None:
+                self._recorded.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        """Hit/miss counters and size, in the style of functools.lru_cache."""
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Shared by the calls that are not given a map of their own.
+_DEFAULT_MAP = UIDMap()
+
+
+def replace_uid(original: str) -> str:
+    """Replaces a UID with the process-wide UIDMap."""
+    return _DEFAULT_MAP.replace(original)
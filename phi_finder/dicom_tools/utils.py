@@ -1,16 +1,27 @@
+import contextlib
 import gc
+import multiprocessing
+import queue
 import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 from frametree.core.row import DataRow
 from fileformats.medimage.dicom import DicomSeries
-from presidio_anonymizer import AnonymizerEngine
-from presidio_image_redactor import DicomImageRedactorEngine, ImageAnalyzerEngine, ContrastSegmentedImageEnhancer
-from gliner import GLiNER
-from gliner.model import UniEncoderSpanGLiNER
 import pydicom
 
-from phi_finder.dicom_tools import anonymise_dicom, ps3_15
+from phi_finder.dicom_tools import anonymise_dicom
+
+# Marks the end of a pipeline stage's output (see deidentify_dicom_files).
+_DONE = object()
+
+# The store connection is shared by the pipeline's threads. The file
+# transfers (one download and one upload at a time, one per stage thread) go
+# through the thread-safe connection pool of its requests.Session and may run
+# concurrently. Creating entries and writing fields update the XNAT session's
+# object caches, which are not thread-safe, so those calls hold this lock.
+_STORE_LOCK = threading.RLock()
 
 
 def _log_session(data_row: DataRow, key: str, message: str) -> None:
@@ -32,7 +43,7 @@ def _log_session(data_row: DataRow, key: str, message: str) -> None:
     None : None
         The function does not return anything.
     """
-    with data_row.frameset.store.connection:
+    with _STORE_LOCK, data_row.frameset.store.connection:
         xlogin = data_row.frameset.store.connection.session
         xproject = xlogin.projects[data_row.frameset.id]
         xsession = xproject.experiments[data_row.id]
@@ -40,13 +51,329 @@ def _log_session(data_row: DataRow, key: str, message: str) -> None:
     return None
 
 
+# Session of a worker process of deidentify_dicom_files, set by _init_worker.
+_worker_session = None
+
+
+def _init_worker(session_kwargs: dict) -> None:
+    """Pool initializer: builds the worker's session (and engines) once."""
+    global _worker_session
+    _worker_session = anonymise_dicom.AnonymisationSession(**session_kwargs)
+
+
+def _anonymise_files(session: anonymise_dicom.AnonymisationSession,
+                     src_paths: list,
+                     dst_paths: list,
+                     series_mode: bool) -> None:
+    """Anonymises the files of (part of) one series, in order.
+
+    Parameters
+    ----------
+    session : AnonymisationSession
+        The session anonymising the files.
+
+    src_paths : list of Path
+        The DICOM files to be anonymised.
+
+    dst_paths : list of Path
+        Where to save the anonymised files, one per file of src_paths.
+
+    series_mode : bool
+        Whether the files share a header template, and burned-in text boxes
+        if the session shares them (see deidentify_dicom_files).
+    """
+    template = anonymise_dicom.HeaderTemplate() if series_mode else None
+    boxes = session.box_template() if series_mode else None
+    for src_path, dst_path in zip(src_paths, dst_paths):
+        gc.collect()
+        session.anonymise_file(src_path, dst_path, template=template, boxes=boxes)
+
+
+def _anonymise_files_in_worker(src_paths: list, dst_paths: list, series_mode: bool) -> None:
+    _anonymise_files(_worker_session, src_paths, dst_paths, series_mode)
+
+
+def _chunk_bounds(n_items: int, n_chunks: int) -> list[tuple[int, int]]:
+    """Splits range(n_items) into at most n_chunks contiguous near-equal slices.
+
+    Contiguous slices keep neighbouring slices of a series together, so each
+    chunk's header template still matches most of its files.
+    """
+    if n_items <= 0:
+        return []
+    n_chunks = max(1, min(n_chunks, n_items))
+    size, extra = divmod(n_items, n_chunks)
+    bounds = []
+    start = 0
+    for i in range(n_chunks):
+        end = start + size + (1 if i < extra else 0)
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+class _InFlightBudget:
+    """Limits the entries (and bytes on disk) between download and upload."""
+
+    def __init__(self, max_entries: int, max_bytes: int | None) -> None:
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self.entries = 0
+        self.bytes = 0
+        self.aborted = False
+        self._cond = threading.Condition()
+
+    def _has_room(self) -> bool:
+        if self.aborted or self.entries == 0:
+            return True
+        if self.entries >= self.max_entries:
+            return False
+        return self.max_bytes is None or self.bytes < self.max_bytes
+
+    def acquire(self) -> bool:
+        """Waits for room for one more entry; False once the run is aborted."""
+        with self._cond:
+            self._cond.wait_for(self._has_room)
+            if self.aborted:
+                return False
+            self.entries += 1
+            return True
+
+    def add_bytes(self, n_bytes: int) -> None:
+        with self._cond:
+            self.bytes += n_bytes
+
+    def release(self, n_bytes: int) -> None:
+        with self._cond:
+            self.entries -= 1
+            self.bytes -= n_bytes
+            self._cond.notify_all()
+
+    def abort(self) -> None:
+        with self._cond:
+            self.aborted = True
+            self._cond.notify_all()
+
+
+class _EntryJob:
+    """An entry on its way through the download/anonymise/upload pipeline."""
+
+    def __init__(self, resource_path: str, order_key, anonymised_resource_path: str,
+                 dicom_files: list, budget: _InFlightBudget) -> None:
+        self.resource_path = resource_path
+        self.order_key = order_key
+        self.anonymised_resource_path = anonymised_resource_path
+        self.dicom_files = dicom_files
+        self.tmps_paths = []
+        self.n_bytes = 0
+        # The temp dir is unique per entry and run, so concurrent pipelines
+        # cannot overwrite each other's files; it is removed after the upload.
+        self._tmp_dir = tempfile.TemporaryDirectory(prefix="phi-finder-")
+        self.tmp_dir = Path(self._tmp_dir.name)
+        self._budget = budget
+        self.add_bytes(sum(_file_size(path) for path in dicom_files))
+
+    def add_bytes(self, n_bytes: int) -> None:
+        self.n_bytes += n_bytes
+        self._budget.add_bytes(n_bytes)
+
+    def cleanup(self) -> None:
+        """Removes the temp dir and hands the entry's budget back."""
+        self._tmp_dir.cleanup()
+        self._budget.release(self.n_bytes)
+
+
+def _file_size(path) -> int:
+    try:
+        return Path(path).stat().st_size
+    except OSError:
+        return 0
+
+
+def _download_entries(data_row: DataRow,
+                      entries: list,
+                      budget: _InFlightBudget,
+                      downloaded: queue.Queue) -> None:
+    """Download stage: step 0 (filtering) and step 1 of deidentify_dicom_files."""
+    try:
+        for resource_path_key_order, entry in entries:
+            resource_path = resource_path_key_order[0]
+            order_key = resource_path_key_order[1]
+            # 0. Check if the entry is a DICOM series and not a derivative.
+            if entry.datatype != DicomSeries:
+                print(f"Skipping {resource_path} as it is not a DICOM series.")
+                _log_session(
+                    data_row,
+                    "debug-dump1",
+                    f"Skipping {resource_path} as it is not a DICOM series.",
+                )
+                continue
+            if entry.is_derivative:
+                print(f"Skipping {resource_path} as it is a derivative.")
+                _log_session(
+                    data_row,
+                    "debug-dump1",
+                    f"Skipping {resource_path} as it is a derivative.",
+                )
+                continue
+            # anonymised_resource_path = str(order_key) + '_' + resource_path.replace("/DICOM", "@deidentified")
+            scan_name, sep, _resource_label = resource_path.rpartition("/")
+            if not sep:
+                # No '/' in path: treat the whole string as the scan name
+                scan_name = resource_path
+            anonymised_resource_path = f"{order_key}_{scan_name}@deidentified"
+
+            if not budget.acquire():
+                break
+            print(f"De-identifying {resource_path} to {anonymised_resource_path}.")
+            _log_session(
+                data_row,
+                "debug-dump2",
+                f"De-identifying {resource_path} to {anonymised_resource_path}.",
+            )
+
+            # 1. Downloading the files from the original scan entry.
+            try:
+                dicom_series = entry.item
+            except AssertionError as e:
+                budget.release(0)
+                print(
+                    f"AssertionError occurred while downloading files from {resource_path}: {e}"
+                )
+                _log_session(
+                    data_row,
+                    "debug-dump3",
+                    "AssertionError occurred while downloading files from "
+                    f"{resource_path}: {e}",
+                )
+                continue
+            except BaseException:
+                budget.release(0)
+                raise
+            _log_session(
+                data_row,
+                "debug-dump3",
+                f"Files from the original scan entry were downloaded.",
+            )
+            downloaded.put(_EntryJob(resource_path, order_key, anonymised_resource_path,
+                                     list(dicom_series.contents), budget))
+    except BaseException as e:
+        downloaded.put(e)
+    finally:
+        downloaded.put(_DONE)
+
+
+def _anonymise_job(job: _EntryJob,
+                   session: anonymise_dicom.AnonymisationSession | None,
+                   pool,
+                   workers: int,
+                   series_mode: bool,
+                   dry_run: bool,
+                   budget: _InFlightBudget) -> None:
+    """Anonymise stage: step 2 of deidentify_dicom_files."""
+    gc.collect()
+    if dry_run:
+        for dicom in job.dicom_files:
+            pydicom.dcmread(dicom)
+        return
+    job.tmps_paths = [job.tmp_dir / f"anonymised{i}-tmp_{dicom.stem}.dcm"
+                      for i, dicom in enumerate(job.dicom_files)]
+    if session is not None:
+        _anonymise_files(session, job.dicom_files, job.tmps_paths, series_mode)
+    else:
+        futures = [
+            pool.submit(_anonymise_files_in_worker,
+                        job.dicom_files[start:end], job.tmps_paths[start:end], series_mode)
+            for start, end in _chunk_bounds(len(job.dicom_files), workers)
+        ]
+        for future in futures:
+            future.result()
+    job.add_bytes(sum(_file_size(path) for path in job.tmps_paths))
+
+
+class _Uploader(threading.Thread):
+    """Upload stage: steps 3 to 5 of deidentify_dicom_files.
+
+    The first error stops the uploads; it is kept in error for the caller to
+    re-raise, and the remaining entries are only cleaned up.
+    """
+
+    def __init__(self, data_row: DataRow, entries: list, budget: _InFlightBudget,
+                 anonymised: queue.Queue, dry_run: bool) -> None:
+        super().__init__(name="phi-finder-upload", daemon=True)
+        self.data_row = data_row
+        self.entries = entries
+        self.budget = budget
+        self.anonymised = anonymised
+        self.dry_run = dry_run
+        self.error = None
+
+    def run(self) -> None:
+        while True:
+            job = self.anonymised.get()
+            if job is _DONE:
+                return
+            try:
+                if self.error is None:
+                    self._upload(job)
+            except BaseException as e:
+                self.error = e
+                self.budget.abort()
+            finally:
+                job.cleanup()
+
+    def _upload(self, job: _EntryJob) -> None:
+        data_row = self.data_row
+        # 3. Creating the deidentified entry if necessary.
+        entries_names = [
+            x[0][0] for x in self.entries
+        ]  # x: ((name: str, order_key: str), entry: DataEntry)
+        if self.dry_run:
+            _log_session(data_row, "debug-dump6", f"Deidentified files uploaded (dry-run).")
+            return
+
+        if job.anonymised_resource_path in entries_names:
+            print(f"Re-using {job.anonymised_resource_path} that already exists.")
+            _log_session(
+                data_row,
+                "debug-dump5",
+                f"Re-using {job.anonymised_resource_path} that already exists.",
+            )
+            index = entries_names.index(job.anonymised_resource_path)
+            anonymised_session_entry = self.entries[index][1]
+        else:
+            with _STORE_LOCK:
+                anonymised_session_entry = data_row.create_entry(
+                    job.anonymised_resource_path, datatype=DicomSeries, order_key=job.order_key
+                )
+            _log_session(data_row, "debug-dump5", f"Deidentified entry created.")
+
+        # 4. Creating a new DicomSeries object from the anonymised files.
+        anonymised_dcm_series = DicomSeries(job.tmps_paths)
+
+        # 5. Uploading the anonymised files from the temp dir.
+        anonymised_session_entry.item = anonymised_dcm_series
+        _log_session(data_row, "debug-dump6", f"Deidentified files uploaded.")
+
+
 def deidentify_dicom_files(data_row: DataRow,
                            score_threshold: float=0.5,
                            spacy_model_name: str="en_core_web_md",
                            destroy_pixels: bool=True,
                            use_transformers: bool=False,
                            dry_run: bool=False,
-                           use_case: str='Standard') -> None:
+                           use_case: str='Standard',
+                           series_mode: bool=True,
+                           workers: int=1,
+                           max_in_flight: int=3,
+                           max_disk_bytes: int | None=None,
+                           redact_pixels: bool=True,
+                           uid_table: str | Path | None=None,
+                           prescreen_sensitivity: float | None=None,
+                           series_ocr_sample: int | None=None,
+                           stream_frames: bool=False,
+                           preserve_geometry: bool=False,
+                           redaction_cache: str | Path | None=None) -> None:
     """Main function to deidentify dicom files in a data row.
         1. Download the files from the original scan entry fmap/DICOM
         2. Anonymise those files and store the anonymised files in a temp dir
@@ -54,6 +381,11 @@ def deidentify_dicom_files(data_row: DataRow,
         4. Create  a new DicomSeries object from the anonymised files dicom_series = DicomSeries('anonymised-tmp/1.dcm', ...)
         5. Upload the anonymised files from the temp dir with deid_entry.item = dicom_series
 
+    The entries go through these steps as a pipeline: a thread downloads the
+    next entries (step 1) and another uploads the previous ones (steps 3 to 5)
+    while the current one is anonymised (step 2), so network and CPU are busy
+    at the same time.
+
     Parameters
     ----------
     data_row : DataRow
@@ -91,6 +423,71 @@ def deidentify_dicom_files(data_row: DataRow,
         Any other value (e.g. 'Standard', 'Aggressive'): headers are scanned with the
         Presidio NER pipeline (plus GLiNER if use_transformers) and redacted.
 
+    series_mode : bool, optional (default True)
+        If True, the header of the first file of each series is analysed in
+        full and used as a template: later files are diffed against it and
+        only the elements whose values differ go through the NER pipeline,
+        the template's decisions being replayed for the rest. The output is
+        the same as without it.
+
+    workers : int, optional (default 1)
+        Number of processes anonymising the files. With more than one, a pool
+        of worker processes is started once per call; each worker builds its
+        engines once, in the pool initializer, and the files of every series
+        are split into contiguous chunks handled in parallel. The anonymised
+        files, their names and their order are the same as with one worker.
+
+    max_in_flight : int, optional (default 3)
+        Maximum number of entries downloaded but not yet uploaded. 1 runs the
+        entries strictly one after another.
+
+    max_disk_bytes : int, optional (default None)
+        If set, no new entry is downloaded while the downloaded and anonymised
+        files of the entries in flight take more than this many bytes (one
+        entry is always allowed, however large). No limit if None.
+
+    redact_pixels : bool, optional (default True)
+        If True and destroy_pixels is False, burned-in text is redacted from
+        the pixel data with OCR. If both are False, the pixel data is copied to
+        the output unchanged, without being loaded into memory.
+
+    uid_table : str or Path, optional (default None)
+        For the PS3.15 use cases, a UID mapping table (see uid_map.dump_table)
+        whose mappings are used before hashing UIDs, e.g. to map the UIDs of
+        a re-run as an earlier run did. The table is memory-mapped by every
+        worker, so they share one copy of it.
+
+    prescreen_sensitivity : float, optional (default None)
+        When burned-in text is redacted (redact_pixels), each image is first
+        screened for text with this sensitivity (between 0 and 1, see
+        burned_in_text.screen) and only the images that may carry text go
+        through OCR. Every image goes through OCR if None.
+
+    series_ocr_sample : int, optional (default None)
+        When burned-in text is redacted and series_mode is True, OCR runs on
+        the first series_ocr_sample files of each series (of each chunk, with
+        several workers) and the union of the text boxes found is filled on
+        the others; a file whose pixels under the boxes differ from the last
+        file OCR'd goes through OCR again (see series_boxes.BoxTemplate).
+        Every image goes through OCR if None.
+
+    stream_frames : bool, optional (default False)
+        When burned-in text is redacted, the frames of multi-frame images are
+        decoded and redacted one at a time (see frame_streaming), so memory
+        stays bounded by a few frames however long the image.
+
+    preserve_geometry : bool, optional (default False)
+        With destroy_pixels, the pixel data is zeroed in place of being
+        shrunk to 8x8, keeping the rows, columns, frames and samples per pixel
+        of the original. The zeros are streamed to the output files in chunks.
+
+    redaction_cache : str, Path or PersistentRedactionCache, optional (default None)
+        An on-disk cache of header-value redactions (see
+        redaction_cache.PersistentRedactionCache), opened by every worker and
+        kept from one run to the next, so the header values of earlier runs
+        with the same configuration are not analysed again. Each run starts
+        with an empty in-memory cache if None.
+
     Returns
     -------
     None : None
@@ -99,105 +496,87 @@ def deidentify_dicom_files(data_row: DataRow,
     """
     _log_session(data_row, "debug-dump0", "Pipeline started")
 
-    # In the 'PS3.15' use case the headers are handled by the PS3.15 basic
-    # profile, so the NER engines are only needed for image redaction (if any).
-    ps3_15_mode = ps3_15.is_ps3_15_use_case(use_case)
-    analyser = (
-        anonymise_dicom._build_presidio_analyser(score_threshold, spacy_model_name)
-        if not ps3_15_mode or destroy_pixels is False else None
-    )
-    anonymizer = AnonymizerEngine() if not ps3_15_mode else None
-    image_redactor = (
-    DicomImageRedactorEngine(
-            image_analyzer_engine=ImageAnalyzerEngine(analyzer_engine=analyser, image_preprocessor=ContrastSegmentedImageEnhancer())
-        ) if destroy_pixels is False else None
-    )
-    gliner_pii = anonymise_dicom._build_transformer() if use_transformers and not ps3_15_mode else None
+    session_kwargs = dict(use_case=use_case,
+                          score_threshold=score_threshold,
+                          spacy_model_name=spacy_model_name,
+                          use_transformers=use_transformers,
+                          redact_pixels=redact_pixels and destroy_pixels is False,
+                          destroy_pixels=destroy_pixels,
+                          preserve_geometry=preserve_geometry,
+                          uid_map=uid_table,
+                          prescreen_sensitivity=prescreen_sensitivity,
+                          series_ocr_sample=series_ocr_sample,
+                          stream_frames=stream_frames,
+                          cache=redaction_cache)
+    if workers > 1:
+        # Spawned rather than forked: forking a process that already holds
+        # torch/spaCy state is unsafe, and the workers build their own engines.
+        pool = ProcessPoolExecutor(max_workers=workers,
+                                   mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_worker,
+                                   initargs=(session_kwargs,))
+        session = None
+    else:
+        pool = contextlib.nullcontext()
+        session = anonymise_dicom.AnonymisationSession(**session_kwargs)
 
     entries = list(data_row.entries_dict.items())
-    for resource_path_key_order, entry in entries:
-        gc.collect()
-        resource_path = resource_path_key_order[0]
-        order_key = resource_path_key_order[1]
-        # 0. Check if the entry is a DICOM series and not a derivative.
-        if entry.datatype != DicomSeries:
-            print(f"Skipping {resource_path} as it is not a DICOM series.")
-            _log_session(data_row, "debug-dump1", f"Skipping {resource_path} as it is not a DICOM series.")
-            continue
-        if entry.is_derivative:
-            print(f"Skipping {resource_path} as it is a derivative.")
-            _log_session(data_row, "debug-dump1", f"Skipping {resource_path} as it is a derivative.")
-            continue
-        #anonymised_resource_path = str(order_key) + '_' + resource_path.replace("/DICOM", "@deidentified")
-        scan_name, sep, _resource_label = resource_path.rpartition("/")
-        if not sep:
-            # No '/' in path: treat the whole string as the scan name
-            scan_name = resource_path
-        anonymised_resource_path = f"{order_key}_{scan_name}@deidentified"
-
-        print(f"De-identifying {resource_path} to {anonymised_resource_path}.")
-        _log_session(data_row, "debug-dump2", f"De-identifying {resource_path} to {anonymised_resource_path}.")
-
-        # 1. Downloading the files from the original scan entry.
+    budget = _InFlightBudget(max_in_flight, max_disk_bytes)
+    # Bounded hand-offs between the stages; the budget is what actually
+    # limits the number of entries (and bytes) in flight.
+    downloaded = queue.Queue(maxsize=1)
+    anonymised = queue.Queue(maxsize=1)
+    downloader = threading.Thread(target=_download_entries,
+                                  args=(data_row, entries, budget, downloaded),
+                                  name="phi-finder-download", daemon=True)
+    uploader = _Uploader(data_row, entries, budget, anonymised, dry_run)
+    # One connection held open for the whole run, shared by the stages (see
+    # _STORE_LOCK), rather than one opened and closed per request; as it is
+    # held here, the stages' own enters and exits never close it.
+    with pool, data_row.frameset.store.connection:
+        downloader.start()
+        uploader.start()
         try:
-            dicom_series = entry.item
-        except AssertionError as e:
-            print(f"AssertionError occurred while downloading files from {resource_path}: {e}")
-            _log_session(data_row, "debug-dump3", f"AssertionError occurred while downloading files from {resource_path}: {e}")
-            continue
-        _log_session(data_row, "debug-dump3", f"Files from the original scan entry were downloaded.")
-
-        # 2. Anonymising those files. The temp dir is unique per entry and
-        # run, so concurrent pipelines cannot overwrite each other's files,
-        # and it is removed once the upload has completed.
-        with tempfile.TemporaryDirectory(prefix="phi-finder-") as tmp_dir:
-            tmps_paths = []
-            for i, dicom in enumerate(dicom_series.contents):
-                gc.collect()
-                dcm = pydicom.dcmread(dicom)
-                if dry_run:
+            while True:
+                job = downloaded.get()
+                if job is _DONE:
+                    break
+                if isinstance(job, BaseException):
+                    raise job
+                if uploader.error is not None:
+                    job.cleanup()
+                    break
+                try:
+                    _anonymise_job(job, session, pool, workers, series_mode, dry_run, budget)
+                    _log_session(
+                        data_row,
+                        "debug-dump4",
+                        (
+                            "Files anonymised (dry-run)."
+                            if dry_run
+                            else "Files anonymised."
+                        ),
+                    )
+                except BaseException:
+                    # The job never reaches the uploader, which cleans up the
+                    # others: free its temp dir and budget here.
+                    job.cleanup()
+                    raise
+                anonymised.put(job)
+        finally:
+            budget.abort()
+            # Unblock the downloader if it is waiting to hand over an entry.
+            while downloader.is_alive() or not downloaded.empty():
+                try:
+                    job = downloaded.get(timeout=0.1)
+                except queue.Empty:
                     continue
-                anonymised_dcm = anonymise_dicom.anonymise_image(dcm,
-                                                                 analyser=analyser,
-                                                                 anonymizer=anonymizer,
-                                                                 image_redactor=image_redactor,
-                                                                 score_threshold=score_threshold,
-                                                                 gliner_pii=gliner_pii,
-                                                                 use_case=use_case)
-                if destroy_pixels:
-                    anonymised_dcm = anonymise_dicom.destroy_pixels(anonymised_dcm)
-                tmp_path = Path(tmp_dir) / f"anonymised{i}-tmp_{dicom.stem}.dcm"
-                anonymised_dcm.save_as(tmp_path)
-                tmps_paths.append(tmp_path)
-
-            if dry_run:
-                _log_session(data_row, "debug-dump4", f"Files anonymised (dry-run).")
-            else:
-                _log_session(data_row, "debug-dump4", f"Files anonymised.")
-
-            # 3. Creating the deidentified entry if necessary.
-            entries_names = [x[0][0] for x in entries]  # x: ((name: str, order_key: str), entry: DataEntry)
-            if dry_run:
-                _log_session(data_row, "debug-dump6", f"Deidentified files uploaded (dry-run).")
-                continue
-
-            if anonymised_resource_path in entries_names:
-                print(f"Re-using {anonymised_resource_path} that already exists.")
-                _log_session(data_row, "debug-dump5", f"Re-using {anonymised_resource_path} that already exists.")
-                index = entries_names.index(anonymised_resource_path)
-                anonymised_session_entry = entries[index][1]
-            else:
-                anonymised_session_entry = data_row.create_entry(
-                    anonymised_resource_path, datatype=DicomSeries, order_key=order_key
-                )
-                _log_session(data_row, "debug-dump5", f"Deidentified entry created.")
-
-            # 4. Creating a new DicomSeries object from the anonymised files.
-            anonymised_dcm_series = DicomSeries(tmps_paths)
-
-            # 5. Uploading the anonymised files from the temp dir.
-            anonymised_session_entry.item = anonymised_dcm_series
-            _log_session(data_row, "debug-dump6", f"Deidentified files uploaded.")
+                if isinstance(job, _EntryJob):
+                    job.cleanup()
+            anonymised.put(_DONE)
+            uploader.join()
+    if uploader.error is not None:
+        raise uploader.error
     return None
 
 